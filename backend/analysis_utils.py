@@ -111,6 +111,11 @@ def detect_confluence(df, macd_divergence=None):
     last_row = df.iloc[-1]
     last_pattern = last_row.get('candle_pattern')
     last_pattern_type = last_row.get('candle_pattern_type')
+    # String/categorical columns hold NaN (not None) where no pattern was found
+    if pd.isna(last_pattern):
+        last_pattern = None
+    if pd.isna(last_pattern_type):
+        last_pattern_type = None
     efi_buy = bool(last_row.get('efi_buy_signal', False))
     efi_sell = bool(last_row.get('efi_sell_signal', False))
     
@@ -151,3 +156,79 @@ def detect_confluence(df, macd_divergence=None):
             confluence_alert = f"BEARISH CONFLUENCE: MACD Divergence confirmed by {'pattern' if last_pattern_type == 'bearish' else 'oscillator'} exhaustion."
             
     return confluence_alert, wisdom
+
+def _fractal_pivots(values, window, find_max):
+    """
+    Indices of bars that are the extreme of the centered (2*window+1)-bar
+    window. A plateau (consecutive bars at the same extreme) is one pivot,
+    on its last bar.
+    """
+    series = pd.Series(values)
+    rolling = series.rolling(window * 2 + 1, center=True)
+    extreme = rolling.max() if find_max else rolling.min()
+    pivots = np.flatnonzero((series == extreme).to_numpy())
+    plateau = (np.diff(pivots) == 1) & (values[pivots[1:]] == values[pivots[:-1]])
+    return pivots[np.append(~plateau, True)] if len(pivots) else pivots
+
+def _cluster_levels(prices, positions, index, level_type, tolerance):
+    """
+    Group pivot prices into levels no wider than `tolerance` (fraction of the
+    lowest price in the level). Each level carries its mean price, the number
+    of pivots that touched it and the date of the latest touch.
+    """
+    if len(prices) == 0:
+        return []
+    order = np.argsort(prices, kind='stable')
+    prices, positions = prices[order], positions[order]
+
+    # Sorted sweep: a new level starts once a price is too far above the level's floor
+    cluster = np.empty(len(prices), dtype=np.int64)
+    current, floor = 0, prices[0]
+    for i, price in enumerate(prices.tolist()):
+        if price > floor * (1 + tolerance):
+            current, floor = current + 1, price
+        cluster[i] = current
+
+    n_clusters = cluster[-1] + 1
+    touches = np.bincount(cluster, minlength=n_clusters)
+    means = np.bincount(cluster, weights=prices, minlength=n_clusters) / touches
+    last = np.full(n_clusters, -1)
+    np.maximum.at(last, cluster, positions)
+
+    return [
+        {"price": float(means[k]), "type": level_type, "date": index[last[k]], "touches": int(touches[k])}
+        for k in range(n_clusters)
+    ]
+
+def find_levels(df, window=5, tolerance=0.01, recent_bars=30, max_levels=3):
+    """
+    Support & resistance from fractal highs/lows, clustered into levels.
+
+    A bar is a resistance (support) pivot when its High (Low) is the max (min)
+    of the centered window of `window` bars either side. Pivots within
+    `tolerance` of each other merge into one level with a touch count.
+    Fractals lag by `window` bars, so the high/low of the last `recent_bars`
+    is added as a level when it is not already near one.
+    Returns the `max_levels` most recently touched levels of each type.
+    """
+    if len(df) < window * 2 + 1:
+        return []
+
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    levels = {}
+    for level_type, values, find_max in (("resistance", high, True), ("support", low, False)):
+        pivots = _fractal_pivots(values, window, find_max)
+        found = _cluster_levels(values[pivots], pivots, df.index, level_type, tolerance)
+
+        # --- Explicitly Add Recent Range ---
+        recent = values[-recent_bars:]
+        if not np.isnan(recent).all():  # no recent range without recent prices
+            pos = len(values) - len(recent) + int(np.nanargmax(recent) if find_max else np.nanargmin(recent))
+            price = float(values[pos])
+            if not any(abs(l['price'] - price) / price < tolerance for l in found):
+                found.append({"price": price, "type": level_type, "date": df.index[pos], "touches": 1})
+
+        levels[level_type] = sorted(found, key=lambda x: x['date'], reverse=True)[:max_levels]
+
+    return levels["resistance"] + levels["support"]
@@ -17,12 +17,22 @@ from sqlmodel import Session, select
 from models import BacktestResult, BacktestTrade
 from database import engine
 from utils import safe_download
+from timing import StageTimer
 from analysis_utils import detect_candlestick_pattern, detect_confluence
+from indicators import BASE_COLUMNS, compact_frame
+from divergence import MAX_DISTANCE, divergence_signals
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns the BSL signals and trade simulation compare against prices/thresholds;
+# they stay float64 when the backtest frame is compacted.
+BACKTEST_FULL_PRECISION = BASE_COLUMNS + (
+    'ema_13', 'ema_26', 'ema_50', 'ema_200', 'macd', 'macd_signal', 'macd_diff',
+    'rsi', 'atr', 'force_index_2', 'force_index_13',
+)
+
 @dataclass
 class BacktestConfig:
     strategy_name: str
@@ -98,7 +108,7 @@ ENTRY_LONG = CROSSOVER(MACD_LINE, SIGNAL_LINE)
 EXIT_LONG = CROSSUNDER(MACD_LINE, SIGNAL_LINE)
 """,
     StrategyTypes.DIVERGENCE: """
-// Divergence is currently handled via a custom built-in function
+// MACD wave divergences; optional argument = max bars between the two extremes (default 40)
 ENTRY_LONG = MACD_DIVERGENCE_BULLISH()
 EXIT_LONG = MACD_DIVERGENCE_BEARISH()
 """
@@ -285,6 +295,14 @@ class ScriptParser:
                     elif name == "CONFLUENCE_SHORT":
                         efi_any = df.get('efi_sell_signal', pd.Series([False]*len(df))).rolling(3).max().astype(bool)
                         df[base_col] = (df.get('candle_pattern_type') == 'bearish') & efi_any
+                    elif name in ("MACD_DIVERGENCE_BULLISH", "MACD_DIVERGENCE_BEARISH"):
+                        # Wave divergences for the whole history in one pass; arg = max bars between extremes
+                        lookback = args[0] if args else MAX_DISTANCE
+                        source = df if 'macd_diff' in df.columns else df.assign(macd_diff=ta.trend.macd_diff(df['Close']))
+                        bullish, bearish = divergence_signals(source, 'macd_diff', lookback=lookback)
+                        suffix = base_col[len(name):]
+                        df[f"MACD_DIVERGENCE_BULLISH{suffix}"] = bullish
+                        df[f"MACD_DIVERGENCE_BEARISH{suffix}"] = bearish
                  except Exception as e:
                      logger.error(f"Failed to calc {name}: {e}")
             
@@ -399,45 +417,11 @@ class BacktestEngine:
         df['candle_pattern'] = pattern_list
         df['candle_pattern_type'] = pattern_type_list
         
-        return df
-    
-    def detect_divergence(self, df: pd.DataFrame) -> Dict:
-        """Detect bullish and bearish divergences"""
-        divergences = {'bullish': [], 'bearish': []}
-        
-        if len(df) < 50:
-            return divergences
-            
-        # MACD Divergence
-        macd_hist = df['macd_diff'].values
-        prices = df['High'].values
-        lows = df['Low'].values
-        
-        # Find local extrema
-        for i in range(10, len(macd_hist) - 10):
-            # Bullish divergence: lower low in price, higher low in MACD
-            if (i > 20 and 
-                df['Low'].iloc[i] < df['Low'].iloc[i-10:i].min() and
-                df['macd_diff'].iloc[i] > df['macd_diff'].iloc[i-10:i].min()):
-                divergences['bullish'].append({
-                    'date': df.index[i],
-                    'price': df['Low'].iloc[i],
-                    'indicator': df['macd_diff'].iloc[i],
-                    'type': 'bullish'
-                })
-            
-            # Bearish divergence: higher high in price, lower high in MACD
-            elif (i > 20 and
-                  df['High'].iloc[i] > df['High'].iloc[i-10:i].max() and
-                  df['macd_diff'].iloc[i] < df['macd_diff'].iloc[i-10:i].max()):
-                divergences['bearish'].append({
-                    'date': df.index[i],
-                    'price': df['High'].iloc[i],
-                    'indicator': df['macd_diff'].iloc[i],
-                    'type': 'bearish'
-                })
+        # Helper/oscillator columns to float32, labels to categoricals
+        saved = compact_frame(df, keep=BACKTEST_FULL_PRECISION)
+        logger.info(f"Backtest frame compacted: {len(df)} bars, saved {saved / 1024:.1f} KB")
         
-        return divergences
+        return df
     
     def generate_signals_custom(self, df: pd.DataFrame, script: str = None) -> pd.DataFrame:
         """Generate signals based on custom Pine-like script"""
@@ -500,8 +484,15 @@ class BacktestEngine:
         
         return df, plots
     
-    def run_backtest(self, symbol: str, start_date: str, end_date: str, strategy_type: str) -> Dict:
-        """Run the backtest for a specific symbol and strategy"""
+    def run_backtest(self, symbol: str, start_date: str, end_date: str, strategy_type: str,
+                     timer: Optional[StageTimer] = None) -> Dict:
+        """
+        Run the backtest for a specific symbol and strategy. Stage timings go
+        to `timer` (the caller finishes it), or to a timer of its own that is
+        finished here.
+        """
+        own_timer = timer is None
+        timer = timer or StageTimer("backtest")
         try:
             # Download data
             df = safe_download(symbol, start=start_date, end=end_date)
@@ -511,20 +502,14 @@ class BacktestEngine:
             # Flatten columns if multi-indexed (yfinance new default)
             if isinstance(df.columns, pd.MultiIndex):
                 df.columns = df.columns.get_level_values(0)
+            timer.lap("download")
             
             # Calculate indicators
             df = self.calculate_indicators(df)
+            timer.lap("indicators")
             
             # Generate signals based on strategy
             plots = []
-            if strategy_type == StrategyTypes.DIVERGENCE:
-                # Specialized pre-processing for Divergence
-                divergences = self.detect_divergence(df)
-                bullish_dates = set(d['date'] for d in divergences['bullish'])
-                bearish_dates = set(d['date'] for d in divergences['bearish'])
-                df['MACD_DIVERGENCE_BULLISH'] = df.index.map(lambda x: x in bullish_dates)
-                df['MACD_DIVERGENCE_BEARISH'] = df.index.map(lambda x: x in bearish_dates)
-            
             # Prefer custom config if provided, otherwise fallback to built-in default
             script = self.config.custom_strategy_config
             if not script:
@@ -534,12 +519,15 @@ class BacktestEngine:
                 df, plots = self.generate_signals_custom(df, script)
             else:
                 raise ValueError(f"No BSL script found for strategy: {strategy_type}")
+            timer.lap("signals")
             
             # Run simulation
             self.simulate_trading(df, symbol)
+            timer.lap("simulate")
             
             # Calculate performance metrics
             metrics = self.calculate_performance_metrics(df)
+            timer.lap("metrics")
             
             # Prepare price data for frontend charting
             price_data = []
@@ -565,6 +553,9 @@ class BacktestEngine:
                             data_point[col] = None
                 
                 price_data.append(data_point)
+            timer.lap("price_data")
+            if own_timer:
+                timer.finish(symbol=symbol, strategy=strategy_type, bars=len(df), trades=len(self.trades))
             
             return {
                 'symbol': symbol,
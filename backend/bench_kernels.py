@@ -0,0 +1,89 @@
+"""
+Per-bar cost of the array kernels on a 20-year daily series.
+
+    python bench_kernels.py [years] [--no-numba]
+
+Compares each kernel with the pandas/list code it replaced and prints the
+cost per bar. Timings use the best of several runs. --no-numba times the
+fallback kernels even when numba is installed.
+"""
+import sys
+import os
+import numpy as np
+import pandas as pd
+import ta
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_utils import best_of
+from synthetic import make_ohlcv
+import kernels
+from kernels import ema_bank, first_crossing, volatility_stop
+from indicators import EMA_WINDOWS, GUPPY_SHORT_PERIODS, GUPPY_LONG_PERIODS
+
+
+def legacy_volatility_stop(closes, long_stops, short_stops, atr_period):
+    # The list-based loop previously inlined in calculate_indicators
+    final_stops = [0.0] * len(closes)
+    curr_trend = 1
+    curr_stop = 0.0
+    for i in range(len(closes)):
+        if i < atr_period:
+            final_stops[i] = None
+            continue
+        c = closes[i]
+        if curr_trend == 1:
+            if c < curr_stop:
+                curr_trend = -1
+                curr_stop = short_stops[i]
+            else:
+                curr_stop = max(curr_stop, long_stops[i])
+        else:
+            if c > curr_stop:
+                curr_trend = 1
+                curr_stop = long_stops[i]
+            else:
+                curr_stop = min(curr_stop, short_stops[i])
+        final_stops[i] = curr_stop
+    return final_stops
+
+
+def main(years=20):
+    df = make_ohlcv(252 * years, start="2000-01-01")
+    n = len(df)
+    close = df['Close'].to_numpy()
+
+    atr = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=22).to_numpy()
+    long_stop = df['High'].rolling(22).max().to_numpy() - atr * 3.0
+    short_stop = df['Low'].rolling(22).min().to_numpy() + atr * 3.0
+    zone = np.random.default_rng(1).random(n) > 0.9
+    spans = EMA_WINDOWS + GUPPY_SHORT_PERIODS + GUPPY_LONG_PERIODS
+
+    cases = [
+        ("volatility_stop (list loop)", lambda: legacy_volatility_stop(close, long_stop, short_stop, 22)),
+        ("volatility_stop (kernel)", lambda: volatility_stop(close, long_stop, short_stop, start=22)),
+        ("first crossing (shift/fillna)",
+         lambda: pd.Series(zone) & ~pd.Series(zone).shift(1, fill_value=False)),
+        ("first_crossing (kernel)", lambda: first_crossing(zone)),
+        (f"{len(spans)} EMAs (ta.EMAIndicator)",
+         lambda: [ta.trend.EMAIndicator(close=df['Close'], window=w).ema_indicator() for w in spans]),
+        (f"{len(spans)} EMAs (ema_bank)", lambda: ema_bank(close, spans)),
+    ]
+
+    backend = "numba" if kernels._ema_bank_compiled is not None else "interpreted fallback"
+    print(f"{n} bars ({years} years daily), kernels: {backend}")
+    print(f"{'case':<36}{'total ms':>10}{'ns/bar':>10}")
+    for name, func in cases:
+        func()  # warm up (and JIT compile)
+        elapsed = best_of(func)
+        print(f"{name:<36}{elapsed * 1e3:>10.2f}{elapsed / n * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--no-numba"]
+    if "--no-numba" in sys.argv:
+        for name in dir(kernels):
+            if name.endswith("_compiled"):
+                setattr(kernels, name, None)
+    main(int(args[0]) if args else 20)
@@ -0,0 +1,59 @@
+"""
+Per-symbol cost of the watchlist scan with each indicator profile.
+
+    python bench_scan.py [symbols]
+
+"full" is what the scan computed before profiles existed: every indicator
+and whole-history candlestick detection. "scan" is what the scan decisions
+need, "screen" adds every indicator's last-bar value for the screener.
+Timings use the best of several runs on ~2 years of daily bars.
+"""
+import sys
+import os
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import scanner
+from bench_utils import best_of
+from synthetic import make_ohlcv
+from indicators import calculate_indicators
+from indicator_panel import panel_from_download
+
+BARS = 504  # the scan downloads period="2y"
+
+
+def main(n_symbols=20):
+    frames = {f"S{i}": make_ohlcv(BARS, seed=i) for i in range(n_symbols)}
+    symbols = list(frames)
+    panel = panel_from_download(pd.concat(frames, axis=1), symbols)
+    df = frames["S0"]
+
+    cases = [
+        ("indicators, full profile", 1, lambda: calculate_indicators(df.copy()), 3),
+        ("indicators, scan profile", 1, lambda: calculate_indicators(df.copy(), profile="scan"), 7),
+        ("indicators, screen profile", 1, lambda: calculate_indicators(df.copy(), profile="screen"), 7),
+        ("scan_symbol, scan", 1, lambda: scanner.scan_symbol("S0", df.copy()), 7),
+        ("scan_symbol, screen", 1, lambda: scanner.scan_symbol("S0", df.copy(), screen=True), 7),
+        (f"analyze_watchlist x{n_symbols}, scan", n_symbols,
+         lambda: scanner.analyze_watchlist(panel, symbols), 3),
+        (f"analyze_watchlist x{n_symbols}, screen", n_symbols,
+         lambda: scanner.analyze_watchlist(panel, symbols, screen=True), 3),
+    ]
+
+    workers = scanner.SCAN_WORKERS
+    scanner.SCAN_WORKERS = 1  # per-symbol cost on one core, no process pool
+    try:
+        print(f"{BARS} daily bars per symbol")
+        print(f"{'case':<36}{'ms/symbol':>12}")
+        for name, symbols_per_run, func, repeat in cases:
+            func()  # warm up
+            elapsed = best_of(func, repeat)
+            print(f"{name:<36}{elapsed / symbols_per_run * 1e3:>12.2f}")
+    finally:
+        scanner.SCAN_WORKERS = workers
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
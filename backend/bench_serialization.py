@@ -0,0 +1,78 @@
+"""
+Cost of encoding an analysis response.
+
+    python bench_serialization.py [bars]
+
+"default" is what the analysis endpoint did before FastJSONResponse: a
+recursive NaN sweep, FastAPI's jsonable_encoder and the stdlib JSONResponse.
+The other cases render through serialization.dumps(), with orjson when it is
+installed and with the stdlib fallback. Timings are the best of several runs.
+"""
+import sys
+import os
+import math
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import serialization
+from bench_utils import best_of
+from synthetic import make_ohlcv
+from indicators import calculate_indicators
+from serialization import columnar, dumps
+
+BARS = 5000
+
+
+def sweep_nans(obj):
+    # The clean_nans pass the endpoint used to run before returning
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: sweep_nans(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [sweep_nans(v) for v in obj]
+    return obj
+
+
+def main(bars=BARS):
+    df = calculate_indicators(make_ohlcv(bars, seed=1))
+    df.index.name = 'Date'
+    records = {"symbol": "BENCH", "data": df.reset_index().to_dict(orient="records")}
+    columns = {"symbol": "BENCH", "data": columnar(df)}
+
+    def default():
+        return JSONResponse(jsonable_encoder(sweep_nans(records))).body
+
+    def stdlib(payload):
+        fast = serialization.orjson
+        serialization.orjson = None
+        try:
+            return dumps(payload)
+        finally:
+            serialization.orjson = fast
+
+    cases = [
+        ("records, default", default),
+        ("records, dumps (stdlib)", lambda: stdlib(records)),
+        ("columnar, dumps (stdlib)", lambda: stdlib(columns)),
+    ]
+    if serialization.orjson is not None:
+        cases += [
+            ("records, dumps (orjson)", lambda: dumps(records)),
+            ("columnar, dumps (orjson)", lambda: dumps(columns)),
+            ("columnar incl. conversion", lambda: dumps({"symbol": "BENCH", "data": columnar(df)})),
+        ]
+
+    print(f"{bars} bars x {len(df.columns)} columns")
+    print(f"{'case':<30}{'ms':>10}{'MB':>8}")
+    for name, func in cases:
+        size = len(func())  # warm up
+        print(f"{name:<30}{best_of(func, 5) * 1e3:>10.1f}{size / 1e6:>8.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else BARS)
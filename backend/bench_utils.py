@@ -0,0 +1,12 @@
+"""Timing helper shared by the bench_*.py scripts."""
+import time
+
+
+def best_of(func, repeat=7):
+    """Fastest of `repeat` runs of `func`, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,177 @@
+"""
+Wave-based divergence detection shared by the scan, the analysis endpoint and
+the backtester.
+
+An oscillator (MACD histogram, Force Index) is split into waves: runs of the
+same sign, found with run-length encoding. Each wave's extreme and the
+High/Low price over the wave come from ufunc.reduceat, so the whole history
+is processed in a handful of array operations.
+
+A divergence pairs two waves of the same sign with exactly one opposite
+wave between them (Elder's standard):
+  bearish: price makes an equal/higher high, the oscillator a lower peak
+  bullish: price makes an equal/lower low, the oscillator a higher trough
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MIN_BARS = 50          # too little history for meaningful waves
+MAX_DISTANCE = 40      # bars between the two extremes
+PRICE_TOLERANCE = 0.005  # double tops/bottoms within 0.5% still count
+
+
+def wave_segments(hist, highs, lows) -> Dict[str, np.ndarray]:
+    """
+    Split `hist` into same-sign waves (NaN counts as negative, zero as positive).
+    Returns parallel arrays, one entry per wave: start, length, positive,
+    extrema_idx / extrema_val (peak of a positive wave, trough of a negative
+    one) and price_at_extrema (the wave's highest High / lowest Low).
+    Waves that are entirely NaN are dropped.
+    """
+    hist = np.asarray(hist, dtype=float)
+    highs = np.asarray(highs, dtype=float)
+    lows = np.asarray(lows, dtype=float)
+    n = len(hist)
+    if n == 0:
+        empty = np.empty(0, dtype=int)
+        return {'start': empty, 'length': empty, 'positive': empty.astype(bool),
+                'extrema_idx': empty, 'extrema_val': empty.astype(float), 'price_at_extrema': empty.astype(float)}
+
+    # Run-length encoding of the sign
+    positive = hist >= 0
+    starts = np.concatenate(([0], np.flatnonzero(positive[1:] != positive[:-1]) + 1))
+    lengths = np.diff(np.append(starts, n))
+    seg_positive = positive[starts]
+
+    # Extreme of each wave: max of hist on positive waves, max of -hist (trough) on negative ones.
+    # fmax skips NaN, and the first bar equal to the extreme wins (like argmax).
+    signed = np.where(positive, hist, -hist)
+    seg_extreme = np.fmax.reduceat(signed, starts)
+    at_extreme = signed == np.repeat(seg_extreme, lengths)
+    extrema_idx = np.minimum.reduceat(np.where(at_extreme, np.arange(n), n), starts)
+
+    price = np.where(seg_positive, np.fmax.reduceat(highs, starts), np.fmin.reduceat(lows, starts))
+
+    valid = extrema_idx < n
+    extrema_idx = extrema_idx[valid]
+    return {
+        'start': starts[valid],
+        'length': lengths[valid],
+        'positive': seg_positive[valid],
+        'extrema_idx': extrema_idx,
+        'extrema_val': hist[extrema_idx],
+        'price_at_extrema': price[valid],
+    }
+
+
+def divergence_pairs(segments: Dict[str, np.ndarray], max_distance: int = MAX_DISTANCE,
+                     tolerance: float = PRICE_TOLERANCE) -> pd.DataFrame:
+    """
+    Every divergence in the history of `segments` (from wave_segments()).
+    Columns: type, segment1, segment2 (wave positions), idx1, idx2 (bar of
+    each extreme), end2 (last bar of the second wave), price, indicator
+    (price and oscillator extreme of the second wave).
+    """
+    positive = segments['positive']
+    multi_bar = segments['length'] > 1
+    idx = segments['extrema_idx']
+    val = segments['extrema_val']
+    price = segments['price_at_extrema']
+
+    s2 = np.arange(2, len(positive))
+    s1, bridge = s2 - 2, s2 - 1
+    base = ((positive[s1] == positive[s2]) & (positive[bridge] != positive[s2])
+            & multi_bar[s1] & multi_bar[s2] & (idx[s2] - idx[s1] <= max_distance))
+    bearish = base & positive[s2] & (price[s2] >= price[s1] * (1 - tolerance)) & (val[s2] < val[s1])
+    bullish = base & ~positive[s2] & (price[s2] <= price[s1] * (1 + tolerance)) & (val[s2] > val[s1])
+
+    hit = bearish | bullish
+    s1, s2 = s1[hit], s2[hit]
+    return pd.DataFrame({
+        'type': np.where(bearish[hit], 'bearish', 'bullish'),
+        'segment1': s1,
+        'segment2': s2,
+        'idx1': idx[s1],
+        'idx2': idx[s2],
+        'end2': segments['start'][s2] + segments['length'][s2] - 1,
+        'price': price[s2],
+        'indicator': val[s2],
+    })
+
+
+def latest_divergence(df: pd.DataFrame, column: str, max_recency: int = 30) -> Optional[Dict]:
+    """
+    Divergence currently in play on `column`, or None.
+
+    The second wave must be one of the last two multi-bar waves of its sign
+    and its extreme at most `max_recency` bars old. On the latest wave the
+    extreme must also be confirmed: at least one bar old, with the oscillator
+    ticking back from it. Bearish is checked before bullish.
+    Returns {'type', 'idx1', 'idx2', 'recency'}.
+    """
+    if len(df) < MIN_BARS:
+        return None
+
+    hist = df[column].to_numpy(dtype=float)
+    segments = wave_segments(hist, df['High'].to_numpy(dtype=float), df['Low'].to_numpy(dtype=float))
+    pairs = divergence_pairs(segments)
+    if pairs.empty:
+        return None
+
+    last = hist[-1]
+    for kind, positive in (('bearish', True), ('bullish', False)):
+        waves = np.flatnonzero((segments['positive'] == positive) & (segments['length'] > 1))
+        for j in range(1, min(len(waves), 3)):
+            s2 = waves[-j]
+            recency = len(hist) - 1 - segments['extrema_idx'][s2]
+            if recency >= max_recency:
+                continue
+            if j == 1:
+                extreme = segments['extrema_val'][s2]
+                ticked_back = last < extreme if positive else last > extreme
+                if recency < 1 or not ticked_back:
+                    continue
+            match = pairs[(pairs['segment2'] == s2) & (pairs['type'] == kind)]
+            if not match.empty:
+                return {
+                    "type": kind,
+                    "idx1": int(match['idx1'].iloc[0]),
+                    "idx2": int(match['idx2'].iloc[0]),
+                    "recency": int(recency),
+                }
+    return None
+
+
+def divergence_history(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    All divergences on `column`, each dated on the bar that closes its second
+    wave (the oscillator crosses zero), i.e. the first bar it is known without
+    look-ahead. Adds a 'signal_idx' column; waves still open at the end are left out.
+    """
+    pairs = divergence_pairs(wave_segments(df[column], df['High'], df['Low']))
+    pairs['signal_idx'] = pairs['end2'] + 1
+    return pairs[pairs['signal_idx'] < len(df)].reset_index(drop=True)
+
+
+def divergence_signals(df: pd.DataFrame, column: str = 'macd_diff',
+                       lookback: int = MAX_DISTANCE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (bullish, bearish) boolean arrays aligned to df.index, True on the bar
+    each divergence is signalled (see divergence_history()). `lookback` is
+    the most bars allowed between the two extremes.
+    """
+    bullish = np.zeros(len(df), dtype=bool)
+    bearish = np.zeros(len(df), dtype=bool)
+    if len(df) < MIN_BARS:
+        return bullish, bearish
+
+    segments = wave_segments(df[column], df['High'], df['Low'])
+    pairs = divergence_pairs(segments, max_distance=lookback)
+    signal_idx = pairs['end2'].to_numpy() + 1
+    live = signal_idx < len(df)
+    is_bullish = (pairs['type'] == 'bullish').to_numpy()
+    bullish[signal_idx[live & is_bullish]] = True
+    bearish[signal_idx[live & ~is_bullish]] = True
+    return bullish, bearish
@@ -0,0 +1,175 @@
+"""
+Panel (time x symbols) indicator computation.
+
+Takes aligned OHLCV frames for a whole watchlist (one frame per field, one
+column per symbol) and computes EMA, MACD, ATR, Force Index, impulse and the
+EFI bands column-wise in one vectorized pass, instead of running the pandas
+pipeline symbol by symbol.
+
+Each column is treated as that symbol's own bar series: rows where a symbol
+has no bar (later listing, exchange holiday) are skipped by the smoothing
+and come back as NaN. The values are identical to calculate_indicators()
+on the symbol's own bars.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import BASE_COLUMNS
+
+PANEL_OUTPUTS = (
+    'ema_13', 'ema_22', 'ema_26', 'ema_50', 'ema_200',
+    'macd', 'macd_signal', 'macd_diff',
+    'price_atr',
+    'ema_13_slope', 'macd_diff_slope', 'impulse',
+    'efi', 'efi_signal',
+    'efi_atr_h1', 'efi_atr_l1', 'efi_atr_h2', 'efi_atr_l2', 'efi_atr_h3', 'efi_atr_l3',
+    'efi_truncated', 'efi_buy_signal', 'efi_sell_signal',
+    'force_index_13', 'force_index_2',
+)
+
+
+def panel_from_download(df: pd.DataFrame, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Split a yfinance download of `symbols` into per-field (time x symbols)
+    frames. Handles group_by='ticker', the default field-first layout and a
+    single-symbol (flat) download.
+    """
+    panel = {}
+    for field in BASE_COLUMNS:
+        if isinstance(df.columns, pd.MultiIndex):
+            level = 0 if field in df.columns.get_level_values(0) else 1
+            frame = df.xs(field, axis=1, level=level)
+        else:
+            frame = df[[field]].set_axis(symbols[:1], axis=1)
+        panel[field] = frame.reindex(columns=symbols).astype(float)
+    return panel
+
+
+def symbol_frame(panel: Dict[str, pd.DataFrame], symbol: str) -> pd.DataFrame:
+    """One symbol's OHLCV bars out of a panel (rows without a bar dropped)."""
+    df = pd.DataFrame({field: panel[field][symbol] for field in BASE_COLUMNS})
+    return df[df['Close'].notna()]
+
+
+def _prev_valid(values, valid):
+    """values at each column's previous valid row (NaN when there is none)."""
+    T, N = values.shape
+    rows = np.where(valid, np.arange(T)[:, None], -1)
+    last = np.maximum.accumulate(rows, axis=0)
+    prev = np.vstack([np.full((1, N), -1), last[:-1]])
+    out = np.take_along_axis(values, np.maximum(prev, 0), axis=0)
+    return np.where(prev >= 0, out, np.nan)
+
+
+def _ewm(values, span, min_periods=0):
+    # ignore_na skips rows without a bar exactly as if they were not there
+    frame = pd.DataFrame(values)
+    return frame.ewm(span=span, min_periods=min_periods, adjust=False, ignore_na=True).mean().to_numpy()
+
+
+def _atr(high, low, prev_close, valid, window):
+    """ta's AverageTrueRange (mean seed, then Wilder smoothing) per column."""
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    T, N = tr.shape
+    atr = np.where(valid, 0.0, np.nan)
+
+    # Seed: plain mean of each symbol's first `window` true ranges
+    seeded = np.zeros(N, dtype=bool)
+    state = np.zeros(N)
+    seed_row = np.full(N, T)
+    for j in range(N):
+        rows = np.flatnonzero(valid[:, j])
+        if len(rows) >= window:
+            seed_row[j] = rows[window - 1]
+            state[j] = pd.Series(tr[rows[:window], j]).mean()
+
+    for t in range(T):
+        seed_now = seed_row == t
+        if seed_now.any():
+            atr[t, seed_now] = state[seed_now]
+            seeded |= seed_now
+        step = seeded & valid[t] & ~seed_now
+        if step.any():
+            state[step] = (state[step] * (window - 1) + tr[t, step]) / float(window)
+            atr[t, step] = state[step]
+    return atr
+
+
+def calculate_panel(panel: Dict[str, pd.DataFrame],
+                    outputs: Optional[Iterable[str]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Compute indicators over a panel from panel_from_download().
+    Returns {column: (time x symbols) DataFrame}; `outputs` narrows the result.
+    """
+    close_frame = panel['Close']
+    index, symbols = close_frame.index, close_frame.columns
+    close = close_frame.to_numpy(dtype=float)
+    high = panel['High'].to_numpy(dtype=float)
+    low = panel['Low'].to_numpy(dtype=float)
+    volume = panel['Volume'].to_numpy(dtype=float)
+    valid = ~np.isnan(close)
+
+    def mask(values):
+        return np.where(valid, values, np.nan)
+
+    prev_close = _prev_valid(close, valid)
+    out = {}
+
+    for w in (13, 22, 26, 50, 200):
+        out[f'ema_{w}'] = mask(_ewm(close, w, min_periods=w))
+
+    macd = mask(_ewm(close, 12, min_periods=12) - _ewm(close, 26, min_periods=26))
+    macd_signal = mask(_ewm(macd, 9, min_periods=9))
+    out['macd'] = macd
+    out['macd_signal'] = macd_signal
+    out['macd_diff'] = macd - macd_signal
+
+    out['price_atr'] = _atr(high, low, prev_close, valid, 14)
+
+    # Impulse: slopes of EMA13 and MACD histogram
+    ema_slope = out['ema_13'] - _prev_valid(out['ema_13'], valid)
+    macd_slope = out['macd_diff'] - _prev_valid(out['macd_diff'], valid)
+    out['ema_13_slope'] = ema_slope
+    out['macd_diff_slope'] = macd_slope
+    impulse = np.where((ema_slope > 0) & (macd_slope > 0), 'green',
+                       np.where((ema_slope < 0) & (macd_slope < 0), 'red', 'blue')).astype(object)
+    impulse[~valid] = None
+    out['impulse'] = impulse
+
+    # Force Index and EFI ATR bands
+    raw_force = mask((close - prev_close) * volume)
+    efi = mask(_ewm(raw_force, 13))
+    efi_signal = mask(_ewm(efi, 13))
+    efi_atr = mask(_ewm(np.abs(efi - _prev_valid(efi, valid)), 22))
+    out['efi'] = efi
+    out['efi_signal'] = efi_signal
+    for m in (1, 2, 3):
+        out[f'efi_atr_h{m}'] = efi_signal + efi_atr * m
+        out[f'efi_atr_l{m}'] = efi_signal - efi_atr * m
+
+    truncated = np.where(efi > efi_signal + efi_atr * 5, efi_signal + efi_atr * 4, efi)
+    out['efi_truncated'] = np.where(efi < efi_signal - efi_atr * 5, efi_signal - efi_atr * 4, truncated)
+
+    buy_zone = (efi <= out['efi_atr_l3']).astype(float)
+    sell_zone = (efi >= out['efi_atr_h3']).astype(float)
+    out['efi_buy_signal'] = (buy_zone == 1) & ~(_prev_valid(buy_zone, valid) == 1) & valid
+    out['efi_sell_signal'] = (sell_zone == 1) & ~(_prev_valid(sell_zone, valid) == 1) & valid
+
+    out['force_index_13'] = efi
+    out['force_index_2'] = mask(_ewm(raw_force, 2))
+
+    wanted = PANEL_OUTPUTS if outputs is None else [c for c in PANEL_OUTPUTS if c in set(outputs)]
+    return {col: pd.DataFrame(out[col], index=index, columns=symbols) for col in wanted}
+
+
+def last_values(result: Dict[str, pd.DataFrame], panel: Dict[str, pd.DataFrame], column: str) -> Dict[str, object]:
+    """Value of `column` on each symbol's last bar (None if it has no bars)."""
+    close = panel['Close']
+    frame = result[column]
+    values = {}
+    for symbol in close.columns:
+        bars = np.flatnonzero(close[symbol].notna().to_numpy())
+        values[symbol] = frame[symbol].iloc[bars[-1]] if len(bars) else None
+    return values
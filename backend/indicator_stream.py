@@ -0,0 +1,684 @@
+"""
+Incremental (streaming) indicator updates.
+
+IndicatorState carries everything calculate_indicators needs to produce the
+next bar: EWM accumulators, rolling-window accumulators, ATR, the EFI zone
+flags and the volatility-stop state machine, plus a short tail of raw bars
+for the window-local pieces (candle patterns, highest high / lowest low).
+Extending a frame by k bars costs O(k) no matter how long the history is.
+
+The accumulators follow pandas' ewm / rolling kernels operation by operation
+(Kahan-compensated sums, Welford variance, the same NaN/inf handling), so the
+streamed rows are bit-for-bit identical to a batch recompute, not just close.
+
+Dynamic (user-configured) indicators are not streamed; they are cheap and
+are simply recomputed on top of the streamed frame.
+"""
+import copy
+import math
+import uuid
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from analysis_utils import detect_candlestick_pattern
+from cache import get_cached, set_cache
+from indicators import (
+    BASE_COLUMNS, GUPPY_SHORT_PERIODS, GUPPY_LONG_PERIODS,
+    calculate_indicators, apply_dynamic_indicators,
+)
+
+NaN = float('nan')
+
+# Below this many bars the batch path is used (warm-up back-fills and the
+# ATR seed are only exact once every window has filled once).
+MIN_HISTORY = 30
+
+# Frames and states are keyed by (symbol, interval): the cached frame is
+# anchored at its first bar and grows as bars arrive, and each request's
+# window (its period) is a slice of it. They survive until the history itself
+# changes (split/dividend re-adjustment) or a window starts before the anchor.
+STATE_TTL = 7 * 24 * 3600
+MAX_TAIL_ROWS = 64  # streamed rows kept beside the base frame before it is rewritten
+
+# pandas: ill-conditioned once only ~3 significant digits remain
+_INV_COND_TOL = np.finfo(np.float64).eps * 1e3
+
+PATTERN_WINDOW = 20   # bars handed to detect_candlestick_pattern
+PATTERN_MIN_INDEX = 15
+
+
+def _clean(val):
+    """pandas' window functions treat +/-inf as missing."""
+    return NaN if val in (math.inf, -math.inf) else val
+
+
+def _div(num, den):
+    """Division with numpy semantics (x/0 -> +/-inf, 0/0 -> nan)."""
+    if den == 0:
+        if num != num or num == 0:
+            return NaN
+        return math.copysign(math.inf, num) * math.copysign(1.0, den)
+    return num / den
+
+
+def _nanmean(values):
+    total, count = 0.0, 0
+    for v in values:
+        if v == v:
+            total += v
+            count += 1
+    return total / count if count else NaN
+
+
+class _Ewm:
+    """Series.ewm(..., adjust=False).mean(), one value at a time."""
+
+    def __init__(self, span=None, alpha=None, min_periods=0):
+        self.com = float((span - 1) / 2) if span is not None else float((1 - alpha) / alpha)
+        self.alpha = 1. / (1. + self.com)
+        self.old_wt_factor = 1. - self.alpha
+        self.new_wt = self.alpha
+        self.min_periods = max(int(min_periods), 1)
+        self.weighted = None
+        self.old_wt = 1.
+        self.nobs = 0
+
+    def update(self, cur):
+        cur = _clean(cur)
+        is_observation = cur == cur
+        if self.weighted is None:
+            self.weighted = cur
+            self.nobs = int(is_observation)
+        else:
+            self.nobs += is_observation
+            weighted = self.weighted
+            if weighted == weighted:
+                self.old_wt *= self.old_wt_factor
+                if is_observation:
+                    if weighted != cur:
+                        if self.com == 1:
+                            self.new_wt = 1. - self.old_wt
+                        weighted = self.old_wt * weighted + self.new_wt * cur
+                        weighted /= (self.old_wt + self.new_wt)
+                    self.old_wt = 1.
+            elif is_observation:
+                weighted = cur
+            self.weighted = weighted
+        return self.weighted if self.nobs >= self.min_periods else NaN
+
+
+class _RollingSum:
+    """Series.rolling(window).sum() with pandas' Kahan accumulator."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = - val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+
+    def _push(self, val):
+        val = _clean(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        elif len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+        self.values.append(val)
+
+    def update(self, val):
+        self._push(val)
+        if self.nobs >= self.window:
+            if self.num_consecutive_same_value >= self.nobs:
+                return self.prev_value * self.nobs
+            return self.sum_x
+        return NaN
+
+
+class _RollingMean(_RollingSum):
+    """Series.rolling(window).mean(), including pandas' sign clamping."""
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.neg_ct = 0
+
+    def _add(self, val):
+        super()._add(val)
+        if val == val and math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+
+    def _remove(self, val):
+        super()._remove(val)
+        if val == val and math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, val):
+        self._push(val)
+        nobs = self.nobs
+        if nobs >= self.window and nobs > 0:
+            result = self.sum_x / nobs
+            if self.num_consecutive_same_value >= nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.
+            elif self.neg_ct == nobs and result > 0:
+                result = 0.
+            return result
+        return NaN
+
+
+class _RollingVar:
+    """Series.rolling(window).var(ddof) via pandas' Welford/Kahan kernel."""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self._reset()
+
+    def _reset(self):
+        self.nobs = 0.
+        self.mean_x = 0.
+        self.ssqdm_x = 0.
+        self.compensation_add = 0.
+        self.compensation_remove = 0.
+        self.numerically_unstable = False
+
+    def _add(self, val):
+        if val != val:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs += 1
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+        if prev_m2 * _INV_COND_TOL > self.ssqdm_x:
+            self.numerically_unstable = True
+
+    def _remove(self, val):
+        if val != val:
+            return
+        prev_m2 = self.ssqdm_x
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = val - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            if prev_m2 * _INV_COND_TOL > self.ssqdm_x:
+                self.numerically_unstable = True
+        else:
+            self.mean_x = 0.
+            self.ssqdm_x = 0.
+            self.numerically_unstable = False
+
+    def update(self, val):
+        val = _clean(val)
+        first = not self.values
+        if not first:
+            if len(self.values) == self.window:
+                self._remove(self.values.popleft())
+            self._add(val)
+        self.values.append(val)
+
+        if first or self.numerically_unstable:
+            self._reset()
+            for v in self.values:
+                self._add(v)
+            self.numerically_unstable = False
+
+        if self.nobs >= self.window and self.nobs > self.ddof:
+            return self.ssqdm_x / (self.nobs - self.ddof)
+        return NaN
+
+
+class _RollingExtreme:
+    """Series.rolling(window).max() / .min()."""
+
+    def __init__(self, window, func):
+        self.values = deque(maxlen=window)
+        self.window = window
+        self.func = func
+
+    def update(self, val):
+        self.values.append(_clean(val))
+        present = [v for v in self.values if v == v]
+        return self.func(present) if len(present) >= self.window else NaN
+
+
+class _Atr:
+    """ta.volatility.AverageTrueRange: mean seed, then Wilder smoothing."""
+
+    def __init__(self, window):
+        self.window = window
+        self.seed = []
+        self.value = 0.
+
+    def update(self, tr):
+        if len(self.seed) < self.window:
+            self.seed.append(tr)
+            if len(self.seed) == self.window:
+                self.value = pd.Series(self.seed).mean()
+            return self.value
+        self.value = (self.value * (self.window - 1) + tr) / float(self.window)
+        return self.value
+
+
+class IndicatorState:
+    """
+    Everything needed to append bars to a calculate_indicators() frame.
+
+    Build it once from the OHLCV history with from_ohlcv(), then call
+    extend(frame, new_bars). Passing a bar with the same timestamp as the
+    frame's last row revises that bar (a still-forming daily/intraday bar).
+    The object pickles cleanly, see save_state()/load_state().
+    """
+
+    def __init__(self):
+        self.bars = 0
+        self.last_index = None
+        self.prev_close = NaN
+        self.prev_high = NaN
+        self.prev_low = NaN
+
+        self.macd_fast = _Ewm(span=12, min_periods=12)
+        self.macd_slow = _Ewm(span=26, min_periods=26)
+        self.macd_sign = _Ewm(span=9, min_periods=9)
+        self.rsi_up = _Ewm(alpha=1 / 14, min_periods=14)
+        self.rsi_down = _Ewm(alpha=1 / 14, min_periods=14)
+        self.emas = {w: _Ewm(span=w, min_periods=w) for w in (13, 22, 26, 50, 200)}
+
+        self.high_14 = _RollingExtreme(14, max)
+        self.low_14 = _RollingExtreme(14, min)
+        self.stoch_d = _RollingMean(3)
+        self.price_atr = _Atr(14)
+        self.volume_sma = _RollingMean(20)
+
+        self.efi = _Ewm(span=13)
+        self.efi_signal = _Ewm(span=13)
+        self.efi_atr = _Ewm(span=22)
+        self.force_2 = _Ewm(span=2)
+
+        self.pen_sum = _RollingSum(22)
+        self.pen_count = _RollingSum(22)
+        self.up_sum = _RollingSum(22)
+        self.up_count = _RollingSum(22)
+
+        self.guppy = {p: _Ewm(span=p, min_periods=p) for p in GUPPY_SHORT_PERIODS + GUPPY_LONG_PERIODS}
+
+        self.bb_mean = _RollingMean(20)
+        self.bb_var = _RollingVar(20, ddof=0)
+
+        self.atr_22 = _Atr(22)
+        self.high_22 = _RollingExtreme(22, max)
+        self.low_22 = _RollingExtreme(22, min)
+        self.vstop_trend = 1
+        self.vstop_stop = 0.0
+
+        # Values of the previous bar used by diff()/shift() style columns
+        self.prev = {'ema_13': NaN, 'macd_diff': NaN, 'efi': NaN,
+                     'buy_zone': False, 'sell_zone': False,
+                     'guppy_short_avg': NaN, 'guppy_long_avg': NaN}
+
+        self.tail = deque(maxlen=PATTERN_WINDOW)  # (Open, High, Low, Close)
+        self.checkpoint = None  # state before the last bar, for revisions
+
+    @classmethod
+    def from_ohlcv(cls, df):
+        """Replay an OHLCV history (no pattern detection, no output)."""
+        state = cls()
+        state._advance(df, collect=False)
+        return state
+
+    def extend(self, frame, new_bars):
+        """
+        Return `frame` with `new_bars` appended and their indicator columns
+        filled in. `frame` must be the calculate_indicators() output this
+        state was built from.
+        """
+        if len(new_bars) == 0:
+            return frame
+        if frame.index[-1] != self.last_index:
+            raise ValueError("Indicator state does not match the frame's last bar")
+
+        if new_bars.index[0] == self.last_index:
+            if self.checkpoint is None:
+                raise ValueError("Cannot revise the last bar without a checkpoint")
+            self.__dict__.update(self.checkpoint.__dict__)
+            frame = frame.iloc[:-1]
+
+        rows = self._advance(new_bars, collect=True)
+        new = pd.DataFrame(rows, index=new_bars.index)
+        for col in frame.columns:
+            if col not in new.columns:
+                new[col] = new_bars[col] if col in new_bars.columns else NaN
+        new = new[frame.columns].astype(frame.dtypes.to_dict())
+        out = pd.concat([frame, new])
+        # An all-None pattern column is object dtype; re-infer like the batch path does
+        for col in frame.columns[frame.dtypes == object]:
+            out[col] = out[col].tolist()
+        return out
+
+    def _advance(self, bars, collect):
+        opens = bars['Open'].to_numpy(dtype=float)
+        highs = bars['High'].to_numpy(dtype=float)
+        lows = bars['Low'].to_numpy(dtype=float)
+        closes = bars['Close'].to_numpy(dtype=float)
+        volumes = bars['Volume'].to_numpy(dtype=float)
+
+        rows = []
+        last = len(bars) - 1
+        for k in range(len(bars)):
+            if k == last:
+                checkpoint = copy.copy(self)
+                checkpoint.checkpoint = None
+                self.checkpoint = copy.deepcopy(checkpoint)
+            row = self._step(opens[k], highs[k], lows[k], closes[k], volumes[k], collect)
+            if collect:
+                rows.append(row)
+        self.last_index = bars.index[-1]
+        return rows
+
+    def _step(self, o, h, l, c, v, collect):
+        i = self.bars
+        prev_close, prev_high, prev_low = self.prev_close, self.prev_high, self.prev_low
+        prev = self.prev
+        row = {}
+
+        # MACD / RSI / EMAs
+        macd = self.macd_fast.update(c) - self.macd_slow.update(c)
+        macd_signal = self.macd_sign.update(macd)
+        macd_diff = macd - macd_signal
+        row.update(macd=macd, macd_signal=macd_signal, macd_diff=macd_diff)
+
+        change = c - prev_close
+        up = change if change > 0 else 0.0
+        down = -(change if change < 0 else 0.0)
+        ema_up = self.rsi_up.update(up)
+        ema_down = self.rsi_down.update(down)
+        row['rsi'] = 100.0 if ema_down == 0 else 100 - (100 / (1 + ema_up / ema_down))
+
+        for w, ewm in self.emas.items():
+            row[f'ema_{w}'] = ewm.update(c)
+
+        # Candle patterns only need the last 20 bars
+        self.tail.append((o, h, l, c))
+        if collect:
+            p_name = p_type = None
+            if i >= PATTERN_MIN_INDEX:
+                subset = pd.DataFrame(list(self.tail), columns=['Open', 'High', 'Low', 'Close'])
+                p_name, p_type = detect_candlestick_pattern(subset)
+            row['candle_pattern'] = p_name
+            row['candle_pattern_type'] = p_type
+
+        # Oscillators
+        hh14 = self.high_14.update(h)
+        ll14 = self.low_14.update(l)
+        row['williams_r'] = _div(-100 * (hh14 - c), hh14 - ll14)
+        stoch_k = _div(100 * (c - ll14), hh14 - ll14)
+        row['stoch_k'] = stoch_k
+        row['stoch_d'] = self.stoch_d.update(stoch_k)
+
+        # Price ATR channels
+        tr = max(x for x in (h - l, abs(h - prev_close), abs(l - prev_close)) if x == x)
+        atr = self.price_atr.update(tr)
+        ema_22 = row['ema_22']
+        row['price_atr'] = atr
+        for m in (1, 2, 3):
+            row[f'price_atr_h{m}'] = ema_22 + atr * m
+            row[f'price_atr_l{m}'] = ema_22 - atr * m
+        row['envelope_upper'] = row['price_atr_h2']
+        row['envelope_lower'] = row['price_atr_l2']
+
+        row['volume_sma_20'] = self.volume_sma.update(v)
+
+        # Impulse / Elder-ray
+        ema_13 = row['ema_13']
+        ema_slope = ema_13 - prev['ema_13']
+        macd_slope = macd_diff - prev['macd_diff']
+        row['ema_13_slope'] = ema_slope
+        row['macd_diff_slope'] = macd_slope
+        if ema_slope != ema_slope or macd_slope != macd_slope:
+            row['impulse'] = "blue"
+        elif ema_slope > 0 and macd_slope > 0:
+            row['impulse'] = "green"
+        elif ema_slope < 0 and macd_slope < 0:
+            row['impulse'] = "red"
+        else:
+            row['impulse'] = "blue"
+        row['bulls_power'] = h - ema_13
+        row['bears_power'] = l - ema_13
+
+        # EFI and its ATR bands
+        raw_force = (c - prev_close) * v
+        efi = self.efi.update(raw_force)
+        efi_signal = self.efi_signal.update(efi)
+        efi_atr = self.efi_atr.update(abs(efi - prev['efi']))
+        row['efi'] = efi
+        row['efi_signal'] = efi_signal
+        for m in (1, 2, 3):
+            row[f'efi_atr_h{m}'] = efi_signal + efi_atr * m
+            row[f'efi_atr_l{m}'] = efi_signal - efi_atr * m
+        truncated = efi
+        if efi > efi_signal + efi_atr * 5:
+            truncated = efi_signal + efi_atr * 4
+        if efi < efi_signal - efi_atr * 5:
+            truncated = efi_signal - efi_atr * 4
+        row['efi_truncated'] = truncated
+        buy_zone = bool(efi <= row['efi_atr_l3'])
+        sell_zone = bool(efi >= row['efi_atr_h3'])
+        row['efi_buy_signal'] = buy_zone and not prev['buy_zone']
+        row['efi_sell_signal'] = sell_zone and not prev['sell_zone']
+
+        row['force_index_13'] = efi
+        row['force_index_2'] = self.force_2.update(raw_force)
+
+        # SafeZone
+        down_pen = prev_low - l
+        if down_pen < 0:
+            down_pen = 0.0
+        pen_sum = self.pen_sum.update(down_pen)
+        pen_count = self.pen_count.update(1.0 if down_pen > 0 else 0.0)
+        row['safezone_long'] = l - (2.5 * (pen_sum / (1.0 if pen_count == 0 else pen_count)))
+        up_pen = h - prev_high
+        if up_pen < 0:
+            up_pen = 0.0
+        up_sum = self.up_sum.update(up_pen)
+        up_count = self.up_count.update(1.0 if up_pen > 0 else 0.0)
+        row['safezone_short'] = h + (2.5 * (up_sum / (1.0 if up_count == 0 else up_count)))
+
+        # Guppy
+        for p in GUPPY_SHORT_PERIODS:
+            row[f'guppy_short_{p}'] = self.guppy[p].update(c)
+        for p in GUPPY_LONG_PERIODS:
+            row[f'guppy_long_{p}'] = self.guppy[p].update(c)
+        short_avg = _nanmean([row[f'guppy_short_{p}'] for p in GUPPY_SHORT_PERIODS])
+        long_avg = _nanmean([row[f'guppy_long_{p}'] for p in GUPPY_LONG_PERIODS])
+        row['guppy_short_avg'] = short_avg
+        row['guppy_long_avg'] = long_avg
+        signal = 0
+        if short_avg > long_avg and prev['guppy_short_avg'] <= prev['guppy_long_avg']:
+            signal = 1
+        if short_avg < long_avg and prev['guppy_short_avg'] >= prev['guppy_long_avg']:
+            signal = -1
+        row['guppy_signal'] = signal
+
+        # Bollinger Bands
+        bb_middle = self.bb_mean.update(c)
+        var = self.bb_var.update(c)
+        std = 0.0 if var < 0 else math.sqrt(var) if var == var else NaN
+        row['bb_upper'] = bb_middle + 2 * std
+        row['bb_middle'] = bb_middle
+        row['bb_lower'] = bb_middle - 2 * std
+
+        # Volatility stop
+        atr_22 = self.atr_22.update(tr)
+        hh22 = self.high_22.update(h)
+        ll22 = self.low_22.update(l)
+        row['atr_val'] = atr_22
+        if i < 22:
+            row['volatility_stop'] = NaN
+        else:
+            long_stop = hh22 - (atr_22 * 3.0)
+            short_stop = ll22 + (atr_22 * 3.0)
+            if self.vstop_trend == 1:
+                if c < self.vstop_stop:
+                    self.vstop_trend = -1
+                    self.vstop_stop = short_stop
+                else:
+                    self.vstop_stop = max(self.vstop_stop, long_stop)
+            else:
+                if c > self.vstop_stop:
+                    self.vstop_trend = 1
+                    self.vstop_stop = long_stop
+                else:
+                    self.vstop_stop = min(self.vstop_stop, short_stop)
+            row['volatility_stop'] = self.vstop_stop
+
+        prev.update(ema_13=ema_13, macd_diff=macd_diff, efi=efi,
+                    buy_zone=buy_zone, sell_zone=sell_zone,
+                    guppy_short_avg=short_avg, guppy_long_avg=long_avg)
+        self.prev_close, self.prev_high, self.prev_low = c, h, l
+        self.bars = i + 1
+        return row
+
+
+# ---------------------------------------------------------
+# Persistence per (symbol, interval)
+# ---------------------------------------------------------
+# The full frame is written once, when it is computed in batch (the "base").
+# Each update then writes only the state plus the rows since the base (the
+# appended bars and the revised last bar); loading splices them onto the
+# base. Past MAX_TAIL_ROWS the frame is written out as a new base, starting
+# at the current window so the anchored history does not grow without bound.
+
+def _key(kind, symbol, interval):
+    return f"indicator_{kind}_{symbol}_{interval}"
+
+
+def save_base(symbol, interval, frame, state=None):
+    """Write `frame` as the new base, with no streamed rows on top of it."""
+    token = uuid.uuid4().hex
+    set_cache(_key("frame", symbol, interval), {'token': token, 'frame': frame})
+    save_state(symbol, interval, token, len(frame), frame, state)
+
+
+def save_state(symbol, interval, token, start, frame, state):
+    """Write `state` and the rows of `frame` from position `start` on, on top of base `token`."""
+    set_cache(_key("state", symbol, interval),
+              {'base': token, 'start': start, 'rows': frame.iloc[start:], 'state': state})
+
+
+def load_state(symbol, interval):
+    """
+    Return (frame, state, token, start) for the history; everything is None
+    when nothing (or an inconsistent base/state pair) is cached.
+    """
+    entry = get_cached(_key("state", symbol, interval), ttl=STATE_TTL)
+    base = get_cached(_key("frame", symbol, interval), ttl=STATE_TTL)
+    if not isinstance(entry, dict) or not isinstance(base, dict) or entry.get('base') != base.get('token'):
+        return None, None, None, None
+    start, rows = entry['start'], entry['rows']
+    frame = base['frame'] if not len(rows) else pd.concat([base['frame'].iloc[:start], rows])
+    return frame, entry['state'], entry['base'], start
+
+
+def _appended_bars(frame, ohlcv):
+    """
+    If `ohlcv` starts at one of `frame`'s bars and continues its history
+    with new bars (optionally with the last bar revised), return (position
+    of ohlcv's first bar in frame, bars to feed to extend()); otherwise None.
+    """
+    first = frame.index.searchsorted(ohlcv.index[0])
+    if first == len(frame) or frame.index[first] != ohlcv.index[0]:
+        return None
+    n = len(frame) - first
+    if len(ohlcv) < n or not ohlcv.index[:n].equals(frame.index[first:]):
+        return None
+    cols = list(BASE_COLUMNS)
+    old = frame[cols].iloc[first:].to_numpy(dtype=float)
+    cur = ohlcv[cols].iloc[:n].to_numpy(dtype=float)
+    if not np.array_equal(old[:-1], cur[:-1], equal_nan=True):
+        return None
+    start = n if np.array_equal(old[-1], cur[-1], equal_nan=True) else n - 1
+    return first, ohlcv.iloc[start:]
+
+
+def stream_indicators(symbol, interval, df, dynamic_configs=None, outputs=None, profile=None):
+    """
+    calculate_indicators() for a (symbol, interval) history that mostly
+    repeats the previous request: appended or revised bars are streamed
+    through the cached IndicatorState instead of recomputing everything.
+
+    The cached frame is anchored at its first bar. A window that starts
+    inside it (a period fetch that dropped its oldest bars as new ones
+    arrived, or a shorter period) is served as a slice of the anchored
+    frame, so its indicators are warmed up on the longer history. A window
+    starting before the anchor, or revised history, is computed in batch
+    and becomes the new anchor.
+
+    outputs/profile (as for calculate_indicators) only matter when nothing
+    is cached for the history: the partial frame is computed lazily and is
+    not cached, since only full frames can be streamed. A cached full frame
+    is always used as is.
+    """
+    if len(df) < MIN_HISTORY:
+        return calculate_indicators(df, dynamic_configs=dynamic_configs, outputs=outputs, profile=profile)
+
+    frame, state, token, start = load_state(symbol, interval)
+    match = _appended_bars(frame, df) if frame is not None else None
+
+    if match is None and (outputs is not None or profile is not None):
+        return calculate_indicators(df, dynamic_configs=dynamic_configs, outputs=outputs, profile=profile)
+    if match is None:
+        first, frame = 0, calculate_indicators(df)
+        save_base(symbol, interval, frame)  # the state is built on the first update
+    else:
+        first, new_bars = match
+        if len(new_bars):
+            if state is None:
+                state = IndicatorState.from_ohlcv(frame)
+            # A revised last bar rewrites that row too
+            start = min(start, len(frame) - int(new_bars.index[0] == frame.index[-1]))
+            frame = state.extend(frame, new_bars)
+            if len(frame) - start > MAX_TAIL_ROWS:
+                frame, first = frame.iloc[first:], 0
+                save_base(symbol, interval, frame, state)
+            else:
+                save_state(symbol, interval, token, start, frame, state)
+
+    frame = frame.iloc[first:].copy()
+    if dynamic_configs:
+        apply_dynamic_indicators(frame, dynamic_configs)
+    return frame
@@ -0,0 +1,538 @@
+"""
+Indicator graph behind calculate_indicators.
+
+Every indicator is declared with the columns it reads and the columns it
+writes. Callers can ask for a set of output columns and only the part of
+the graph needed to produce them is evaluated; asking for nothing computes
+the full set, exactly as before.
+
+Named profiles (PROFILES, at the end of this module) bundle an output set
+with per-indicator options, e.g. candlestick patterns on the last bar only.
+"""
+import logging
+import numpy as np
+import pandas as pd
+import ta
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from analysis_utils import detect_candlestick_pattern
+from kernels import ema_bank, first_crossing, volatility_stop
+
+logger = logging.getLogger(__name__)
+
+BASE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+GUPPY_SHORT_PERIODS = [3, 5, 8, 10, 12, 15]
+GUPPY_LONG_PERIODS = [30, 35, 40, 45, 50, 60]
+EMA_WINDOWS = [13, 22, 26, 50, 200]
+PATTERN_CONTEXT = 20  # bars a candlestick pattern is detected on (5-bar patterns, 15-bar body average)
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    name: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    func: Callable[..., None]  # func(df, **profile options) adds the outputs to df
+
+
+# Registration order is evaluation order (and the column order of the full frame)
+INDICATORS: Dict[str, IndicatorSpec] = {}
+_PRODUCERS: Dict[str, str] = {}  # output column -> indicator name
+
+
+def indicator(name: str, inputs: Iterable[str], outputs: Iterable[str]):
+    """Register an indicator node. Inputs must be OHLCV or outputs of earlier nodes."""
+    def register(func):
+        for col in inputs:
+            if col not in BASE_COLUMNS and col not in _PRODUCERS:
+                raise ValueError(f"Indicator '{name}' depends on unknown column '{col}'")
+        INDICATORS[name] = IndicatorSpec(name, tuple(inputs), tuple(outputs), func)
+        for col in outputs:
+            _PRODUCERS[col] = name
+        return func
+    return register
+
+
+def resolve_indicators(outputs: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Return the indicator names needed to produce `outputs`, in evaluation order.
+    `outputs` may mix column names ('impulse') and indicator names ('guppy').
+    None means every registered indicator.
+    """
+    if outputs is None:
+        return list(INDICATORS)
+
+    needed = set()
+    pending = list(outputs)
+    while pending:
+        key = pending.pop()
+        if key in BASE_COLUMNS:
+            continue
+        name = key if key in INDICATORS else _PRODUCERS.get(key)
+        if name is None:
+            raise ValueError(f"Unknown indicator output: {key}")
+        if name in needed:
+            continue
+        needed.add(name)
+        pending.extend(INDICATORS[name].inputs)
+
+    return [name for name in INDICATORS if name in needed]
+
+
+def available_outputs() -> List[str]:
+    """All output columns the graph can produce, in full-frame order."""
+    return [col for spec in INDICATORS.values() for col in spec.outputs]
+
+
+def calculate_indicators(df, dynamic_configs=None, outputs=None, compact=False, profile=None):
+    """
+    Compute indicator columns on an OHLCV frame.
+
+    outputs: optional list of columns (or indicator names) the caller needs.
+             Only the required subgraph is evaluated; None computes everything.
+    compact: store indicators in the compact representation (see compact_frame).
+             The bytes saved are recorded in df.attrs['compact_bytes_saved'].
+    profile: name of a PROFILES entry. Its outputs are used when `outputs` is
+             not given, and its per-indicator options apply.
+    """
+    if len(df) < 2:
+        return df
+
+    options = {}
+    if profile is not None:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown indicator profile: {profile}")
+        options = PROFILES[profile].options
+        if outputs is None:
+            outputs = PROFILES[profile].outputs
+
+    for name in resolve_indicators(outputs):
+        INDICATORS[name].func(df, **options.get(name, {}))
+
+    if dynamic_configs:
+        apply_dynamic_indicators(df, dynamic_configs)
+
+    if compact:
+        df.attrs['compact_bytes_saved'] = compact_frame(df)
+
+    return df
+
+
+def compact_frame(df, keep=BASE_COLUMNS):
+    """
+    Shrink an indicator frame in place: float64 columns become float32 and
+    string columns become categoricals. Columns in `keep` (OHLCV by default)
+    are left at full precision. Returns the number of bytes saved.
+
+    float32 keeps ~7 significant digits, fine for screening and plotting but
+    not for anything that must match the full-precision values exactly.
+    """
+    before = df.memory_usage(deep=True).sum()
+
+    for col in df.columns:
+        if col in keep:
+            continue
+        dtype = df[col].dtype
+        if dtype == np.float64:
+            df[col] = df[col].astype(np.float32)
+        elif dtype == object or pd.api.types.is_string_dtype(dtype):
+            df[col] = df[col].astype('category')
+
+    saved = int(before - df.memory_usage(deep=True).sum())
+    logger.debug(f"Compact indicator frame: {len(df)} rows, saved {saved / 1024:.1f} KB")
+    return saved
+
+
+# ---------------------------------------------------------
+# Indicator declarations
+# ---------------------------------------------------------
+
+@indicator("macd", inputs=["Close"], outputs=["macd", "macd_signal", "macd_diff"])
+def _macd(df):
+    df['macd'] = ta.trend.macd(df['Close'])
+    df['macd_signal'] = ta.trend.macd_signal(df['Close'])
+    df['macd_diff'] = ta.trend.macd_diff(df['Close'])
+
+
+@indicator("rsi", inputs=["Close"], outputs=["rsi"])
+def _rsi(df):
+    df['rsi'] = ta.momentum.rsi(df['Close'], window=14)
+
+
+@indicator("ema", inputs=["Close"], outputs=["ema_13", "ema_22", "ema_26", "ema_50", "ema_200"])
+def _ema(df):
+    # All fixed spans from one EMA bank pass over Close
+    bank = ema_bank(df['Close'].to_numpy(), EMA_WINDOWS)
+    for k, window in enumerate(EMA_WINDOWS):
+        df[f'ema_{window}'] = bank[:, k]
+
+
+@indicator("candle_patterns", inputs=["Open", "High", "Low", "Close"],
+           outputs=["candle_pattern", "candle_pattern_type"])
+def _candle_patterns(df, last_bars=None):
+    # Candlestick Patterns (Whole History, or only the last `last_bars` bars; the rest stay None)
+    patterns = [None] * len(df)
+    p_types = [None] * len(df)
+
+    # We need up to 5 bars for complex patterns, plus at least 15 bars for body average
+    first = 15 if last_bars is None else max(15, len(df) - last_bars)
+    for i in range(first, len(df)):
+        subset_start = max(0, i - (PATTERN_CONTEXT - 1)) # 20 bars total for context
+        subset = df.iloc[subset_start:i+1]
+        p_name, p_type = detect_candlestick_pattern(subset)
+        patterns[i] = p_name
+        p_types[i] = p_type
+
+    df['candle_pattern'] = patterns
+    df['candle_pattern_type'] = p_types
+
+
+# Oscillators for Screen 2
+@indicator("williams_r", inputs=["High", "Low", "Close"], outputs=["williams_r"])
+def _williams_r(df):
+    df['williams_r'] = ta.momentum.williams_r(df['High'], df['Low'], df['Close'], lbp=14)
+
+
+@indicator("stochastic", inputs=["High", "Low", "Close"], outputs=["stoch_k", "stoch_d"])
+def _stochastic(df):
+    stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'], window=14, smooth_window=3)
+    df['stoch_k'] = stoch.stoch()
+    df['stoch_d'] = stoch.stoch_signal()
+
+
+@indicator("price_atr_channels", inputs=["High", "Low", "Close", "ema_22"],
+           outputs=["price_atr", "price_atr_h1", "price_atr_l1", "price_atr_h2", "price_atr_l2",
+                    "price_atr_h3", "price_atr_l3", "envelope_upper", "envelope_lower"])
+def _price_atr_channels(df):
+    # 22-period EMA (from the "ema" node) is the centerline for Price ATR Channels
+    df['price_atr'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=14)
+
+    # Price ATR Channels (1, 2, and 3 multipliers)
+    df['price_atr_h1'] = df['ema_22'] + df['price_atr'] * 1
+    df['price_atr_l1'] = df['ema_22'] - df['price_atr'] * 1
+    df['price_atr_h2'] = df['ema_22'] + df['price_atr'] * 2
+    df['price_atr_l2'] = df['ema_22'] - df['price_atr'] * 2
+    df['price_atr_h3'] = df['ema_22'] + df['price_atr'] * 3
+    df['price_atr_l3'] = df['ema_22'] - df['price_atr'] * 3
+
+    # Backwards compatibility for existing series naming if needed
+    df['envelope_upper'] = df['price_atr_h2'] # Use level 2 as default substitute
+    df['envelope_lower'] = df['price_atr_l2']
+
+
+@indicator("volume_sma", inputs=["Volume"], outputs=["volume_sma_20"])
+def _volume_sma(df):
+    df['volume_sma_20'] = ta.trend.sma_indicator(df['Volume'], window=20)
+
+
+# --- Alex Elder Indicators ---
+@indicator("impulse", inputs=["ema_13", "macd_diff"], outputs=["ema_13_slope", "macd_diff_slope", "impulse"])
+def _impulse(df):
+    # 1. Elder Impulse System
+    df['ema_13_slope'] = df['ema_13'].diff()
+    df['macd_diff_slope'] = df['macd_diff'].diff()
+
+    # Green when both slopes rise, red when both fall, blue otherwise (NaN compares False)
+    ema_slope = df['ema_13_slope'].to_numpy(dtype=float)
+    macd_slope = df['macd_diff_slope'].to_numpy(dtype=float)
+    impulse = np.full(len(df), "blue", dtype=object)
+    impulse[(ema_slope > 0) & (macd_slope > 0)] = "green"
+    impulse[(ema_slope < 0) & (macd_slope < 0)] = "red"
+    df['impulse'] = impulse
+
+
+@indicator("elder_ray", inputs=["High", "Low", "ema_13"], outputs=["bulls_power", "bears_power"])
+def _elder_ray(df):
+    # 2. Elder-ray Index
+    df['bulls_power'] = df['High'] - df['ema_13']
+    df['bears_power'] = df['Low'] - df['ema_13']
+
+
+@indicator("efi", inputs=["Close", "Volume"], outputs=["efi", "efi_signal"])
+def _efi(df):
+    # 3. Force Index (EFI) with ATR Channels
+    # EFI = 13-period EMA of (Close - Close[1]) * Volume
+    raw_force = (df['Close'] - df['Close'].shift(1)) * df['Volume']
+    df['efi'] = raw_force.ewm(span=13, adjust=False).mean()
+
+    # Sig = 13-period EMA of EFI (Averaged Force)
+    df['efi_signal'] = df['efi'].ewm(span=13, adjust=False).mean()
+
+
+@indicator("efi_bands", inputs=["efi", "efi_signal"],
+           outputs=["efi_atr_h1", "efi_atr_l1", "efi_atr_h2", "efi_atr_l2", "efi_atr_h3", "efi_atr_l3",
+                    "efi_truncated", "efi_buy_signal", "efi_sell_signal"])
+def _efi_bands(df):
+    # EFI ATR = smoothed absolute bar-to-bar change of EFI
+    # Using 22-period smoothing for more stable bands, reducing false zone entries.
+    efi_range = (df['efi'] - df['efi'].shift(1)).abs()
+    efi_atr = efi_range.ewm(span=22, adjust=False).mean()
+
+    # Upper/Lower Bands centered on Signal
+    df['efi_atr_h1'] = df['efi_signal'] + efi_atr * 1
+    df['efi_atr_l1'] = df['efi_signal'] - efi_atr * 1
+    df['efi_atr_h2'] = df['efi_signal'] + efi_atr * 2
+    df['efi_atr_l2'] = df['efi_signal'] - efi_atr * 2
+    df['efi_atr_h3'] = df['efi_signal'] + efi_atr * 3
+    df['efi_atr_l3'] = df['efi_signal'] - efi_atr * 3
+
+    # Truncation Logic (Extreme Value Handling)
+    # Increased to 5-ATR so that 3nd-ATR signals are clearly visible as penetrations
+    efi_ob_h = df['efi_signal'] + efi_atr * 5
+    efi_ob_l = df['efi_signal'] - efi_atr * 5
+
+    df['efi_truncated'] = df['efi']
+    df.loc[df['efi'] > efi_ob_h, 'efi_truncated'] = df['efi_signal'] + efi_atr * 4
+    df.loc[df['efi'] < efi_ob_l, 'efi_truncated'] = df['efi_signal'] - efi_atr * 4
+
+    # Signal Dots (EFI hitting or exceeding 3-ATR) - Trigger Logic (First crossover)
+    # Increased threshold to 3-ATR to capture true momentum exhausts.
+    # Only the bar entering a zone fires; later bars inside it do not.
+    efi_in_buy_zone = (df['efi'] <= df['efi_atr_l3'])
+    efi_in_sell_zone = (df['efi'] >= df['efi_atr_h3'])
+
+    df['efi_buy_signal'] = first_crossing(efi_in_buy_zone.to_numpy())
+    df['efi_sell_signal'] = first_crossing(efi_in_sell_zone.to_numpy())
+
+    # Remove old/aliased signal names to prevent confusion/persistence
+    if 'efi_extreme_high' in df.columns: del df['efi_extreme_high']
+    if 'efi_extreme_low' in df.columns: del df['efi_extreme_low']
+
+
+@indicator("force_index", inputs=["Close", "Volume", "efi"], outputs=["force_index_13", "force_index_2"])
+def _force_index(df):
+    # Keep compatibility with existing code that might use force_index_13
+    raw_force = (df['Close'] - df['Close'].shift(1)) * df['Volume']
+    df['force_index_13'] = df['efi']
+    df['force_index_2'] = raw_force.ewm(span=2, adjust=False).mean()
+
+
+@indicator("safezone", inputs=["High", "Low"], outputs=["safezone_long", "safezone_short"])
+def _safezone(df):
+    # ---------------------------------------------------------
+    # SafeZone Calculation (Elder)
+    # ---------------------------------------------------------
+    # 1. SafeZone Long (Protects Longs)
+    # Lookback 22, Coeff 2.5
+    sz_period = 22
+    sz_coeff = 2.5
+
+    # Downside Penetration: max(Previous Low - Low, 0)
+    # We shift L by 1 to compare PrevL vs L
+    prev_low = df['Low'].shift(1)
+    downside_penetration = (prev_low - df['Low']).clip(lower=0)
+
+    # Average Downside Penetration: Sum / Count (of penetrations only)
+    # Rolling Sum of Penetrats and Count of Penetrations > 0
+    pen_sum = downside_penetration.rolling(window=sz_period).sum()
+    pen_count = (downside_penetration > 0).astype(int).rolling(window=sz_period).sum()
+
+    # Avoid division by zero
+    avg_pen = pen_sum / pen_count.replace(0, 1)
+
+    # SafeZone Level: Low - (Coeff * AvgPen)
+    # This is the "Stop for Tomorrow" calculated "Today".
+    df['safezone_long'] = df['Low'] - (sz_coeff * avg_pen)
+
+    # 2. SafeZone Short (Protects Shorts)
+    # Upside Penetration: max(High - Previous High, 0)
+    prev_high = df['High'].shift(1)
+    upside_penetration = (df['High'] - prev_high).clip(lower=0)
+
+    up_sum = upside_penetration.rolling(window=sz_period).sum()
+    up_count = (upside_penetration > 0).astype(int).rolling(window=sz_period).sum()
+
+    avg_up_pen = up_sum / up_count.replace(0, 1)
+
+    df['safezone_short'] = df['High'] + (sz_coeff * avg_up_pen)
+
+    # Fill NaN for initial periods
+    df['safezone_long'] = df['safezone_long'].bfill()
+    df['safezone_short'] = df['safezone_short'].bfill()
+
+
+@indicator("guppy", inputs=["Close"],
+           outputs=[f'guppy_short_{p}' for p in GUPPY_SHORT_PERIODS]
+                   + [f'guppy_long_{p}' for p in GUPPY_LONG_PERIODS]
+                   + ["guppy_short_avg", "guppy_long_avg", "guppy_signal"])
+def _guppy(df):
+    # 1. Guppy Multiple Moving Average (GMMA)
+    # Short Term: 3, 5, 8, 10, 12, 15
+    # Long Term: 30, 35, 40, 45, 50, 60
+    periods = GUPPY_SHORT_PERIODS + GUPPY_LONG_PERIODS
+    bank = ema_bank(df['Close'].to_numpy(), periods)
+    n_short = len(GUPPY_SHORT_PERIODS)
+
+    for k, period in enumerate(GUPPY_SHORT_PERIODS):
+        df[f'guppy_short_{period}'] = bank[:, k]
+    for k, period in enumerate(GUPPY_LONG_PERIODS):
+        df[f'guppy_long_{period}'] = bank[:, n_short + k]
+
+    # Guppy Signal: Short Term Group Average vs Long Term Group Average
+    short_avg = _row_nanmean(bank[:, :n_short])
+    long_avg = _row_nanmean(bank[:, n_short:])
+    df['guppy_short_avg'] = short_avg
+    df['guppy_long_avg'] = long_avg
+
+    prev_short = np.concatenate(([np.nan], short_avg[:-1]))
+    prev_long = np.concatenate(([np.nan], long_avg[:-1]))
+    signal = np.zeros(len(df), dtype=np.int64)
+    # Bullish Crossover (Short crosses above Long)
+    signal[(short_avg > long_avg) & (prev_short <= prev_long)] = 1
+    # Bearish Crossover (Short crosses below Long)
+    signal[(short_avg < long_avg) & (prev_short >= prev_long)] = -1
+    df['guppy_signal'] = signal
+
+
+def _row_nanmean(block):
+    """Row mean ignoring NaN (same summation as DataFrame.mean(axis=1))."""
+    missing = np.isnan(block)
+    count = (~missing).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(missing, 0.0, block).sum(axis=1) / count
+
+
+@indicator("bollinger", inputs=["Close"], outputs=["bb_upper", "bb_middle", "bb_lower"])
+def _bollinger(df):
+    # 2. Bollinger Bands (20, 2)
+    bb = ta.volatility.BollingerBands(close=df['Close'], window=20, window_dev=2)
+    df['bb_upper'] = bb.bollinger_hband()
+    df['bb_middle'] = bb.bollinger_mavg()
+    df['bb_lower'] = bb.bollinger_lband()
+
+
+@indicator("volatility_stop", inputs=["High", "Low", "Close"], outputs=["atr_val", "volatility_stop"])
+def _volatility_stop(df):
+    # 3. ATR Volatility Stop (Chandelier Exit-like)
+    # Logic: Long Stop = HighestHigh(22) - 3*ATR(22)
+    #        Short Stop = LowestLow(22) + 3*ATR(22)
+    atr_period = 22
+    atr_mult = 3.0
+
+    atr_obj = ta.volatility.AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=atr_period)
+    df['atr_val'] = atr_obj.average_true_range()
+
+    # Highest High and Lowest Low
+    hh22 = df['High'].rolling(window=atr_period).max()
+    ll22 = df['Low'].rolling(window=atr_period).min()
+
+    chandelier_long = hh22 - (df['atr_val'] * atr_mult)
+    chandelier_short = ll22 + (df['atr_val'] * atr_mult)
+
+    # Determine which stop to use based on trend
+    # Logic: If Close > Previous Short Stop, switch to Long. If Close < Previous Long Stop, switch to Short.
+    # A single 'volatility_stop' line is better for charts than both chandelier levels.
+    df['volatility_stop'] = volatility_stop(df['Close'].to_numpy(), chandelier_long.to_numpy(),
+                                            chandelier_short.to_numpy(), start=atr_period)
+
+
+# ---------------------------------------------------------
+# Profiles
+# ---------------------------------------------------------
+
+@dataclass(frozen=True)
+class IndicatorProfile:
+    """A named output set plus keyword options for individual indicator nodes."""
+    outputs: Optional[Tuple[str, ...]]
+    options: Dict[str, Dict] = field(default_factory=dict)
+
+
+PROFILES: Dict[str, IndicatorProfile] = {
+    # Every indicator over the whole history (charts, backtests)
+    "full": IndicatorProfile(None),
+    # What the watchlist scan decides divergence, EFI status, setup and confluence from.
+    # The weekly impulse of the setup signal is computed on resampled bars by the scanner.
+    "scan": IndicatorProfile(
+        ('macd_diff', 'force_index_2', 'force_index_13',
+         'efi_atr_h3', 'efi_atr_l3', 'efi_buy_signal', 'efi_sell_signal',
+         'candle_pattern', 'candle_pattern_type'),
+        options={'candle_patterns': {'last_bars': 1}},
+    ),
+    # Last-bar value of every column, for the screener's latest_indicators table
+    "screen": IndicatorProfile(
+        tuple(available_outputs()),
+        options={'candle_patterns': {'last_bars': 1}},
+    ),
+    # What the analysis endpoint's regime, tactics and divergence read when the
+    # chart asks for a field projection (see FIELD_GROUPS); patterns on the last bar only
+    "analysis": IndicatorProfile(
+        ('ema_13', 'ema_26', 'ema_50', 'ema_200', 'volume_sma_20', 'rsi', 'macd_diff',
+         'force_index_2', 'force_index_13', 'williams_r', 'stoch_k', 'impulse',
+         'efi_buy_signal', 'efi_sell_signal', 'envelope_upper', 'envelope_lower',
+         'candle_pattern', 'candle_pattern_type'),
+        options={'candle_patterns': {'last_bars': 1}},
+    ),
+}
+
+
+# Named column groups for field projection (the analysis endpoint's `fields`).
+# Members are indicator names or output columns, as resolve_indicators accepts them.
+FIELD_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "emas": ("ema",),
+    "macd": ("macd",),
+    "oscillators": ("rsi", "williams_r", "stochastic"),
+    "elder": ("impulse", "elder_ray", "force_index"),
+    "efi_bands": ("efi", "efi_bands"),
+    "atr_channels": ("price_atr_channels",),
+    "guppy": ("guppy",),
+    "bollinger": ("bollinger",),
+    "stops": ("safezone", "volatility_stop"),
+    "patterns": ("candle_patterns",),
+    "volume": ("volume_sma",),
+}
+
+
+def field_columns(fields: Iterable[str]) -> List[str]:
+    """
+    Output columns selected by `fields` (group names, indicator names or
+    columns), in full-frame order. Raises ValueError on an unknown name.
+    """
+    wanted = set()
+    for key in fields:
+        for member in FIELD_GROUPS.get(key, (key,)):
+            if member in INDICATORS:
+                wanted.update(INDICATORS[member].outputs)
+            elif member in _PRODUCERS:
+                wanted.add(member)
+            else:
+                raise ValueError(f"Unknown field: {key}")
+    return [col for col in available_outputs() if col in wanted]
+
+
+# --- DYNAMIC INDICATORS ---
+def apply_dynamic_indicators(df, dynamic_configs):
+    for config in dynamic_configs:
+        ctype = config.get('type')
+        params = config.get('params', {})
+
+        if ctype == 'ema':
+            window = params.get('window', 13)
+            col_name = f'ema_{window}'
+            if col_name not in df.columns:
+                df[col_name] = ta.trend.ema_indicator(df['Close'], window=window)
+
+        elif ctype == 'sma':
+            window = params.get('window', 20)
+            col_name = f'sma_{window}'
+            if col_name not in df.columns:
+                df[col_name] = ta.trend.sma_indicator(df['Close'], window=window)
+
+        elif ctype == 'rsi':
+            window = params.get('window', 14)
+            col_name = f'rsi_{window}'
+            if col_name not in df.columns:
+                df[col_name] = ta.momentum.rsi(df['Close'], window=window)
+
+        elif ctype == 'macd':
+            fast = params.get('fast', 12)
+            slow = params.get('slow', 26)
+            sign = params.get('signal', 9)
+            # We need to be careful with column naming if multiple MACDs are requested
+            prefix = f'macd_{fast}_{slow}_{sign}'
+            if f'{prefix}_diff' not in df.columns:
+                macd = ta.trend.MACD(df['Close'], window_fast=fast, window_slow=slow, window_sign=sign)
+                df[f'{prefix}'] = macd.macd()
+                df[f'{prefix}_signal'] = macd.macd_signal()
+                df[f'{prefix}_diff'] = macd.macd_diff()
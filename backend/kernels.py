@@ -0,0 +1,161 @@
+"""
+Array kernels for recurrences that cannot be written as whole-array NumPy ops.
+
+Kernels are plain Python loops over float64 arrays, compiled with numba (a
+requirement). If numba cannot be imported, e.g. on a platform without wheels
+for the installed NumPy, a fallback with identical results is used: pandas'
+own C kernel one span at a time for EWMs, the loops over Python floats for
+the stops. See bench_kernels.py --no-numba for what that costs.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # fall back to the uncompiled kernels
+    njit = None
+
+
+def _compile(func):
+    return njit(cache=True, nogil=True)(func) if njit is not None else None
+
+
+# ---------------------------------------------------------
+# EMA bank
+# ---------------------------------------------------------
+
+def _ema_bank_loop(values, com, min_periods, out):
+    # pandas' ewm(adjust=False, ignore_na=False) recurrence, for K spans in one pass
+    T = values.shape[0]
+    K = com.shape[0]
+    alpha = 1. / (1. + com)
+    old_wt_factor = 1. - alpha
+    weighted = np.empty(K)
+    old_wt = np.ones(K)
+    nobs = np.zeros(K, dtype=np.int64)
+
+    for t in range(T):
+        cur = values[t]
+        is_observation = cur == cur
+        for k in range(K):
+            if t == 0:
+                weighted[k] = cur
+                nobs[k] = 1 if is_observation else 0
+            else:
+                if is_observation:
+                    nobs[k] += 1
+                w = weighted[k]
+                if w == w:
+                    old_wt[k] *= old_wt_factor[k]
+                    if is_observation:
+                        if w != cur:
+                            new_wt = 1. - old_wt[k] if com[k] == 1. else alpha[k]
+                            w = old_wt[k] * w + new_wt * cur
+                            w /= (old_wt[k] + new_wt)
+                        old_wt[k] = 1.
+                elif is_observation:
+                    w = cur
+                weighted[k] = w
+            out[t, k] = weighted[k] if nobs[k] >= min_periods[k] else np.nan
+    return out
+
+
+_ema_bank_compiled = _compile(_ema_bank_loop)
+
+
+def ema_bank(values, spans, min_periods=None, out=None):
+    """
+    EMAs of one series for many spans, equal to
+    Series.ewm(span, min_periods, adjust=False).mean() for each span.
+
+    values: 1-D float array. spans: sequence of K spans.
+    min_periods: defaults to each span (ta's EMAIndicator convention).
+    out: optional preallocated (len(values), K) float64 array.
+    Returns the (len(values), K) array.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = np.where(np.isinf(values), np.nan, values)  # pandas treats inf as missing
+    spans = np.asarray(spans, dtype=np.float64)
+    if min_periods is None:
+        minp = spans.astype(np.int64)
+    else:
+        minp = np.full(len(spans), int(min_periods), dtype=np.int64)
+    minp = np.maximum(minp, 1)
+
+    if out is None:
+        out = np.empty((len(values), len(spans)))
+    if len(values) == 0:
+        return out
+
+    com = (spans - 1) / 2
+    if _ema_bank_compiled is not None:
+        _ema_bank_compiled(values, com, minp, out)
+    else:
+        series = pd.Series(values)
+        for k, span in enumerate(spans):
+            out[:, k] = series.ewm(span=span, min_periods=int(minp[k]), adjust=False).mean().to_numpy()
+    return out
+
+
+# ---------------------------------------------------------
+# Path-dependent stops (state machines)
+# max()/min() are spelled out as comparisons so NaN behaves
+# the same compiled or not.
+# ---------------------------------------------------------
+
+def _run(loop, compiled, arrays, out_len):
+    """Run a state-machine loop compiled if possible, else over Python lists."""
+    if compiled is not None:
+        out = np.empty(out_len)
+        compiled(*arrays, out)
+        return out
+    # Python floats are the fastest scalars for the interpreted loop
+    out = [np.nan] * out_len
+    loop(*[a.tolist() if isinstance(a, np.ndarray) else a for a in arrays], out)
+    return np.asarray(out, dtype=np.float64)
+
+
+def _volatility_stop_loop(close, long_stop, short_stop, start, out):
+    trend = 1  # 1 long, -1 short
+    stop = 0.0
+    for i in range(len(close)):
+        if i < start:
+            out[i] = np.nan  # not enough data
+            continue
+        c = close[i]
+        if trend == 1:
+            # Long: flip on a close below the stop, otherwise the stop only rises
+            if c < stop:
+                trend = -1
+                stop = short_stop[i]
+            elif long_stop[i] > stop:
+                stop = long_stop[i]
+        else:
+            # Short: flip on a close above the stop, otherwise the stop only falls
+            if c > stop:
+                trend = 1
+                stop = long_stop[i]
+            elif short_stop[i] < stop:
+                stop = short_stop[i]
+        out[i] = stop
+
+
+_volatility_stop_compiled = _compile(_volatility_stop_loop)
+
+
+def volatility_stop(close, long_stop, short_stop, start=0):
+    """
+    Single stop line that follows `long_stop` while long and `short_stop`
+    while short, switching side when the close crosses the active stop
+    (chandelier / ATR volatility stop). Bars before `start` are NaN.
+    """
+    arrays = (np.asarray(close, dtype=np.float64), np.asarray(long_stop, dtype=np.float64),
+              np.asarray(short_stop, dtype=np.float64), int(start))
+    return _run(_volatility_stop_loop, _volatility_stop_compiled, arrays, len(arrays[0]))
+
+
+def first_crossing(zone):
+    """True on the first bar of each run of True in `zone` (bool array)."""
+    zone = np.asarray(zone, dtype=bool)
+    prev = np.concatenate(([False], zone[:-1]))
+    return zone & ~prev
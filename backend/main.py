@@ -4,7 +4,9 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import SQLModel, Session, text
+from typing import Optional
 from database import engine
+from timing import SAMPLE_WINDOW, stage_percentiles
 
 # Create the database tables
 def create_db_and_tables():
@@ -18,8 +20,16 @@ async def lifespan(app: FastAPI):
         migrate()
     except Exception as e:
         print(f"Startup Migration Error: {e}")
+    from scan_jobs import start_worker, stop_worker
+    import stock_sync
+    start_worker()
+    stock_sync.start_worker()
     yield
     # Shutdown
+    stop_worker()
+    stock_sync.stop_worker()
+    from scanner import shutdown_pool
+    shutdown_pool()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -38,6 +48,11 @@ app.add_middleware(
 def read_root():
     return {"message": "Stock Analysis API is running"}
 
+@app.get("/metrics")
+def read_metrics(operation: Optional[str] = None):
+    """Per-stage latency percentiles (ms) of recent analyses, scans and backtests (see timing.py)."""
+    return {"window": SAMPLE_WINDOW, "operations": stage_percentiles(operation)}
+
 from routes import stocks, journal, trades, backtest
 app.include_router(stocks.router)
 app.include_router(journal.router)
@@ -1,6 +1,7 @@
 from sqlmodel import create_engine, Session, text, SQLModel
 from database import sqlite_url
-from models import Trade, BSLScript # Import models to register them
+from models import Trade, BSLScript, ScanResult # Import models to register them
+from screener import latest_indicators
 
 # Initialize engine
 engine = create_engine(sqlite_url)
@@ -30,6 +31,14 @@ def migrate():
     add_column("stock", "candle_pattern", "TEXT")
     add_column("stock", "candle_pattern_type", "TEXT")
     add_column("stock", "confluence_alert", "TEXT")
+    add_column("stock", "scan_fingerprint", "TEXT")
+
+    # --- LATEST_INDICATORS TABLE ---
+    # One column per indicator output: add (and index) any added since the table was created
+    for column in latest_indicators.columns:
+        add_column("latest_indicators", column.name, "REAL" if column.type.python_type is float else "TEXT")
+    for index in latest_indicators.indexes:
+        index.create(engine, checkfirst=True)
 
     # --- TRADE TABLE ---
     # Core identifying fields (usually in base but checking)
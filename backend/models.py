@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import List, Optional
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 class Stock(SQLModel, table=True):
@@ -14,10 +15,28 @@ class Stock(SQLModel, table=True):
     candle_pattern: Optional[str] = None # 'hammer', 'engulfing', 'morning_star', etc.
     candle_pattern_type: Optional[str] = None # 'bullish' or 'bearish'
     confluence_alert: Optional[str] = None # 'HIGH-CONVICTION REVERSAL...', etc.
+    scan_fingerprint: Optional[str] = None # last scanned bar: timestamp|OHLCV hash
 
 class StockPublic(Stock):
     impulse: Optional[str] = None
 
+# Scan signal history: one row per symbol and bar date, rescans of the same bar update it
+class ScanResult(SQLModel, table=True):
+    __table_args__ = (
+        UniqueConstraint("symbol", "bar_date", name="uq_scanresult_symbol_bar_date"),
+        Index("ix_scanresult_bar_date", "bar_date"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    symbol: str
+    bar_date: str # YYYY-MM-DD of the last bar scanned
+    divergence_status: Optional[str] = None
+    efi_status: Optional[str] = None
+    setup_signal: Optional[str] = None
+    candle_pattern: Optional[str] = None
+    candle_pattern_type: Optional[str] = None
+    confluence_alert: Optional[str] = None
+    scanned_at: str
+
 class Template(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -158,6 +177,16 @@ class BacktestRequest(SQLModel):
         "populate_by_name": True
     }
 
+class AnalysisBatchRequest(SQLModel):
+    symbols: List[str]
+    interval: str = "1d"
+    period: str = "1y"
+    summary_only: bool = Field(default=True, alias="summaryOnly")
+
+    model_config = {
+        "populate_by_name": True
+    }
+
 class BSLScript(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str = Field(index=True, unique=True)
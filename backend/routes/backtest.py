@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Header
 from sqlmodel import Session, select, delete, SQLModel
 import json
 from typing import List, Optional
@@ -6,6 +6,8 @@ from datetime import datetime, timedelta
 from database import get_session
 from models import BacktestResult, BacktestRequest, BSLScript
 from backtest_engine import BacktestEngine, BacktestConfig, StrategyTypes, save_backtest_result, STRATEGY_SCRIPTS
+from serialization import FastJSONResponse, negotiate, negotiated_response
+from timing import StageTimer
 import logging
 
 router = APIRouter(prefix="/backtest", tags=["backtest"])
@@ -27,13 +29,17 @@ def get_script(strategy_type: str):
 
 logger = logging.getLogger(__name__)
 
-@router.post("/run")
+@router.post("/run", response_class=FastJSONResponse)
 def run_backtest(
     request: BacktestRequest,
     background_tasks: BackgroundTasks = BackgroundTasks(),
+    accept: Optional[str] = Header(None),
     session: Session = Depends(get_session)
 ):
-    """Run a backtest for a specific symbol and strategy"""
+    """
+    Run a backtest for a specific symbol and strategy. Honors Accept for
+    Arrow (price_data as the table) and MessagePack, see serialization.py.
+    """
     try:
         # Extract data from request
         symbol = request.symbol
@@ -116,12 +122,14 @@ def run_backtest(
         engine = BacktestEngine(config)
         
         # Run backtest
-        result = engine.run_backtest(symbol, start_date, end_date, strategy_type)
+        timer = StageTimer("backtest")
+        result = engine.run_backtest(symbol, start_date, end_date, strategy_type, timer=timer)
         
         # Save result to database
         result_id = save_backtest_result(result, config)
+        timer.lap("save")
         
-        return {
+        response = negotiated_response({
             "success": True,
             "result_id": result_id,
             "symbol": symbol,
@@ -133,7 +141,12 @@ def run_backtest(
             "price_data": result.get("price_data", []),
             "trade_count": len([t for t in result["trades"] if t["status"] == "closed"]),
             "plots": result.get("plots", [])
-        }
+        }, negotiate(accept), table_key="price_data")
+        timer.lap("serialize")
+        response.headers["Server-Timing"] = timer.server_timing()
+        timer.finish(symbol=symbol, strategy=strategy_type, bars=len(result.get("price_data", [])),
+                     trades=len(result["trades"]))
+        return response
         
     except HTTPException:
         raise
@@ -265,7 +278,7 @@ def delete_backtest_result(result_id: int, session: Session = Depends(get_sessio
     session.commit()
     return {"message": "Backtest result deleted successfully"}
 
-@router.get("/{result_id}/trades")
+@router.get("/{result_id}/trades", response_class=FastJSONResponse)
 def get_backtest_trades(result_id: int, session: Session = Depends(get_session)):
     """Get trades from a specific backtest result"""
     result = session.get(BacktestResult, result_id)
@@ -274,31 +287,31 @@ def get_backtest_trades(result_id: int, session: Session = Depends(get_session))
     
     try:
         trades = json.loads(result.trades) if result.trades else []
-        return {
+        return FastJSONResponse({
             "result_id": result_id,
             "symbol": result.symbol,
             "strategy": result.strategy_config,
             "trades": trades,
             "trade_count": len(trades)
-        }
+        })
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse trade data")
 
-@router.get("/{result_id}/equity")
-def get_backtest_equity(result_id: int, session: Session = Depends(get_session)):
-    """Get equity curve from a specific backtest result"""
+@router.get("/{result_id}/equity", response_class=FastJSONResponse)
+def get_backtest_equity(result_id: int, accept: Optional[str] = Header(None), session: Session = Depends(get_session)):
+    """Get equity curve from a specific backtest result (JSON, Arrow or MessagePack by Accept)"""
     result = session.get(BacktestResult, result_id)
     if not result:
         raise HTTPException(status_code=404, detail="Backtest result not found")
     
     try:
         equity_curve = json.loads(result.equity_curve) if result.equity_curve else []
-        return {
+        return negotiated_response({
             "result_id": result_id,
             "symbol": result.symbol,
             "equity_curve": equity_curve,
             "final_equity": equity_curve[-1]["equity"] if equity_curve else 0
-        }
+        }, negotiate(accept), table_key="equity_curve")
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Failed to parse equity curve data")
 
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlmodel import Session, select
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from sqlmodel import Session, select, text
 import yfinance as yf
 import pandas as pd
 import ta
@@ -7,353 +10,51 @@ import logging
 import requests
 import json
 from database import get_session
-from models import Stock, StockPublic
+from models import AnalysisBatchRequest, ScanResult, Stock, StockPublic
 from cache import get_cached, set_cache
-from utils import safe_download
+from utils import fetch_concurrently, fetch_pool, fetch_timeout, safe_download
+from timing import StageTimer
 import numpy as np
-from analysis_utils import detect_candlestick_pattern, detect_confluence
+from analysis_utils import detect_confluence, find_levels
+from indicators import BASE_COLUMNS, PROFILES, available_outputs, calculate_indicators, field_columns
+from indicator_stream import stream_indicators
+from indicator_panel import calculate_panel, panel_from_download, last_values
+from divergence import latest_divergence
+from scan_jobs import get_job, run_scan, submit_scan
+from universe import WATCHLIST, describe_universes, list_universes, load_universe
+from screener import ScreenError, run_screen
+import stock_sync
+from serialization import (ARROW_MEDIA_TYPE, SERIES_FORMATS, FastJSONResponse, columnar, negotiate,
+                           negotiated_response, series_window)
 
 router = APIRouter(prefix="/stocks", tags=["stocks"])
 logger = logging.getLogger(__name__)
 
-
-def clean_nans(obj):
-    """Sanitize NumPy/Pandas NaNs for JSON serialization"""
-    if isinstance(obj, float) and (np.isnan(obj) or np.isinf(obj)):
-        return None
-    if isinstance(obj, dict):
-        return {k: clean_nans(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [clean_nans(i) for i in obj]
-    return obj
+# Top-down context of the analysis endpoint
+MACRO_PROXIES = ["SPY", "XLI", "TIP", "^TNX"]
+SECTOR_ETFS = {
+    "Technology": "XLK",
+    "Energy": "XLE",
+    "Financial Services": "XLF",
+    "Healthcare": "XLV",
+    "Consumer Defensive": "XLP",
+    "Consumer Cyclical": "XLY",
+    "Industrials": "XLI",
+    "Basic Materials": "XLB",
+    "Utilities": "XLU",
+    "Real Estate": "XLRE",
+    "Communication Services": "XLC"
+}
+SECTOR_CACHE_KEY = "sector_leadership_1mo"
+
+# POST /stocks/analysis/batch (dashboard grids)
+MAX_BATCH_SYMBOLS = 50
+ANALYSIS_WORKERS = 8  # symbols analyzed at once
+BATCH_FETCH_WORKERS = 16  # batch loads run on their own pool, apart from single analyses
 
 
 # Candlestick pattern detection logic moved to analysis_utils.py
-
-def calculate_indicators(df, dynamic_configs=None):
-    if len(df) < 2:
-        return df
-        
-    # Calculate Indicators using 'ta' library
-    # MACD
-    df['macd'] = ta.trend.macd(df['Close'])
-    df['macd_signal'] = ta.trend.macd_signal(df['Close'])
-    df['macd_diff'] = ta.trend.macd_diff(df['Close'])
-    
-    # RSI
-    df['rsi'] = ta.momentum.rsi(df['Close'], window=14)
-    
-    # EMA
-    df['ema_13'] = ta.trend.ema_indicator(df['Close'], window=13)
-    df['ema_22'] = ta.trend.ema_indicator(df['Close'], window=22)
-    df['ema_26'] = ta.trend.ema_indicator(df['Close'], window=26)
-    df['ema_50'] = ta.trend.ema_indicator(df['Close'], window=50)
-    df['ema_200'] = ta.trend.ema_indicator(df['Close'], window=200)
-
-    # Candlestick Patterns (Whole History)
-    patterns = [None] * len(df)
-    p_types = [None] * len(df)
-    
-    # We need up to 5 bars for complex patterns, plus at least 15 bars for body average
-    for i in range(15, len(df)):
-        subset_start = max(0, i - 19) # 20 bars total for context
-        subset = df.iloc[subset_start:i+1]
-        p_name, p_type = detect_candlestick_pattern(subset)
-        patterns[i] = p_name
-        p_types[i] = p_type
-            
-    df['candle_pattern'] = patterns
-    df['candle_pattern_type'] = p_types
-
-
-    # Oscillators for Screen 2
-    df['williams_r'] = ta.momentum.williams_r(df['High'], df['Low'], df['Close'], lbp=14)
-    # Stochastic
-    stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'], window=14, smooth_window=3)
-    df['stoch_k'] = stoch.stoch()
-    df['stoch_d'] = stoch.stoch_signal()
-
-    # 22-period EMA as centerline for Price ATR Channels
-    df['ema_22'] = ta.trend.ema_indicator(df['Close'], window=22)
-    df['price_atr'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=14)
-
-    # Price ATR Channels (1, 2, and 3 multipliers)
-    df['price_atr_h1'] = df['ema_22'] + df['price_atr'] * 1
-    df['price_atr_l1'] = df['ema_22'] - df['price_atr'] * 1
-    df['price_atr_h2'] = df['ema_22'] + df['price_atr'] * 2
-    df['price_atr_l2'] = df['ema_22'] - df['price_atr'] * 2
-    df['price_atr_h3'] = df['ema_22'] + df['price_atr'] * 3
-    df['price_atr_l3'] = df['ema_22'] - df['price_atr'] * 3
-
-    # Backwards compatibility for existing series naming if needed
-    df['envelope_upper'] = df['price_atr_h2'] # Use level 2 as default substitute
-    df['envelope_lower'] = df['price_atr_l2']
-
-    # Calculate Volume SMA
-    df['volume_sma_20'] = ta.trend.sma_indicator(df['Volume'], window=20)
-
-    # --- Alex Elder Indicators ---
-    # 1. Elder Impulse System
-    df['ema_13_slope'] = df['ema_13'].diff()
-    df['macd_diff_slope'] = df['macd_diff'].diff()
-    
-    def get_impulse(row):
-        if pd.isna(row['ema_13_slope']) or pd.isna(row['macd_diff_slope']):
-            return "blue" # Default
-        if row['ema_13_slope'] > 0 and row['macd_diff_slope'] > 0:
-            return "green"
-        elif row['ema_13_slope'] < 0 and row['macd_diff_slope'] < 0:
-            return "red"
-        else:
-            return "blue"
-    
-    df['impulse'] = df.apply(get_impulse, axis=1)
-
-    # 2. Elder-ray Index
-    df['bulls_power'] = df['High'] - df['ema_13']
-    df['bears_power'] = df['Low'] - df['ema_13']
-
-    # 3. Force Index (EFI) with ATR Channels
-    # EFI = 13-period EMA of (Close - Close[1]) * Volume
-    raw_force = (df['Close'] - df['Close'].shift(1)) * df['Volume']
-    df['efi'] = raw_force.ewm(span=13, adjust=False).mean()
-    
-    # Sig = 13-period EMA of EFI (Averaged Force)
-    df['efi_signal'] = df['efi'].ewm(span=13, adjust=False).mean()
-    
-    # EFI ATR = smoothed absolute bar-to-bar change of EFI
-    # Using 22-period smoothing for more stable bands, reducing false zone entries.
-    efi_range = (df['efi'] - df['efi'].shift(1)).abs()
-    efi_atr = efi_range.ewm(span=22, adjust=False).mean()
-    
-    # Upper/Lower Bands centered on Signal
-    df['efi_atr_h1'] = df['efi_signal'] + efi_atr * 1
-    df['efi_atr_l1'] = df['efi_signal'] - efi_atr * 1
-    df['efi_atr_h2'] = df['efi_signal'] + efi_atr * 2
-    df['efi_atr_l2'] = df['efi_signal'] - efi_atr * 2
-    df['efi_atr_h3'] = df['efi_signal'] + efi_atr * 3
-    df['efi_atr_l3'] = df['efi_signal'] - efi_atr * 3
-    
-    # Truncation Logic (Extreme Value Handling)
-    # Increased to 5-ATR so that 3nd-ATR signals are clearly visible as penetrations
-    efi_ob_h = df['efi_signal'] + efi_atr * 5
-    efi_ob_l = df['efi_signal'] - efi_atr * 5
-    
-    df['efi_truncated'] = df['efi']
-    df.loc[df['efi'] > efi_ob_h, 'efi_truncated'] = df['efi_signal'] + efi_atr * 4
-    df.loc[df['efi'] < efi_ob_l, 'efi_truncated'] = df['efi_signal'] - efi_atr * 4
-    
-    # Signal Dots (EFI hitting or exceeding 3-ATR) - Trigger Logic (First crossover)
-    # Increased threshold to 3-ATR to capture true momentum exhausts
-    efi_in_buy_zone = (df['efi'] <= df['efi_atr_l3'])
-    efi_in_sell_zone = (df['efi'] >= df['efi_atr_h3'])
-    
-    df['efi_buy_signal'] = (efi_in_buy_zone & (~efi_in_buy_zone.shift(1).fillna(False))).fillna(False).astype(bool)
-    df['efi_sell_signal'] = (efi_in_sell_zone & (~efi_in_sell_zone.shift(1).fillna(False))).fillna(False).astype(bool)
-    
-    # Remove old/aliased signal names to prevent confusion/persistence
-    if 'efi_extreme_high' in df.columns: del df['efi_extreme_high']
-    if 'efi_extreme_low' in df.columns: del df['efi_extreme_low']
-
-    # Keep compatibility with existing code that might use force_index_13
-    df['force_index_13'] = df['efi']
-    df['force_index_13'] = df['efi']
-    df['force_index_2'] = raw_force.ewm(span=2, adjust=False).mean()
-    
-    # ---------------------------------------------------------
-    # SafeZone Calculation (Elder)
-    # ---------------------------------------------------------
-    # 1. SafeZone Long (Protects Longs)
-    # Lookback 22, Coeff 2.5
-    sz_period = 22
-    sz_coeff = 2.5
-    
-    # Downside Penetration: max(Previous Low - Low, 0)
-    # We shift L by 1 to compare PrevL vs L
-    prev_low = df['Low'].shift(1)
-    downside_penetration = (prev_low - df['Low']).clip(lower=0)
-    
-    # Average Downside Penetration: Sum / Count (of penetrations only)
-    # Rolling Sum of Penetrats and Count of Penetrations > 0
-    # Rolling sum:
-    pen_sum = downside_penetration.rolling(window=sz_period).sum()
-    pen_count = (downside_penetration > 0).astype(int).rolling(window=sz_period).sum()
-    
-    # Avoid division by zero
-    avg_pen = pen_sum / pen_count.replace(0, 1)
-    
-    # SafeZone Level: Low - (Coeff * AvgPen)
-    # This is the "Stop for Tomorrow" calculated "Today".
-    df['safezone_long'] = df['Low'] - (sz_coeff * avg_pen)
-    
-    # 2. SafeZone Short (Protects Shorts)
-    # Upside Penetration: max(High - Previous High, 0)
-    prev_high = df['High'].shift(1)
-    upside_penetration = (df['High'] - prev_high).clip(lower=0)
-    
-    up_sum = upside_penetration.rolling(window=sz_period).sum()
-    up_count = (upside_penetration > 0).astype(int).rolling(window=sz_period).sum()
-    
-    avg_up_pen = up_sum / up_count.replace(0, 1)
-    
-    df['safezone_short'] = df['High'] + (sz_coeff * avg_up_pen)
-    
-    # Fill NaN for initial periods
-    df['safezone_long'] = df['safezone_long'].bfill()
-    df['safezone_short'] = df['safezone_short'].bfill()
-
-    # --- NEW INDICATORS (Feb 2026) ---
-
-    # 1. Guppy Multiple Moving Average (GMMA)
-    # Short Term: 3, 5, 8, 10, 12, 15
-    for period in [3, 5, 8, 10, 12, 15]:
-        df[f'guppy_short_{period}'] = ta.trend.EMAIndicator(close=df['Close'], window=period).ema_indicator()
-    
-    # Long Term: 30, 35, 40, 45, 50, 60
-    for period in [30, 35, 40, 45, 50, 60]:
-        df[f'guppy_long_{period}'] = ta.trend.EMAIndicator(close=df['Close'], window=period).ema_indicator()
-
-    # Guppy Signal: Short Term Group Average vs Long Term Group Average
-    short_cols = [f'guppy_short_{p}' for p in [3, 5, 8, 10, 12, 15]]
-    long_cols = [f'guppy_long_{p}' for p in [30, 35, 40, 45, 50, 60]]
-    
-    df['guppy_short_avg'] = df[short_cols].mean(axis=1)
-    df['guppy_long_avg'] = df[long_cols].mean(axis=1)
-    
-    # Clean NaNs for accurate comparison
-    # Use 0 for comparison to avoid boolean errors, but realistically we need valid data
-    # We'll just rely on pandas alignment
-    
-    df['guppy_signal'] = 0
-    # Bullish Crossover (Short crosses above Long)
-    df.loc[(df['guppy_short_avg'] > df['guppy_long_avg']) & (df['guppy_short_avg'].shift(1) <= df['guppy_long_avg'].shift(1)), 'guppy_signal'] = 1
-    # Bearish Crossover (Short crosses below Long)
-    df.loc[(df['guppy_short_avg'] < df['guppy_long_avg']) & (df['guppy_short_avg'].shift(1) >= df['guppy_long_avg'].shift(1)), 'guppy_signal'] = -1
-
-    # 2. Bollinger Bands (20, 2)
-    bb = ta.volatility.BollingerBands(close=df['Close'], window=20, window_dev=2)
-    df['bb_upper'] = bb.bollinger_hband()
-    df['bb_middle'] = bb.bollinger_mavg()
-    df['bb_lower'] = bb.bollinger_lband()
-
-    # 3. ATR Volatility Stop (Chandelier Exit-like)
-    # Logic: Long Stop = HighestHigh(22) - 3*ATR(22)
-    #        Short Stop = LowestLow(22) + 3*ATR(22)
-    # Simple Volatility Stop Implementation
-    atr_period = 22
-    atr_mult = 3.0
-    
-    # Calculate ATR
-    # ta.volatility.AverageTrueRange
-    atr_obj = ta.volatility.AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=atr_period)
-    df['atr_val'] = atr_obj.average_true_range()
-    
-    # Calculate Highest High and Lowest Low
-    df['hh22'] = df['High'].rolling(window=atr_period).max()
-    df['ll22'] = df['Low'].rolling(window=atr_period).min()
-    
-    df['chandelier_long'] = df['hh22'] - (df['atr_val'] * atr_mult)
-    df['chandelier_short'] = df['ll22'] + (df['atr_val'] * atr_mult)
-    
-    # Determine which stop to use based on trend
-    # Logic: If Close > Previous Short Stop, switch to Long. If Close < Previous Long Stop, switch to Short.
-    # We will compute a single 'volatility_stop' column.
-    
-    # Vectorized approach is hard for state-dependent logic, but we can do a simplified loop or fill
-    # For now, let's provide both 'chandelier_long' and 'chandelier_short' to frontend and let it choose,
-    # OR simpler: just return them and let frontend visualizer handle "active" State if needed.
-    # Actually, a single line is better for charts.
-    
-    # Iterative calculation for 'volatility_stop'
-    # Initialize with Long Stop
-    stop_vals = [df['chandelier_long'].iloc[0]]
-    trend = 1 # 1 for Long, -1 for Short
-    
-    # Retrieve numpy arrays for speed
-    closes = df['Close'].values
-    long_stops = df['chandelier_long'].values
-    short_stops = df['chandelier_short'].values
-    
-    # Pre-allocate output array
-    final_stops = [0.0] * len(df)
-    
-    # Simple efficient loop (skip first 'atr_period' indices roughly)
-    curr_trend = 1
-    curr_stop = 0.0
-    
-    for i in range(len(df)):
-        if i < atr_period:
-            final_stops[i] = None # Not enough data
-            continue
-            
-        c = closes[i]
-        ls = long_stops[i]
-        ss = short_stops[i]
-        prev_c = closes[i-1]
-        
-        # If we were Long
-        if curr_trend == 1:
-            # Check for breakdown
-            if c < curr_stop:
-                curr_trend = -1
-                curr_stop = ss
-            else:
-                # Update Long Stop (it never moves down)
-                curr_stop = max(curr_stop, ls)
-        # If we were Short
-        else:
-            # Check for breakout
-            if c > curr_stop:
-                curr_trend = 1
-                curr_stop = ls
-            else:
-                # Update Short Stop (it never moves up)
-                curr_stop = min(curr_stop, ss)
-                
-        final_stops[i] = curr_stop
-
-    df['volatility_stop'] = final_stops
-    df = df.drop(columns=['hh22', 'll22', 'chandelier_long', 'chandelier_short']) # Keep atr_val if needed or drop
-
-    # --- END NEW INDICATORS ---
-
-    # --- DYNAMIC INDICATORS ---
-    if dynamic_configs:
-        for config in dynamic_configs:
-            ctype = config.get('type')
-            params = config.get('params', {})
-            
-            if ctype == 'ema':
-                window = params.get('window', 13)
-                col_name = f'ema_{window}'
-                if col_name not in df.columns:
-                    df[col_name] = ta.trend.ema_indicator(df['Close'], window=window)
-            
-            elif ctype == 'sma':
-                window = params.get('window', 20)
-                col_name = f'sma_{window}'
-                if col_name not in df.columns:
-                    df[col_name] = ta.trend.sma_indicator(df['Close'], window=window)
-
-            elif ctype == 'rsi':
-                window = params.get('window', 14)
-                col_name = f'rsi_{window}'
-                if col_name not in df.columns:
-                    df[col_name] = ta.momentum.rsi(df['Close'], window=window)
-
-            elif ctype == 'macd':
-                fast = params.get('fast', 12)
-                slow = params.get('slow', 26)
-                sign = params.get('signal', 9)
-                # We need to be careful with column naming if multiple MACDs are requested
-                prefix = f'macd_{fast}_{slow}_{sign}'
-                if f'{prefix}_diff' not in df.columns:
-                    macd = ta.trend.MACD(df['Close'], window_fast=fast, window_slow=slow, window_sign=sign)
-                    df[f'{prefix}'] = macd.macd()
-                    df[f'{prefix}_signal'] = macd.macd_signal()
-                    df[f'{prefix}_diff'] = macd.macd_diff()
-
-    return df
+# Indicator computation lives in indicators.py (declared as a dependency graph)
 
 @router.post("/", response_model=Stock)
 def add_stock(stock: Stock, session: Session = Depends(get_session)):
@@ -400,242 +101,134 @@ def add_stock(stock: Stock, session: Session = Depends(get_session)):
     return stock
 
 @router.post("/scan")
-def scan_stocks(session: Session = Depends(get_session)):
-    import time
-    
-    # Get all stocks
+def scan_stocks(response: Response, session: Session = Depends(get_session), force: bool = False, screen: bool = False):
+    """Synchronous scan; the UI uses the background jobs below. `screen` also refreshes the screener rows."""
+    timer = StageTimer("scan")
     try:
-        stocks = session.exec(select(Stock)).all()
+        result = run_scan(session, force=force, screen=screen, timer=timer)
     except Exception as e:
-        logger.error(f"Scan pre-fetch error: {e}")
+        logger.error(f"Scan error: {e}")
         return {"scanned": 0, "results": [], "error": str(e)}
-    results = []
-    
-    # Process each stock (limit history to save bandwidth)
-    for stock in stocks:
-        try:
-            # 1. Fetch Data (Need ~2 years for reliable Weekly calculation)
-            # Fetching 2y of daily data is heavy but allows resampling for Weekly.
-            # Alternately, fetch separate Weekly data? 
-            # Optimization: 2y Daily is a lot. Let's fetch 2y Weekly + 6mo Daily? 
-            # No, yfinance download caching is key.
-            # Let's fetch 1y Daily. Weekly Impulse on just 52 bars is okay.
-            df = safe_download(stock.symbol, period="2y", interval="1d")
-            
-            if df.empty or len(df) < 50:
-                continue
-
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = df.columns.get_level_values(0)
-            
-            # De-duplicate columns (ensures df['Close'] is a Series)
-            df = df.loc[:, ~df.columns.duplicated()]
-            
-            # 2. Calculate Indicators
-            df = calculate_indicators(df)
-            
-            # 3. Check Divergence
-            # Use the existing find_divergence logic but reused here
-            # Ideally Refactor find_divergence to be reusable outside get_stock_analysis
-            # But for now, we duplicate the core check or extract it.
-            # Let's simple duplicate the core algorithm for safety/simplicity in this context
-            
-            div_status = None
-            
-            # Helper for scan
-            def check_div_scan(df, indicator_col):
-                hist = df[indicator_col].values
-                prices = df['High'].values
-                lows = df['Low'].values
-                
-                # Segments
-                segments = []
-                current_seg = {"indices": [0], "type": "pos" if hist[0] >= 0 else "neg"}
-                for i in range(1, len(hist)):
-                    is_pos = hist[i] >= 0
-                    if (is_pos and current_seg["type"] == "pos") or (not is_pos and current_seg["type"] == "neg"):
-                        current_seg["indices"].append(i)
-                    else:
-                        segments.append(current_seg)
-                        current_seg = {"indices": [i], "type": "pos" if is_pos else "neg"}
-                segments.append(current_seg)
-                
-                # Extrema
-                for seg in segments:
-                    idxs = seg["indices"]
-                    # Indicator extrema (for momentum comparison and drawing)
-                    if seg["type"] == "pos":
-                        peak_idx = idxs[0] + hist[idxs].argmax()
-                        seg["extrema_idx"] = int(peak_idx)
-                        seg["extrema_val"] = float(hist[peak_idx])
-                        # Use the true High of the entire segment for price comparison
-                        seg["price_at_extrema"] = float(prices[idxs].max())
-                    else:
-                        trough_idx = idxs[0] + hist[idxs].argmin()
-                        seg["extrema_idx"] = int(trough_idx)
-                        seg["extrema_val"] = float(hist[trough_idx])
-                        # Use the true Low of the entire segment for price comparison
-                        seg["price_at_extrema"] = float(lows[idxs].min())
-                        
-                # Bearish Lookback (Dynamic S2 & Stricter Bridge)
-                pos_segs = [s for s in segments if s["type"] == "pos" and len(s["indices"]) > 1]
-                if len(pos_segs) >= 2:
-                    # Check top 2 most recent segments as potential s2 (latest or previous)
-                    for j in range(1, min(len(pos_segs), 3)):
-                        s2 = pos_segs[-j]
-                        if (len(hist) - 1 - s2["extrema_idx"]) < 5:
-                            is_confirmed = (len(hist) - 1 - s2["extrema_idx"]) >= 1
-                            indicator_ticked_down = hist[-1] < s2["extrema_val"] if is_confirmed else False
-                            
-                            if j > 1:
-                                is_confirmed = True
-                                indicator_ticked_down = True
-
-                            if is_confirmed and indicator_ticked_down:
-                                # Stricter historical lookback (Elder Standard: usually immediate previous wave)
-                                for k in range(1, min(len(pos_segs) - (j-1), 4)):
-                                    s1 = pos_segs[-j - k]
-                                    s1_idx_in_all = segments.index(s1)
-                                    s2_idx_in_all = segments.index(s2)
-                                    
-                                    # Strict Elder Standard: Exactly 1 intervening wave & narrow window
-                                    bridge_waves = s2_idx_in_all - s1_idx_in_all - 1
-                                    distance_bars = s2["extrema_idx"] - s1["extrema_idx"]
-                                    if bridge_waves == 1 and distance_bars <= 40:
-                                        # Tightened tolerance to 0.5% for Double Tops
-                                        price_condition = s2["price_at_extrema"] >= (s1["price_at_extrema"] * 0.995)
-                                        if price_condition and s2["extrema_val"] < s1["extrema_val"]:
-                                            if any(segments[m]["type"] == "neg" for m in range(s1_idx_in_all + 1, s2_idx_in_all)):
-                                                return "bearish"
-                
-                # Bullish Lookback (Dynamic S2 & Stricter Bridge)
-                neg_segs = [s for s in segments if s["type"] == "neg" and len(s["indices"]) > 1]
-                if len(neg_segs) >= 2:
-                    for j in range(1, min(len(neg_segs), 3)):
-                        s2 = neg_segs[-j]
-                        if (len(hist) - 1 - s2["extrema_idx"]) < 5:
-                            is_confirmed = (len(hist) - 1 - s2["extrema_idx"]) >= 1
-                            indicator_ticked_up = hist[-1] > s2["extrema_val"] if is_confirmed else False
-                            
-                            if j > 1:
-                                is_confirmed = True
-                                indicator_ticked_up = True
-
-                            if is_confirmed and indicator_ticked_up:
-                                for k in range(1, min(len(neg_segs) - (j-1), 4)):
-                                    s1 = neg_segs[-j - k]
-                                    s1_idx_in_all = segments.index(s1)
-                                    s2_idx_in_all = segments.index(s2)
-                                    
-                                    bridge_waves = s2_idx_in_all - s1_idx_in_all - 1
-                                    distance_bars = s2["extrema_idx"] - s1["extrema_idx"]
-                                    if bridge_waves == 1 and distance_bars <= 40:
-                                        # Tightened tolerance to 0.5% for Double Bottoms
-                                        price_condition = s2["price_at_extrema"] <= (s1["price_at_extrema"] * 1.005)
-                                        if price_condition and s2["extrema_val"] > s1["extrema_val"]:
-                                             if any(segments[m]["type"] == "pos" for m in range(s1_idx_in_all + 1, s2_idx_in_all)):
-                                                 return "bullish"
-                return None
-
-            macd_div = check_div_scan(df, 'macd_diff')
-            
-            # 3. Check Divergence (MACD Only)
-            macd_div = check_div_scan(df, 'macd_diff')
-            
-            # 4. Check EFI Signals (Last bar)
-            efi_buy = df['efi_buy_signal'].iloc[-1]
-            efi_sell = df['efi_sell_signal'].iloc[-1]
-            
-            efi_status = None
-            if efi_buy:
-                efi_status = 'buy'
-            elif efi_sell:
-                efi_status = 'sell'
-            
-            # 5. Check Triple Screen Pullback (Setup Signal)
-            # Rule: Weekly Impulse is Bullish (Green/Blue) AND Daily EFI-2 is Negative (Pullback)
-            setup_signal = None
-            
-            try:
-                # Resample for Weekly Impulse
-                logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
-                df_wk = df.resample('W').apply(logic).dropna()
-                
-                if len(df_wk) > 26:
-                    df_wk['ema_13'] = ta.trend.ema_indicator(df_wk['Close'], window=13)
-                    df_wk['macd_diff'] = ta.trend.macd_diff(df_wk['Close'])
-                    
-                    slope_ema = df_wk['ema_13'].diff().iloc[-1]
-                    slope_macd = df_wk['macd_diff'].diff().iloc[-1]
-                    
-                    weekly_bullish = (slope_ema > 0 and slope_macd > 0) or (slope_ema > 0 or slope_macd > 0) # Green or Blue
-                    weekly_bearish = (slope_ema < 0 and slope_macd < 0) or (slope_ema < 0 or slope_macd < 0) # Red or Blue
-                    
-                    # Daily Force Index 2-Day (Calculated in calculate_indicators, need 'force_index_2')
-                    # We might need to ensure 'force_index_2' is in 'df'.
-                    # It's added in calculate_indicators line 120: df['force_index_2'] = raw_force.ewm(span=2...
-                    
-                    daily_efi2 = df['force_index_2'].iloc[-1]
-                    
-                    # BUY SETUP: Weekly Up/Neutral + Daily Pullback (EFI2 < 0)
-                    if weekly_bullish and daily_efi2 < 0:
-                         # Elder Quality: Only if EMA13 Daily is also rising? Or just basic TS?
-                         # Basic TS: Weekly allows Long, Daily dips.
-                         if slope_ema > 0 and slope_macd > 0: # Green Weekly is best
-                             setup_signal = 'pullback_buy_strong'
-                         elif slope_ema >= 0: # Blue/Green
-                             setup_signal = 'pullback_buy'
-
-                    # SELL SETUP: Weekly Down/Neutral + Daily Rally (EFI2 > 0)
-                    elif weekly_bearish and daily_efi2 > 0:
-                        if slope_ema < 0 and slope_macd < 0:
-                            setup_signal = 'pullback_sell_strong'
-                        elif slope_ema <= 0:
-                            setup_signal = 'pullback_sell'
-
-            except Exception as e:
-                print(f"TS Scan error {stock.symbol}: {e}")
-
-            # 6. Detect Candlestick Patterns & Confluence
-            candle_pattern, candle_pattern_type = detect_candlestick_pattern(df)
-            
-            # Use current logic for MACD divergence mapping to detected confluence
-            macd_div_obj = {'type': macd_div, 'recency': 0} if macd_div else None
-            confluence_alert, _ = detect_confluence(df, macd_div_obj)
-
-            # Update DB
-            stock.divergence_status = macd_div 
-            stock.efi_status = efi_status
-            stock.setup_signal = setup_signal
-            stock.candle_pattern = candle_pattern
-            stock.candle_pattern_type = candle_pattern_type
-            stock.confluence_alert = confluence_alert
-            
-            session.add(stock)
-            
-            if macd_div or efi_status or setup_signal:
-                results.append({
-                    "symbol": stock.symbol, 
-                    "divergence": macd_div,
-                    "efi": efi_status,
-                    "setup": setup_signal
-                })
-            
-            # Anti-Block Sleep
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Scan failed for {stock.symbol}: {e}")
-            continue
-    
-    session.commit()
-    # session.commit() # Duplicate commit removed
-    return {"scanned": len(stocks), "results": results}
+    response.headers["Server-Timing"] = timer.server_timing()
+    timer.finish(symbols=result["scanned"], rescanned=result.get("rescanned", 0), screen=screen)
+    return result
+
+@router.get("/universes")
+def get_universes(session: Session = Depends(get_session)):
+    """Symbol universes that can be scanned (the watchlist plus backend/universes files)."""
+    return describe_universes(session)
+
+@router.post("/scan/jobs", status_code=202)
+def start_scan_job(force: bool = False, universe: str = WATCHLIST, screen: Optional[bool] = None):
+    if universe not in list_universes():
+        raise HTTPException(status_code=404, detail=f"Unknown universe '{universe}'")
+    job = submit_scan(force=force, universe=universe, screen=screen)
+    return job.progress()
+
+@router.get("/scan/jobs/{job_id}")
+def get_scan_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.progress()
+
+@router.get("/scan/jobs/{job_id}/events")
+def stream_scan_job(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """Per-symbol results as Server-Sent Events: result / failure per symbol, then done or failed."""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    # Reconnecting EventSource clients resume after the last event they saw
+    start = int(last_event_id) + 1 if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(job.sse(start), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Scan history signals that can be queried (query name -> ScanResult column)
+SCAN_HISTORY_SIGNALS = {
+    "divergence": "divergence_status",
+    "efi": "efi_status",
+    "setup": "setup_signal",
+    "candle_pattern": "candle_pattern",
+    "confluence": "confluence_alert",
+}
+
+def _history_signal_column(signal: str) -> str:
+    column = SCAN_HISTORY_SIGNALS.get(signal)
+    if not column:
+        raise HTTPException(status_code=400, detail=f"Unknown signal '{signal}', expected one of {list(SCAN_HISTORY_SIGNALS)}")
+    return column
+
+@router.get("/scan/history", response_model=list[ScanResult])
+def get_scan_history(symbol: Optional[str] = None, signal: Optional[str] = None, value: Optional[str] = None,
+                     since: Optional[str] = None, until: Optional[str] = None, limit: int = 500,
+                     session: Session = Depends(get_session)):
+    """
+    Stored scan results, newest bar first. Filters: symbol, a signal (any
+    value, or `value`), and a bar date range (YYYY-MM-DD, inclusive).
+    """
+    statement = select(ScanResult)
+    if symbol:
+        statement = statement.where(ScanResult.symbol == symbol.strip().upper())
+    if signal:
+        column = getattr(ScanResult, _history_signal_column(signal))
+        statement = statement.where(column == value if value else column.is_not(None))
+    if since:
+        statement = statement.where(ScanResult.bar_date >= since)
+    if until:
+        statement = statement.where(ScanResult.bar_date <= until)
+    statement = statement.order_by(ScanResult.bar_date.desc(), ScanResult.symbol).limit(min(limit, 5000))
+    return session.exec(statement).all()
+
+@router.get("/scan/history/first-seen")
+def get_signal_first_seen(signal: str, value: Optional[str] = None, session: Session = Depends(get_session)):
+    """
+    Symbols whose latest scan shows `signal` (equal to `value` if given), with
+    the bar date the current run of it started, the latest date and the
+    number of scans in the run. Most recent first appearances first.
+    """
+    column = _history_signal_column(signal)
+
+    def shows(alias):
+        return f"COALESCE({alias}.{column} = :value, 0)" if value else f"{alias}.{column} IS NOT NULL"
+
+    # A run starts after the symbol's last scan that did not show the signal
+    statement = text(f"""
+        SELECT s.symbol, MIN(s.bar_date) AS first_seen, MAX(s.bar_date) AS last_seen, COUNT(*) AS scans
+        FROM scanresult s
+        WHERE {shows('s')}
+          AND s.bar_date > COALESCE(
+              (SELECT MAX(p.bar_date) FROM scanresult p WHERE p.symbol = s.symbol AND NOT {shows('p')}), '')
+        GROUP BY s.symbol
+        ORDER BY first_seen DESC, s.symbol
+    """)
+    rows = session.exec(statement, params={"value": value}).all()
+    return [dict(row._mapping) for row in rows]
+
+@router.get("/screen")
+def screen_stocks(where: str, universe: Optional[str] = None, sort: Optional[str] = None, limit: int = 100,
+                  session: Session = Depends(get_session)):
+    """
+    Symbols whose latest bar matches a filter expression over the indicator
+    columns, e.g. where=rsi < 30 AND impulse = 'green' AND close > ema_200
+    (grammar in screener.py). Reads the latest_indicators table that universe
+    scans (and watchlist scans with screen=true) refresh; `universe` restricts
+    to one universe, sort=-rsi sorts descending.
+    """
+    symbols = None
+    if universe:
+        if universe not in list_universes():
+            raise HTTPException(status_code=404, detail=f"Unknown universe '{universe}'")
+        symbols = load_universe(universe, session)
+    try:
+        results = run_screen(session, where, symbols=symbols, order_by=sort, limit=limit)
+    except ScreenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"count": len(results), "results": results}
 
 @router.post("/scan/efi")
-def scan_stocks_efi(session: Session = Depends(get_session)):
+def scan_stocks_efi(response: Response, session: Session = Depends(get_session)):
     # Deprecated: Redirects to main scan logic for now or does nothing
-    return scan_stocks(session)
+    return scan_stocks(response, session)
 
 @router.get("/", response_model=list[StockPublic])
 def get_stocks(session: Session = Depends(get_session)):
@@ -666,31 +259,14 @@ def get_stocks(session: Session = Depends(get_session)):
             # Multi-ticker download is much faster than sequential
             batch_df = safe_download(needed_tickers, period="1y", interval="1wk", group_by='ticker')
             
+            # Impulse (EMA13 + MACD) for the whole batch in one vectorized pass
+            panel = panel_from_download(batch_df, needed_tickers)
+            impulses = last_values(calculate_panel(panel, outputs=['impulse']), panel, 'impulse')
+            
             for symbol in needed_tickers:
-                try:
-                    # Extract dataframe for this specific symbol
-                    if len(needed_tickers) > 1:
-                        wk_df = batch_df[symbol]
-                    else:
-                        wk_df = batch_df
-                        
-                    if not wk_df.empty:
-                        # Calculate impulse
-                        wk_df['ema_13'] = ta.trend.ema_indicator(wk_df['Close'], window=13)
-                        wk_df['macd_diff'] = ta.trend.macd_diff(wk_df['Close'])
-                        
-                        slope_ema = wk_df['ema_13'].diff().iloc[-1]
-                        slope_macd = wk_df['macd_diff'].diff().iloc[-1]
-                        
-                        impulse = "blue"
-                        if slope_ema > 0 and slope_macd > 0: impulse = "green"
-                        elif slope_ema < 0 and slope_macd < 0: impulse = "red"
-                        
-                        cached_impulses[symbol] = impulse
-                        set_cache(f"impulse_wk_{symbol}", impulse)
-                except Exception as e:
-                    print(f"Error processing batch impulse for {symbol}: {e}")
-                    cached_impulses[symbol] = "blue"
+                impulse = impulses.get(symbol) or "blue"
+                cached_impulses[symbol] = impulse
+                set_cache(f"impulse_wk_{symbol}", impulse)
         except Exception as e:
             print(f"Error in batch download: {e}")
             for symbol in needed_tickers:
@@ -754,782 +330,679 @@ def toggle_watch_stock(symbol: str, session: Session = Depends(get_session)):
     session.refresh(stock)
     return stock
 
-@router.get("/{symbol}/analysis")
-def get_stock_analysis(symbol: str, interval: str = "1d", period: str = "1y", indicators: str = None, session: Session = Depends(get_session)):
-    # Fetch data (Use cache)
-    cache_key = f"download_{symbol}_{period}_{interval}"
-    df = get_cached(cache_key, ttl=900) # 15 mins for price data
-
-    try:
-        if df is None:
-            df = safe_download(symbol, period=period, interval=interval)
-            if df.empty:
-                 raise HTTPException(status_code=404, detail="No data found for symbol")
-            set_cache(cache_key, df)
+def analyze_frame(symbol: str, df: pd.DataFrame, interval: str, p_data: pd.DataFrame,
+                  s_data: pd.DataFrame, wk_df: Optional[pd.DataFrame], stock_info: dict, dynamic_configs=None,
+                  outputs=None, profile: Optional[str] = None, timer: Optional[StageTimer] = None):
+    """
+    The Elder analysis of one symbol's bars `df` against a macro proxies /
+    sector ETF snapshot (p_data, s_data) and its weekly bars (the tide, daily
+    interval only). outputs/profile are passed to stream_indicators.
+
+    Returns (response, frame, sync): the analysis document with "data" left
+    None, the indicator frame, and the sidebar fields for stock_sync.enqueue().
+    """
+    timer = timer or StageTimer("analysis")
+
+    # Clean data (Robust MultiIndex flattening)
+    if isinstance(df.columns, pd.MultiIndex):
+        # Attempt to select the specific ticker if it's a multi-ticker download
+        # yfinance often returns [Attribute, Ticker] or [Ticker, Attribute]
+        try:
+            if symbol in df.columns.get_level_values(1):
+                df = df.xs(symbol, axis=1, level=1)
+            elif symbol in df.columns.get_level_values(0):
+                df = df.xs(symbol, axis=1, level=0)
+        except:
+            df.columns = df.columns.get_level_values(0)
         
-        # Clean data (Robust MultiIndex flattening)
-        if isinstance(df.columns, pd.MultiIndex):
-            # Attempt to select the specific ticker if it's a multi-ticker download
-            # yfinance often returns [Attribute, Ticker] or [Ticker, Attribute]
-            try:
-                if symbol in df.columns.get_level_values(1):
-                    df = df.xs(symbol, axis=1, level=1)
-                elif symbol in df.columns.get_level_values(0):
-                    df = df.xs(symbol, axis=1, level=0)
-            except:
-                df.columns = df.columns.get_level_values(0)
-            
-        # De-duplicate columns (ensures df['Close'] is a Series)
-        df = df.loc[:, ~df.columns.duplicated()]
+    # De-duplicate columns (ensures df['Close'] is a Series)
+    df = df.loc[:, ~df.columns.duplicated()]
+    
+    # Ensure we have the basic columns
+    required = ['Open', 'High', 'Low', 'Close', 'Volume']
+    for col in required:
+        if col not in df.columns:
+            # If we have Adj Close but not Close
+            if col == 'Close' and 'Adj Close' in df.columns:
+                df['Close'] = df['Adj Close']
+            else:
+                raise HTTPException(status_code=400, detail=f"Missing required column: {col}")
         
-        # Ensure we have the basic columns
-        required = ['Open', 'High', 'Low', 'Close', 'Volume']
-        for col in required:
-            if col not in df.columns:
-                # If we have Adj Close but not Close
-                if col == 'Close' and 'Adj Close' in df.columns:
-                    df['Close'] = df['Adj Close']
-                else:
-                    raise HTTPException(status_code=400, detail=f"Missing required column: {col}")
-            
-        # Parse dynamic indicators if provided
-        dynamic_configs = None
-        if indicators:
-            try:
-                dynamic_configs = json.loads(indicators)
-            except Exception as e:
-                logger.error(f"Failed to parse dynamic indicators for {symbol}: {e}")
-
-        # Calculate Indicators using Helper
-        df = calculate_indicators(df, dynamic_configs=dynamic_configs)
-
-        # --- Support & Resistance Detection ---
-        # Look for local extrema in the last 100 days
-        def find_levels(df, window=5):
-            levels = []
-            if len(df) < window * 2 + 1:
-                return levels
-            
-            # Simple fractal-based detection
-            for i in range(window, len(df) - window):
-                # Resistance (Local Peak)
-                is_resistance = True
-                for j in range(i - window, i + window + 1):
-                    if df['High'].iloc[j] > df['High'].iloc[i]:
-                        is_resistance = False
-                        break
-                if is_resistance:
-                    levels.append({"price": float(df['High'].iloc[i]), "type": "resistance", "date": df.index[i]})
-
-                # Support (Local Trough)
-                is_support = True
-                for j in range(i - window, i + window + 1):
-                    if df['Low'].iloc[j] < df['Low'].iloc[i]:
-                        is_support = False
-                        break
-                if is_support:
-                    levels.append({"price": float(df['Low'].iloc[i]), "type": "support", "date": df.index[i]})
-            
-            
-            # --- Explicitly Add Recent Range (Last 30 Days) ---
-            # Fractals might miss the most recent high/low because of the window lag.
-            if len(df) > 2:
-                recent_df = df.iloc[-30:] # Look at last 30 bars
-                
-                # Recent Resistance
-                max_idx = recent_df['High'].idxmax()
-                recent_high = float(recent_df['High'].loc[max_idx])
-                
-                # Check if this high is close to an existing fractal level
-                is_duplicate = False
-                for l in levels:
-                    if l['type'] == 'resistance' and abs(l['price'] - recent_high) / recent_high < 0.01:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate:
-                    levels.append({"price": recent_high, "type": "resistance", "date": max_idx})
-                
-                # Recent Support
-                min_idx = recent_df['Low'].idxmin()
-                recent_low = float(recent_df['Low'].loc[min_idx])
-                
-                is_duplicate = False
-                for l in levels:
-                    if l['type'] == 'support' and abs(l['price'] - recent_low) / recent_low < 0.01:
-                        is_duplicate = True
-                        break
-                
-                if not is_duplicate:
-                    levels.append({"price": recent_low, "type": "support", "date": min_idx})
-
-            # Keep only the most recent and significant ones
-            # Increased limit to 3 to assume better coverage
-            res_levels = [l for l in levels if l['type'] == 'resistance']
-            sup_levels = [l for l in levels if l['type'] == 'support']
-            
-            final_levels = []
-            if res_levels:
-                final_levels.extend(sorted(res_levels, key=lambda x: x['date'], reverse=True)[:3])
-            if sup_levels:
-                final_levels.extend(sorted(sup_levels, key=lambda x: x['date'], reverse=True)[:3])
-            
-            return final_levels
-
-        sr_levels = find_levels(df.tail(120)) # Look at last 120 candles
+    # Calculate Indicators (new/revised bars are streamed onto the cached frame)
+    df = stream_indicators(symbol, interval, df, dynamic_configs=dynamic_configs,
+                           outputs=outputs, profile=profile)
+    timer.lap("indicators")
+
+    # --- Support & Resistance Detection ---
+    # Fractal highs/lows over the full history, clustered into levels with touch counts
+    sr_levels = find_levels(df)
+    timer.lap("levels")
+
+    # --- Market Regime Detection ---
+    # 1. Trend Direction
+    # Mark-Up: Price > EMA50 > EMA200 
+    # Mark-Down: Price < EMA50 < EMA200
+    
+    last_close = df['Close'].iloc[-1]
+    last_ema50 = df['ema_50'].iloc[-1]
+    last_ema200 = df['ema_200'].iloc[-1]
+    
+    # Volatility (ATR)
+    df['atr'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=14)
+    last_atr = df['atr'].iloc[-1]
+    avg_atr = df['atr'].tail(30).mean() # Baseline volatility
+    
+    volatility_status = "High" if last_atr > avg_atr * 1.1 else "Low"
+    
+    # --- Confluence Layers ---
+    # 1. Volume Confluence
+    last_vol = df['Volume'].iloc[-1]
+    last_vol_sma = df['volume_sma_20'].iloc[-1]
+    volume_conf = last_vol > last_vol_sma if last_vol_sma else False
+    
+    # 2. Momentum Confluence (RSI)
+    last_rsi = df['rsi'].iloc[-1]
+    rsi_bullish = last_rsi > 50 if last_rsi is not None else False
+    rsi_bearish = last_rsi < 50 if last_rsi is not None else False
+
+    regime = "Unknown"
+    reason = ""
+    confidence = "Medium"
+    confluence_count = 1 # Trend is always base
+
+    if last_ema50 is not None and last_ema200 is not None:
+        # Confluence Tracking
+        confluence_details = {
+            "trend": False,
+            "momentum": False,
+            "flow": False
+        }
 
-        # --- Market Regime Detection ---
-        # 1. Trend Direction
-        # Mark-Up: Price > EMA50 > EMA200 
-        # Mark-Down: Price < EMA50 < EMA200
-        
-        last_close = df['Close'].iloc[-1]
-        last_ema50 = df['ema_50'].iloc[-1]
-        last_ema200 = df['ema_200'].iloc[-1]
+        # 1. Mark-Up (Classic Uptrend)
+        if last_close > last_ema50 > last_ema200:
+            regime = "Mark-Up"
+            reason = "Strong uptrend with price leading key averages."
+            confluence_details["trend"] = True
+            if rsi_bullish: 
+                confluence_details["momentum"] = True
+                confluence_count += 1
+            if volume_conf: 
+                confluence_details["flow"] = True
+                confluence_count += 1
         
-        # Volatility (ATR)
-        df['atr'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=14)
-        last_atr = df['atr'].iloc[-1]
-        avg_atr = df['atr'].tail(30).mean() # Baseline volatility
+        # 2. Mark-Down (Classic Downtrend)
+        elif last_close < last_ema50 < last_ema200:
+            regime = "Mark-Down"
+            reason = "Established downtrend; price breaking lower."
+            confluence_details["trend"] = True
+            if rsi_bearish: 
+                confluence_details["momentum"] = True
+                confluence_count += 1
+            if volume_conf: 
+                confluence_details["flow"] = True
+                confluence_count += 1
+
+        # 3. Distribution (Breaking down from Highs)
+        elif last_close < last_ema50 and last_ema50 >= last_ema200:
+            regime = "Distribution"
+            reason = "Price breaking below fast EMA while trend averages are flat or topping."
+            confluence_details["trend"] = True
+            if volume_conf: # Aggressive selling
+                confluence_details["flow"] = True
+                confluence_count += 1
+            if rsi_bearish:
+                confluence_details["momentum"] = True
+                confluence_count += 1
         
-        volatility_status = "High" if last_atr > avg_atr * 1.1 else "Low"
+        # 4. Accumulation (Breaking up from Lows)
+        elif last_close > last_ema50 and last_ema50 <= last_ema200:
+            regime = "Accumulation"
+            reason = "Price recovering above fast EMA; potential smart money absorption."
+            confluence_details["trend"] = True
+            if not volume_conf: # Quiet buying is accumulation
+                confluence_details["flow"] = True
+                confluence_count += 1
+            if rsi_bullish:
+                confluence_details["momentum"] = True
+                confluence_count += 1
         
-        # --- Confluence Layers ---
-        # 1. Volume Confluence
-        last_vol = df['Volume'].iloc[-1]
-        last_vol_sma = df['volume_sma_20'].iloc[-1]
-        volume_conf = last_vol > last_vol_sma if last_vol_sma else False
+        # 5. Squeeze / Indecision
+        elif abs(last_ema50 - last_ema200) / last_ema200 < 0.02:
+            regime = "Consolidation"
+            reason = "Averages are tight; market awaiting macro catalyst."
+            confluence_details["trend"] = True
         
-        # 2. Momentum Confluence (RSI)
-        last_rsi = df['rsi'].iloc[-1]
-        rsi_bullish = last_rsi > 50 if last_rsi is not None else False
-        rsi_bearish = last_rsi < 50 if last_rsi is not None else False
-
-        regime = "Unknown"
-        reason = ""
+        else:
+             regime = "Transition"
+             reason = "Price is between major moving averages; direction is neutral."
+             confluence_count = 1
+             confluence_details["trend"] = True
+
+    # Reliability Score
+    if confluence_count >= 3:
+        confidence = "High"
+    elif confluence_count == 2:
         confidence = "Medium"
-        confluence_count = 1 # Trend is always base
-
-        if last_ema50 is not None and last_ema200 is not None:
-            # Confluence Tracking
-            confluence_details = {
-                "trend": False,
-                "momentum": False,
-                "flow": False
-            }
+    else:
+        confidence = "Low"
 
-            # 1. Mark-Up (Classic Uptrend)
-            if last_close > last_ema50 > last_ema200:
-                regime = "Mark-Up"
-                reason = "Strong uptrend with price leading key averages."
-                confluence_details["trend"] = True
-                if rsi_bullish: 
-                    confluence_details["momentum"] = True
-                    confluence_count += 1
-                if volume_conf: 
-                    confluence_details["flow"] = True
-                    confluence_count += 1
-            
-            # 2. Mark-Down (Classic Downtrend)
-            elif last_close < last_ema50 < last_ema200:
-                regime = "Mark-Down"
-                reason = "Established downtrend; price breaking lower."
-                confluence_details["trend"] = True
-                if rsi_bearish: 
-                    confluence_details["momentum"] = True
-                    confluence_count += 1
-                if volume_conf: 
-                    confluence_details["flow"] = True
-                    confluence_count += 1
-
-            # 3. Distribution (Breaking down from Highs)
-            elif last_close < last_ema50 and last_ema50 >= last_ema200:
-                regime = "Distribution"
-                reason = "Price breaking below fast EMA while trend averages are flat or topping."
-                confluence_details["trend"] = True
-                if volume_conf: # Aggressive selling
-                    confluence_details["flow"] = True
-                    confluence_count += 1
-                if rsi_bearish:
-                    confluence_details["momentum"] = True
-                    confluence_count += 1
+    timer.lap("regime")
+
+    # --- Top-Down Automation Data ---
+    # 1. Macro (SPY)
+    macro_status = "Unknown"
+    relative_strength = 1.0 # Baseline
+    
+    # 2. Macro Tides (Growth, Inflation, Liquidity)
+    macro_tides = {
+        "growth": {"status": "Unknown", "value": None},
+        "inflation": {"status": "Unknown", "value": None},
+        "liquidity": {"status": "Unknown", "value": None}
+    }
+
+    # Without macro proxies (a failed load) the response keeps these neutral values
+    suggestion = {"title": "Unknown", "action": "Macro data unavailable.", "focus": ""}
+    decision = "Wait / Watch"
+    sector_performance = {}
+    leading_sector = "Unknown"
+    stock_sector = stock_info.get('sector', 'Unknown')
+    is_leading_sector = False
+
+    try:
+        # MACRO_PROXIES, loaded with the bars
+        if not p_data.empty:
+            # Handle MultiIndex
+            if isinstance(p_data.columns, pd.MultiIndex):
+                p_close = p_data['Close']
+                # De-duplicate if somehow multiple tickers got nested
+                if isinstance(p_close, pd.DataFrame):
+                     p_close = p_close.loc[:, ~p_close.columns.duplicated()]
+            else:
+                p_close = p_data # Fallback if single column
+
+            # Macro Trend (SPY)
+            spy_c = p_close['SPY'].iloc[-1]
+            spy_ema50 = ta.trend.ema_indicator(p_close['SPY'], window=50).iloc[-1]
+            macro_status = "Risk-On" if spy_c > spy_ema50 else "Risk-Off"
             
-            # 4. Accumulation (Breaking up from Lows)
-            elif last_close > last_ema50 and last_ema50 <= last_ema200:
-                regime = "Accumulation"
-                reason = "Price recovering above fast EMA; potential smart money absorption."
-                confluence_details["trend"] = True
-                if not volume_conf: # Quiet buying is accumulation
-                    confluence_details["flow"] = True
-                    confluence_count += 1
-                if rsi_bullish:
-                    confluence_details["momentum"] = True
-                    confluence_count += 1
+            # Growth (XLI)
+            xli_c = p_close['XLI'].iloc[-1]
+            xli_ema50 = ta.trend.ema_indicator(p_close['XLI'], window=50).iloc[-1]
+            macro_tides["growth"] = {
+                "status": "Expanding" if xli_c > xli_ema50 else "Slowing",
+                "details": "Industrials (XLI) trending up." if xli_c > xli_ema50 else "Industrial sector showing weakness."
+            }
             
-            # 5. Squeeze / Indecision
-            elif abs(last_ema50 - last_ema200) / last_ema200 < 0.02:
-                regime = "Consolidation"
-                reason = "Averages are tight; market awaiting macro catalyst."
-                confluence_details["trend"] = True
+            # Inflation (TIP) - Falling TIP often means rising inflation expectations
+            tip_c = p_close['TIP'].iloc[-1]
+            tip_ema50 = ta.trend.ema_indicator(p_close['TIP'], window=50).iloc[-1]
+            macro_tides["inflation"] = {
+                "status": "Rising Pressure" if tip_c < tip_ema50 else "Cooling/Stable",
+                "details": "TIP Bonds falling vs trend." if tip_c < tip_ema50 else "Bonds showing stable inflation expectations."
+            }
             
-            else:
-                 regime = "Transition"
-                 reason = "Price is between major moving averages; direction is neutral."
-                 confluence_count = 1
-                 confluence_details["trend"] = True
-
-        # Reliability Score
-        if confluence_count >= 3:
-            confidence = "High"
-        elif confluence_count == 2:
-            confidence = "Medium"
-        else:
-            confidence = "Low"
+            # Liquidity (TNX) - Falling yields = Easing
+            tnx_c = p_close['^TNX'].iloc[-1]
+            tnx_ema50 = ta.trend.ema_indicator(p_close['^TNX'], window=50).iloc[-1]
+            macro_tides["liquidity"] = {
+                "status": "Easing" if tnx_c < tnx_ema50 else "Tightening",
+                "details": "10-Year Yields (^TNX) are falling." if tnx_c < tnx_ema50 else "Yields are rising; capital tightening."
+            }
 
-        # --- Top-Down Automation Data ---
-        # 1. Macro (SPY)
-        macro_status = "Unknown"
-        relative_strength = 1.0 # Baseline
-        
-        # 2. Macro Tides (Growth, Inflation, Liquidity)
-        macro_tides = {
-            "growth": {"status": "Unknown", "value": None},
-            "inflation": {"status": "Unknown", "value": None},
-            "liquidity": {"status": "Unknown", "value": None}
-        }
-        
-        try:
-            # Optimized: Fetch all proxies at once
-            proxies = ["SPY", "XLI", "TIP", "^TNX"]
-            cache_key_proxies = f"proxies_{period}_{interval}"
-            p_data = get_cached(cache_key_proxies, ttl=3600) # Macro cache 1h
-            
-            if p_data is None:
-                p_data = safe_download(proxies, period=period, interval=interval)
-                set_cache(cache_key_proxies, p_data)
+            # --- Final Strategic Synthesis ---
+            g_status = macro_tides["growth"]["status"]
+            i_status = macro_tides["inflation"]["status"]
+            l_status = macro_tides["liquidity"]["status"]
             
-            if not p_data.empty:
-                # Handle MultiIndex
-                if isinstance(p_data.columns, pd.MultiIndex):
-                    p_close = p_data['Close']
-                    # De-duplicate if somehow multiple tickers got nested
-                    if isinstance(p_close, pd.DataFrame):
-                         p_close = p_close.loc[:, ~p_close.columns.duplicated()]
-                else:
-                    p_close = p_data # Fallback if single column
-
-                # Macro Trend (SPY)
-                spy_c = p_close['SPY'].iloc[-1]
-                spy_ema50 = ta.trend.ema_indicator(p_close['SPY'], window=50).iloc[-1]
-                macro_status = "Risk-On" if spy_c > spy_ema50 else "Risk-Off"
-                
-                # Growth (XLI)
-                xli_c = p_close['XLI'].iloc[-1]
-                xli_ema50 = ta.trend.ema_indicator(p_close['XLI'], window=50).iloc[-1]
-                macro_tides["growth"] = {
-                    "status": "Expanding" if xli_c > xli_ema50 else "Slowing",
-                    "details": "Industrials (XLI) trending up." if xli_c > xli_ema50 else "Industrial sector showing weakness."
-                }
-                
-                # Inflation (TIP) - Falling TIP often means rising inflation expectations
-                tip_c = p_close['TIP'].iloc[-1]
-                tip_ema50 = ta.trend.ema_indicator(p_close['TIP'], window=50).iloc[-1]
-                macro_tides["inflation"] = {
-                    "status": "Rising Pressure" if tip_c < tip_ema50 else "Cooling/Stable",
-                    "details": "TIP Bonds falling vs trend." if tip_c < tip_ema50 else "Bonds showing stable inflation expectations."
+            suggestion = {
+                "title": "Neutral / Transition",
+                "action": "Maintain balanced positions while waiting for macro clarity.",
+                "focus": "Quality & Cash"
+            }
+
+            if g_status == "Expanding" and l_status == "Easing":
+                suggestion = {
+                    "title": "Goldilocks Zone (Bullish)",
+                    "action": "Aggressively target High-Beta Tech and Growth stocks.",
+                    "focus": "Tech, Growth, Discretionary"
                 }
-                
-                # Liquidity (TNX) - Falling yields = Easing
-                tnx_c = p_close['^TNX'].iloc[-1]
-                tnx_ema50 = ta.trend.ema_indicator(p_close['^TNX'], window=50).iloc[-1]
-                macro_tides["liquidity"] = {
-                    "status": "Easing" if tnx_c < tnx_ema50 else "Tightening",
-                    "details": "10-Year Yields (^TNX) are falling." if tnx_c < tnx_ema50 else "Yields are rising; capital tightening."
+            elif g_status == "Slowing" and i_status == "Rising Pressure":
+                suggestion = {
+                    "title": "Stagflation Risk (Defensive)",
+                    "action": "Shift focus to commodities and inflation-resistant assets.",
+                    "focus": "Energy, Staples, Materials, Gold"
                 }
-
-                # --- Final Strategic Synthesis ---
-                g_status = macro_tides["growth"]["status"]
-                i_status = macro_tides["inflation"]["status"]
-                l_status = macro_tides["liquidity"]["status"]
-                
+            elif g_status == "Slowing" and l_status == "Tightening":
                 suggestion = {
-                    "title": "Neutral / Transition",
-                    "action": "Maintain balanced positions while waiting for macro clarity.",
-                    "focus": "Quality & Cash"
+                    "title": "Deflationary Pressure (Conservative)",
+                    "action": "Prioritize capital preservation and high-quality dividend payers.",
+                    "focus": "Cash, Healthcare, Utilities, Quality"
                 }
-
-                if g_status == "Expanding" and l_status == "Easing":
-                    suggestion = {
-                        "title": "Goldilocks Zone (Bullish)",
-                        "action": "Aggressively target High-Beta Tech and Growth stocks.",
-                        "focus": "Tech, Growth, Discretionary"
-                    }
-                elif g_status == "Slowing" and i_status == "Rising Pressure":
-                    suggestion = {
-                        "title": "Stagflation Risk (Defensive)",
-                        "action": "Shift focus to commodities and inflation-resistant assets.",
-                        "focus": "Energy, Staples, Materials, Gold"
-                    }
-                elif g_status == "Slowing" and l_status == "Tightening":
-                    suggestion = {
-                        "title": "Deflationary Pressure (Conservative)",
-                        "action": "Prioritize capital preservation and high-quality dividend payers.",
-                        "focus": "Cash, Healthcare, Utilities, Quality"
-                    }
-                elif g_status == "Expanding" and l_status == "Tightening":
-                    suggestion = {
-                        "title": "Late Cycle Expansion (Balanced)",
-                        "action": "Focus on cash-flow generative value sectors as liquidity tightens.",
-                        "focus": "Financials, Energy, Industrials"
-                    }
-                elif g_status == "Slowing" and l_status == "Easing":
-                    suggestion = {
-                        "title": "Early Cycle Recovery (Growth Focus)",
-                        "action": "Look for oversold growth opportunities as liquidity improves.",
-                        "focus": "Small Caps, Financials, Forward-looking Tech"
-                    }
-
-                # --- Sector Leadership Analysis ---
-                sectors = {
-                    "Technology": "XLK",
-                    "Energy": "XLE",
-                    "Financial Services": "XLF",
-                    "Healthcare": "XLV",
-                    "Consumer Defensive": "XLP",
-                    "Consumer Cyclical": "XLY",
-                    "Industrials": "XLI",
-                    "Basic Materials": "XLB",
-                    "Utilities": "XLU",
-                    "Real Estate": "XLRE",
-                    "Communication Services": "XLC"
+            elif g_status == "Expanding" and l_status == "Tightening":
+                suggestion = {
+                    "title": "Late Cycle Expansion (Balanced)",
+                    "action": "Focus on cash-flow generative value sectors as liquidity tightens.",
+                    "focus": "Financials, Energy, Industrials"
                 }
-                
-                sector_etfs = list(sectors.values())
-                cache_key_sectors = "sector_leadership_1mo"
-                s_data = get_cached(cache_key_sectors, ttl=14400) # Sector cache 4h
-                
-                if s_data is None:
-                    s_data = safe_download(sector_etfs, period="2mo", interval="1d")
-                    set_cache(cache_key_sectors, s_data)
-
-                sector_performance = {}
-                
-                if not s_data.empty:
-                    s_close = s_data['Close']
-                    for s_name, ticker in sectors.items():
-                        if ticker in s_close.columns and len(s_close[ticker]) > 20:
-                            ret = (s_close[ticker].iloc[-1] / s_close[ticker].iloc[-21]) - 1
-                            sector_performance[s_name] = ret
-                
-                leading_sector = max(sector_performance, key=sector_performance.get) if sector_performance else "Unknown"
-                
-                # Check if stock is in leading sector (Using Cached Info)
-                info = get_stock_info_cached(symbol)
-                stock_sector = info.get('sector', 'Unknown')
-                is_leading_sector = stock_sector == leading_sector
-
-                # 3. Relative Strength (1mo return vs SPY)
-                if len(df) > 20 and len(p_close['SPY']) > 20:
-                    stock_1m_ret = (df['Close'].iloc[-1] / df['Close'].iloc[-21]) - 1
-                    spy_1m_ret = (p_close['SPY'].iloc[-1] / p_close['SPY'].iloc[-21]) - 1
-                    relative_strength = (1 + stock_1m_ret) / (1 + spy_1m_ret)
-
-                # --- Decision Logic (Harmonized with Strategic Playbook) ---
-                playbook_title = suggestion.get("title", "Unknown")
-                playbook_focus = [s.strip().lower() for s in suggestion.get("focus", "").split(",")]
-                is_bullish_playbook = any(word in playbook_title for word in ["Bullish", "Goldilocks", "Recovery"])
-                is_bearish_playbook = any(word in playbook_title for word in ["Defensive", "Conservative", "Stagflation", "Deflationary"])
-                
-                # Check for Sector Alignment
-                stock_sector_lower = stock_sector.lower() if stock_sector else "unknown"
-                # Some mapping for yfinance sectors to playbook focus strings
-                sector_map = {
-                    "technology": "tech",
-                    "financial services": "financials",
-                    "energy": "energy",
-                    "industrials": "industrials",
-                    "healthcare": "healthcare",
-                    "consumer cyclical": "discretionary",
-                    "consumer defensive": "staples",
-                    "basic materials": "materials",
-                    "utilities": "utilities",
-                    "communication services": "communication"
+            elif g_status == "Slowing" and l_status == "Easing":
+                suggestion = {
+                    "title": "Early Cycle Recovery (Growth Focus)",
+                    "action": "Look for oversold growth opportunities as liquidity improves.",
+                    "focus": "Small Caps, Financials, Forward-looking Tech"
                 }
-                mapped_sector = sector_map.get(stock_sector_lower, stock_sector_lower)
-                is_sector_aligned = any(mapped_sector in f or f in mapped_sector for f in playbook_focus)
-
-                decision = "Wait / Watch"
-                
-                # Logic cases
-                if macro_status == "Risk-On" and regime == "Mark-Up" and confidence == "High" and is_leading_sector:
-                    if is_bullish_playbook and is_sector_aligned:
-                        decision = "Strong Buy. All cylinders are firing (Trend, Sector, and Macro Playbook)."
-                    elif not is_sector_aligned:
-                        decision = f"Cautious. Strong trend but {stock_sector} is not the current Macro priority ({playbook_title})."
-                    else:
-                        decision = "Hold / Buy. Strong technicals but macro playbook suggests balanced caution."
-                
-                elif regime == "Mark-Up" and macro_status == "Risk-On":
-                    if is_sector_aligned:
-                        decision = "Bullish. Sector and Trend are aligned with Risk-On and Macro."
-                    else:
-                        decision = "Speculative Bullish. Individual trend is strong, but sector lacks macro tailwind."
-                
-                elif is_bearish_playbook and (regime in ["Mark-Down", "Distribution", "Transition"]):
-                    decision = f"Avoid / Short. Low-conviction technicals fighting a {playbook_title} macro tide."
-                
-                elif regime == "Distribution":
-                    decision = "Avoid / Short. The technical bounce is fighting a distribution regime."
-                
-                elif regime == "Mark-Down":
-                    decision = "Avoid. Strong markdown in progress."
-                
-                elif regime == "Transition" and is_bullish_playbook:
-                    decision = "Watch for Entry. Macro is favorable, waiting for technical trend to establish."
-                
-                elif regime == "Accumulation":
-                    if is_sector_aligned:
-                        decision = f"Build Position. Accumulation phase in a priority macro sector ({playbook_title})."
-                    else:
-                        decision = "Hold / Watch. Quiet absorption detected, but sector is not currently a macro priority."
-                
-                elif macro_status == "Risk-Off":
-                     decision = "Defensive. Macro Risk-Off environment overrides technical setups."
-
-        except Exception as p_err:
-            print(f"Error fetching Market Proxies: {p_err}")
-
-        # --- Market Dynamics Synthesis ---
-        # (This block moved down to allow divergence access)
-
-        # Prepare response
-        # --- MACD Divergence Detection (Wave-based) ---
-        # --- Divergence Detection (Generic) ---
-        def find_divergence(df, indicator_col):
-            if len(df) < 50: return None
+
+            timer.lap("macro")
+
+            # --- Sector Leadership Analysis ---
+            sectors = SECTOR_ETFS
+
+            sector_performance = {}
             
+            if not s_data.empty:
+                s_close = s_data['Close']
+                for s_name, ticker in sectors.items():
+                    if ticker in s_close.columns and len(s_close[ticker]) > 20:
+                        ret = (s_close[ticker].iloc[-1] / s_close[ticker].iloc[-21]) - 1
+                        sector_performance[s_name] = ret
             
-            hist = df[indicator_col].values
-            prices = df['High'].values # Use Highs for Bearish
-            lows = df['Low'].values # Use Lows for Bullish
+            leading_sector = max(sector_performance, key=sector_performance.get) if sector_performance else "Unknown"
             
-            # 1. Identify Segments (waves between zero-crossings)
-            segments = []
-            if len(hist) < 2: return None
+            # Check if stock is in leading sector (Using Cached Info)
+            stock_sector = stock_info.get('sector', 'Unknown')
+            is_leading_sector = stock_sector == leading_sector
+
+            # 3. Relative Strength (1mo return vs SPY)
+            if len(df) > 20 and len(p_close['SPY']) > 20:
+                stock_1m_ret = (df['Close'].iloc[-1] / df['Close'].iloc[-21]) - 1
+                spy_1m_ret = (p_close['SPY'].iloc[-1] / p_close['SPY'].iloc[-21]) - 1
+                relative_strength = (1 + stock_1m_ret) / (1 + spy_1m_ret)
+
+            # --- Decision Logic (Harmonized with Strategic Playbook) ---
+            playbook_title = suggestion.get("title", "Unknown")
+            playbook_focus = [s.strip().lower() for s in suggestion.get("focus", "").split(",")]
+            is_bullish_playbook = any(word in playbook_title for word in ["Bullish", "Goldilocks", "Recovery"])
+            is_bearish_playbook = any(word in playbook_title for word in ["Defensive", "Conservative", "Stagflation", "Deflationary"])
             
-            current_seg = {"indices": [0], "type": "pos" if hist[0] >= 0 else "neg"}
+            # Check for Sector Alignment
+            stock_sector_lower = stock_sector.lower() if stock_sector else "unknown"
+            # Some mapping for yfinance sectors to playbook focus strings
+            sector_map = {
+                "technology": "tech",
+                "financial services": "financials",
+                "energy": "energy",
+                "industrials": "industrials",
+                "healthcare": "healthcare",
+                "consumer cyclical": "discretionary",
+                "consumer defensive": "staples",
+                "basic materials": "materials",
+                "utilities": "utilities",
+                "communication services": "communication"
+            }
+            mapped_sector = sector_map.get(stock_sector_lower, stock_sector_lower)
+            is_sector_aligned = any(mapped_sector in f or f in mapped_sector for f in playbook_focus)
+
+            decision = "Wait / Watch"
             
-            for i in range(1, len(hist)):
-                h = hist[i]
-                is_pos = h >= 0
-                if (is_pos and current_seg["type"] == "pos") or (not is_pos and current_seg["type"] == "neg"):
-                    current_seg["indices"].append(i)
+            # Logic cases
+            if macro_status == "Risk-On" and regime == "Mark-Up" and confidence == "High" and is_leading_sector:
+                if is_bullish_playbook and is_sector_aligned:
+                    decision = "Strong Buy. All cylinders are firing (Trend, Sector, and Macro Playbook)."
+                elif not is_sector_aligned:
+                    decision = f"Cautious. Strong trend but {stock_sector} is not the current Macro priority ({playbook_title})."
                 else:
-                    segments.append(current_seg)
-                    current_seg = {"indices": [i], "type": "pos" if is_pos else "neg"}
-            segments.append(current_seg)
+                    decision = "Hold / Buy. Strong technicals but macro playbook suggests balanced caution."
             
-            # 2. Extract extrema for each segment
-            valid_segments = []
-            for seg in segments:
-                idxs = seg["indices"]
-                # Skip segments that are entirely NaNs
-                if pd.isna(hist[idxs]).all():
-                    continue
-                
-                if seg["type"] == "pos":
-                    peak_idx = idxs[0] + pd.Series(hist[idxs]).idxmax()
-                    seg["extrema_idx"] = int(peak_idx)
-                    seg["extrema_val"] = float(hist[peak_idx])
-                    # Use segment max High
-                    subset_prices = prices[idxs]
-                    seg["price_at_extrema"] = float(pd.Series(subset_prices).max())
+            elif regime == "Mark-Up" and macro_status == "Risk-On":
+                if is_sector_aligned:
+                    decision = "Bullish. Sector and Trend are aligned with Risk-On and Macro."
                 else:
-                    trough_idx = idxs[0] + pd.Series(hist[idxs]).idxmin()
-                    seg["extrema_idx"] = int(trough_idx)
-                    seg["extrema_val"] = float(hist[trough_idx])
-                    # Use segment min Low
-                    subset_lows = lows[idxs]
-                    seg["price_at_extrema"] = float(pd.Series(subset_lows).min())
-                valid_segments.append(seg)
+                    decision = "Speculative Bullish. Individual trend is strong, but sector lacks macro tailwind."
+            
+            elif is_bearish_playbook and (regime in ["Mark-Down", "Distribution", "Transition"]):
+                decision = f"Avoid / Short. Low-conviction technicals fighting a {playbook_title} macro tide."
+            
+            elif regime == "Distribution":
+                decision = "Avoid / Short. The technical bounce is fighting a distribution regime."
             
-            segments = valid_segments
-
-            # 3. Detect Bearish Divergence Lookback (Dynamic S2 & Stricter Bridge)
-            pos_segs = [s for s in segments if s["type"] == "pos" and len(s["indices"]) > 1]
-            if len(pos_segs) >= 2:
-                for j in range(1, min(len(pos_segs), 3)):
-                    s2 = pos_segs[-j]
-                    recency = len(hist) - 1 - s2["extrema_idx"]
-                    if recency < 30: # Keep drawing historicals for chart context
-                        is_confirmed = recency >= 1
-                        indicator_ticked_down = hist[-1] < s2["extrema_val"] if is_confirmed else False
-                        
-                        if j > 1:
-                            is_confirmed = True
-                            indicator_ticked_down = True
-
-                        if is_confirmed and indicator_ticked_down:
-                            for k in range(1, min(len(pos_segs) - (j-1), 4)):
-                                s1 = pos_segs[-j - k]
-                                s1_idx_all = segments.index(s1)
-                                s2_idx_all = segments.index(s2)
-                                bridge_count = s2_idx_all - s1_idx_all - 1
-                                distance_count = s2["extrema_idx"] - s1["extrema_idx"]
-
-                                if bridge_count == 1 and distance_count <= 40:
-                                    # Tightened tolerance to 0.5%
-                                    price_condition = s2["price_at_extrema"] >= (s1["price_at_extrema"] * 0.995)
-                                    if price_condition and s2["extrema_val"] < s1["extrema_val"]:
-                                        if any(segments[m]["type"] == "neg" for m in range(s1_idx_all + 1, s2_idx_all)):
-                                            return {
-                                                "type": "bearish", 
-                                                "idx1": s1["extrema_idx"], 
-                                                "idx2": s2["extrema_idx"],
-                                                "recency": int(recency)
-                                            }
-
-            # 4. Detect Bullish Divergence Lookback (Dynamic S2 & Stricter Bridge)
-            neg_segs = [s for s in segments if s["type"] == "neg" and len(s["indices"]) > 1]
-            if len(neg_segs) >= 2:
-                for j in range(1, min(len(neg_segs), 3)):
-                    s2 = neg_segs[-j]
-                    recency = len(hist) - 1 - s2["extrema_idx"]
-                    if recency < 30: # Keep drawing historicals for chart context
-                        is_confirmed = recency >= 1
-                        indicator_ticked_up = hist[-1] > s2["extrema_val"] if is_confirmed else False
-                        
-                        if j > 1:
-                            is_confirmed = True
-                            indicator_ticked_up = True
-
-                        if is_confirmed and indicator_ticked_up:
-                            for k in range(1, min(len(neg_segs) - (j-1), 4)):
-                                s1 = neg_segs[-j - k]
-                                s1_idx_all = segments.index(s1)
-                                s2_idx_all = segments.index(s2)
-                                bridge_count = s2_idx_all - s1_idx_all - 1
-                                distance_count = s2["extrema_idx"] - s1["extrema_idx"]
-
-                                if bridge_count == 1 and distance_count <= 40:
-                                    # Tightened tolerance to 0.5%
-                                    price_condition = s2["price_at_extrema"] <= (s1["price_at_extrema"] * 1.005)
-                                    if price_condition and s2["extrema_val"] > s1["extrema_val"]:
-                                        if any(segments[m]["type"] == "pos" for m in range(s1_idx_all + 1, s2_idx_all)):
-                                            return {
-                                                "type": "bullish", 
-                                                "idx1": s1["extrema_idx"], 
-                                                "idx2": s2["extrema_idx"],
-                                                "recency": int(recency)
-                                            }
+            elif regime == "Mark-Down":
+                decision = "Avoid. Strong markdown in progress."
+            
+            elif regime == "Transition" and is_bullish_playbook:
+                decision = "Watch for Entry. Macro is favorable, waiting for technical trend to establish."
+            
+            elif regime == "Accumulation":
+                if is_sector_aligned:
+                    decision = f"Build Position. Accumulation phase in a priority macro sector ({playbook_title})."
+                else:
+                    decision = "Hold / Watch. Quiet absorption detected, but sector is not currently a macro priority."
             
-            return None
+            elif macro_status == "Risk-Off":
+                 decision = "Defensive. Macro Risk-Off environment overrides technical setups."
+
+    except Exception as p_err:
+        print(f"Error fetching Market Proxies: {p_err}")
+    timer.lap("sector")
+
+    # --- Market Dynamics Synthesis ---
+    # (This block moved down to allow divergence access)
+
+    # Prepare response
+    # --- Divergence Detection (Wave-based, see divergence.py) ---
+    # Recent divergences (extreme within 30 bars) are kept for chart context
+    macd_divergence = latest_divergence(df, 'macd_diff')
+    f13_divergence = None
+    if interval != '1wk':
+         f13_divergence = latest_divergence(df, 'force_index_13')
+    timer.lap("divergence")
+
+    # --- Alexander Elder Technical Synthesis (Post-Divergence) ---
+    # 1. Trend (The Tide)
+    # If interval is daily, Screen 1 (The Tide) must be the Weekly EMA13 slope.
+    # If already in weekly, use the current dataframe.
+    
+    ema13_slope = df['ema_13'].diff().iloc[-1]
+    tide_slope = ema13_slope
+    tide_label = "Daily"
+    
+    if interval == "1d":
+        try:
+            # Weekly data for Screen 1 (The Tide), loaded with the bars
+            if not wk_df.empty and len(wk_df) > 13:
+                wk_ema13 = ta.trend.ema_indicator(wk_df['Close'], window=13)
+                tide_slope = wk_ema13.diff().iloc[-1]
+                tide_label = "Weekly"
+        except Exception as wk_err:
+            print(f"Error fetching Weekly Tide for {symbol}: {wk_err}")
+
+    # 2. Strategy Synthesis (Triple Screen)
+    force2 = df['force_index_2'].iloc[-1]
+    wr = df['williams_r'].iloc[-1]
+    stoch_k = df['stoch_k'].iloc[-1]
+    impulse_color = df['impulse'].iloc[-1]
+    last_pattern = df['candle_pattern'].iloc[-1] if 'candle_pattern' in df.columns else None
+    last_pattern_type = df['candle_pattern_type'].iloc[-1] if 'candle_pattern_type' in df.columns else None
+    efi_buy = bool(df['efi_buy_signal'].iloc[-1])
+    efi_sell = bool(df['efi_sell_signal'].iloc[-1])
+    
+    # Screen 2: The Wave (Oscillator Streaks)
+    f2_streak = 0
+    f2_vals = df['force_index_2'].values
+    if force2 > 0:
+        for v in reversed(f2_vals):
+            if v > 0: f2_streak += 1
+            else: break
+    else:
+        for v in reversed(f2_vals):
+            if v < 0: f2_streak += 1
+            else: break
+
+    elder_recommendation = "WAIT"
+    tactic_reason = "No high-confluence setup detected."
+    ripple_msg = "Waiting for setup."
+    confluence_alert = None
+    
+    entry_price = float(df['High'].iloc[-1])
+    target_price = float(df['envelope_upper'].iloc[-1])
+    stop_price = float(df['ema_26'].iloc[-1])
+
+    if tide_slope > 0: # Bull Tide
+        if impulse_color == "red":
+            elder_recommendation = "WAIT (CENSORED)"
+            tactic_reason = f"{tide_label} Tide is active, but Impulse System is RED. Long trades are forbidden."
+            ripple_msg = "Stay in cash or preserve existing shorts."
+        elif force2 < 0:
+            elder_recommendation = "BUY"
+            tactic_reason = f"{tide_label} Bull Tide; {f2_streak}-day pullback detected."
+            # Confluence: Pullback + Bullish Candlestick
+            if last_pattern_type == 'bullish':
+                pattern_clean = last_pattern.replace('_', ' ').title()
+                tactic_reason += f" {pattern_clean} pattern validates demand during this pullback."
+                if efi_buy:
+                    confluence_alert = f"HIGH-CONVICTION REVERSAL: {pattern_clean} + EFI 3-ATR exhaustion signal. Professional buying detected."
+            
+            # Confluence: Divergence
+            if macd_divergence and macd_divergence['type'] == 'bullish' and macd_divergence['recency'] < 5:
+                confluence_alert = "BULLISH CONFLUENCE: MACD Divergence confirmed by oscillator exhaustion."
+            
+            ripple_msg = f"Place BUY STOP at ${entry_price:.2f} (today's high). Target ${target_price:.2f}."
+        else:
+            elder_recommendation = "HOLD / ADD"
+            tactic_reason = f"{tide_label} Tide is intact. Momentum is with the bulls."
+            ripple_msg = "Wait for a Force Index (2) dip below zero before adding size."
+    
+    elif tide_slope < 0: # Bear Tide
+        entry_price = float(df['Low'].iloc[-1])
+        target_price = float(df['envelope_lower'].iloc[-1])
+        
+        if impulse_color == "green":
+            elder_recommendation = "WAIT (CENSORED)"
+            tactic_reason = f"{tide_label} Tide is active, but Impulse System is GREEN. Short trades are forbidden."
+            ripple_msg = "Liquidate shorts and wait for a blue/red impulse."
+        elif force2 > 0:
+            elder_recommendation = "SELL / SHORT"
+            tactic_reason = f"{tide_label} Bear Tide; {f2_streak}-day counter-rally detected."
+            
+            # Confluence: Counter-rally + Bearish Candlestick
+            if last_pattern_type == 'bearish':
+                pattern_clean = last_pattern.replace('_', ' ').title()
+                tactic_reason += f" {pattern_clean} pattern signals professional selling into this bounce."
+                if efi_sell:
+                    confluence_alert = f"HIGH-CONVICTION REVERSAL: {pattern_clean} + EFI 3-ATR exhaustion signal. Professional selling detected."
+            
+            # Confluence: Divergence
+            if macd_divergence and macd_divergence['type'] == 'bearish' and macd_divergence['recency'] < 5:
+                confluence_alert = "BEARISH CONFLUENCE: MACD Divergence confirmed by rally exhaustion."
+
+            ripple_msg = f"Place SELL STOP at ${entry_price:.2f} (today's low). Target ${target_price:.2f}."
+        else:
+            elder_recommendation = "AVOID / PROTECT"
+            tactic_reason = f"{tide_label} Tide is intact. Momentum is with the bears."
+            ripple_msg = "Wait for a Force Index (2) rally above zero before shorting."
+
+    # Custom Confluence Alerts & Wisdom
+    confluence_alert, candle_wisdom = detect_confluence(df, macd_divergence)
+
+    elder_tactics = {
+        "type": "LONG" if tide_slope > 0 else "SHORT",
+        "recommendation": elder_recommendation,
+        "reason": tactic_reason,
+        "confluence_alert": confluence_alert,
+        "candle_wisdom": candle_wisdom,
+        "ripple_msg": ripple_msg,
+        "entry": round(entry_price, 2) if entry_price else None,
+        "target": round(target_price, 2) if target_price else None,
+        "stop": round(stop_price, 2) if stop_price else None,
+        "screen2": {
+            "force_index_2": float(force2),
+            "f2_streak": f2_streak,
+            "williams_r": float(wr),
+            "stoch_k": float(stoch_k),
+            "status": "Oversold" if wr < -80 else "Overbought" if wr > -20 else "Neutral",
+        },
+        "style": "success" if elder_recommendation in ["BUY", "HOLD / ADD"] else "danger" if elder_recommendation in ["SELL / SHORT", "AVOID / PROTECT"] else "warning"
+    }
+
+    timer.lap("tactics")
+
+    # Sidebar Sync & Response construction...
+    response = {
+        "symbol": symbol,
+        "data": None,  # filled in the requested format below
+        "regime": regime,
+        "regime_reason": reason,
+        "volatility": volatility_status,
+        "confidence": confidence,
+        "confluence_factor": confluence_count,
+        "confluence_details": confluence_details,
+        "macro_status": macro_status,
+        "relative_strength": round(float(relative_strength), 4),
+        "macro_tides": macro_tides,
+        "strategic_suggestion": suggestion,
+        "decision": decision,
+        "sector_analysis": {
+            "stock_sector": stock_sector,
+            "leading_sector": leading_sector,
+            "is_leading": is_leading_sector,
+            "sector_performance": sector_performance
+        },
+        "sr_levels": sr_levels,
+        "elder_tactics": elder_tactics,
+        "macd_divergence": macd_divergence,
+        "f13_divergence": f13_divergence
+    }
+
+    # Sidebar status fields, for stock_sync.enqueue()
+    setup_signal = None
+    if tide_slope > 0 and force2 < 0:
+        setup_signal = 'pullback_buy'
+    elif tide_slope < 0 and force2 > 0:
+        setup_signal = 'pullback_sell'
+    sync = {
+        "efi_status": 'buy' if efi_buy else 'sell' if efi_sell else None,
+        "setup_signal": setup_signal,
+        "divergence_status": macd_divergence.get('type') if macd_divergence else None,
+        "confluence_alert": confluence_alert,
+    }
+    return response, df, sync
+
+
+@router.get("/{symbol}/analysis", response_class=FastJSONResponse)
+def get_stock_analysis(symbol: str, interval: str = "1d", period: str = "1y", indicators: str = None,
+                       format: str = "records", since: Optional[str] = None, last_n: Optional[int] = None,
+                       fields: Optional[str] = None, accept: Optional[str] = Header(None), session: Session = Depends(get_session)):
+    """
+    Indicator history plus the Elder analysis for `symbol`. `format` selects
+    the layout of `data`: "records" (one object per bar) or "columnar"
+    ({index_name, index, columns, values: {column: [...]}}, see serialization.py).
+    Accept: application/vnd.apache.arrow.stream returns the indicator frame as
+    an Arrow stream (the rest in its metadata); application/msgpack the
+    JSON document as MessagePack.
+
+    For polling, `since` (the client's last bar) and/or `last_n` limit `data`
+    to the tail of the series; indicators are still computed on the full
+    history, and `window` gives the tail's offset in it (divergence idx1/idx2
+    are positions in the full history).
+
+    `fields` (comma-separated FIELD_GROUPS names such as guppy, efi_bands,
+    elder, or indicator/column names) projects `data` onto OHLCV, those
+    columns and any `indicators` columns. Without a cached frame only they and
+    what the analysis itself reads (the "analysis" profile) are computed.
+    """
+    if format not in SERIES_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}', expected one of {list(SERIES_FORMATS)}")
+    if last_n is not None and last_n < 1:
+        raise HTTPException(status_code=400, detail="last_n must be at least 1")
+    if since is not None:
+        try:
+            valid = not pd.isna(pd.Timestamp(since))
+        except ValueError:
+            valid = False
+        if not valid:
+            raise HTTPException(status_code=400, detail=f"Invalid since timestamp '{since}'")
+    projection = None
+    if fields is not None:
+        try:
+            projection = field_columns(f.strip() for f in fields.split(",") if f.strip())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        macd_divergence = find_divergence(df, 'macd_diff')
-        f13_divergence = None
-        if interval != '1wk':
-             f13_divergence = find_divergence(df, 'force_index_13')
+    timer = StageTimer("analysis")
 
-        # --- Alexander Elder Technical Synthesis (Post-Divergence) ---
-        # 1. Trend (The Tide)
-        # If interval is daily, Screen 1 (The Tide) must be the Weekly EMA13 slope.
-        # If already in weekly, use the current dataframe.
-        
-        ema13_slope = df['ema_13'].diff().iloc[-1]
-        tide_slope = ema13_slope
-        tide_label = "Daily"
+    # Fetch data (Use cache)
+    cache_key = f"download_{symbol}_{period}_{interval}"
+    cache_key_proxies = f"proxies_{period}_{interval}"
+    cache_key_wk = f"tide_wk_{symbol}"
+    df = get_cached(cache_key, ttl=900) # 15 mins for price data
+    p_data = get_cached(cache_key_proxies, ttl=3600) # Macro cache 1h
+    s_data = get_cached(SECTOR_CACHE_KEY, ttl=14400) # Sector cache 4h
+    wk_df = get_cached(cache_key_wk, ttl=3600) if interval == "1d" else None
+
+    try:
+        # The loads are independent: on a cold cache the bars, macro proxies, sector
+        # ETFs, weekly tide and stock info are fetched at once, not one after another
+        downloads = {}
+        if df is None:
+            downloads["bars"] = (symbol, period, interval)
+        if p_data is None:
+            downloads["proxies"] = (MACRO_PROXIES, period, interval)
+        if s_data is None:
+            downloads["sectors"] = (list(SECTOR_ETFS.values()), "2mo", "1d")
+        if interval == "1d" and wk_df is None:
+            downloads["tide"] = (symbol, "2y", "1wk")
+        fetched = fetch_concurrently(downloads, {"info": lambda: get_stock_info_cached(symbol)})
+        stock_info = fetched.get("info") or {}
+
+        # A load that failed or timed out is empty: use it, but retry it next time
+        if "proxies" in downloads:
+            p_data = fetched["proxies"]
+            if not p_data.empty:
+                set_cache(cache_key_proxies, p_data)
+        if "sectors" in downloads:
+            s_data = fetched["sectors"]
+            if not s_data.empty:
+                set_cache(SECTOR_CACHE_KEY, s_data)
+        if "tide" in downloads:
+            wk_df = fetched["tide"]
+            if isinstance(wk_df.columns, pd.MultiIndex):
+                wk_df.columns = wk_df.columns.get_level_values(0)
+            if not wk_df.empty:
+                set_cache(cache_key_wk, wk_df)
+
+        if df is None:
+            df = fetched["bars"]
+            if df.empty:
+                 raise HTTPException(status_code=404, detail="No data found for symbol")
+            set_cache(cache_key, df)
+        timer.lap("fetch")
         
-        if interval == "1d":
+        # Parse dynamic indicators if provided
+        dynamic_configs = None
+        if indicators:
             try:
-                # Fetch weekly data for Screen 1 (The Tide)
-                cache_key_wk = f"tide_wk_{symbol}"
-                wk_df = get_cached(cache_key_wk, ttl=3600)
-                if wk_df is None:
-                    wk_df = safe_download(symbol, period="2y", interval="1wk")
-                    if isinstance(wk_df.columns, pd.MultiIndex):
-                        wk_df.columns = wk_df.columns.get_level_values(0)
-                    set_cache(cache_key_wk, wk_df)
-                
-                if not wk_df.empty and len(wk_df) > 13:
-                    wk_ema13 = ta.trend.ema_indicator(wk_df['Close'], window=13)
-                    tide_slope = wk_ema13.diff().iloc[-1]
-                    tide_label = "Weekly"
-            except Exception as wk_err:
-                print(f"Error fetching Weekly Tide for {symbol}: {wk_err}")
-
-        # 2. Strategy Synthesis (Triple Screen)
-        force2 = df['force_index_2'].iloc[-1]
-        wr = df['williams_r'].iloc[-1]
-        stoch_k = df['stoch_k'].iloc[-1]
-        impulse_color = df['impulse'].iloc[-1]
-        last_pattern = df['candle_pattern'].iloc[-1] if 'candle_pattern' in df.columns else None
-        last_pattern_type = df['candle_pattern_type'].iloc[-1] if 'candle_pattern_type' in df.columns else None
-        efi_buy = bool(df['efi_buy_signal'].iloc[-1])
-        efi_sell = bool(df['efi_sell_signal'].iloc[-1])
-        
-        # Screen 2: The Wave (Oscillator Streaks)
-        f2_streak = 0
-        f2_vals = df['force_index_2'].values
-        if force2 > 0:
-            for v in reversed(f2_vals):
-                if v > 0: f2_streak += 1
-                else: break
-        else:
-            for v in reversed(f2_vals):
-                if v < 0: f2_streak += 1
-                else: break
-
-        elder_recommendation = "WAIT"
-        tactic_reason = "No high-confluence setup detected."
-        ripple_msg = "Waiting for setup."
-        confluence_alert = None
-        
-        entry_price = float(df['High'].iloc[-1])
-        target_price = float(df['envelope_upper'].iloc[-1])
-        stop_price = float(df['ema_26'].iloc[-1])
-
-        if tide_slope > 0: # Bull Tide
-            if impulse_color == "red":
-                elder_recommendation = "WAIT (CENSORED)"
-                tactic_reason = f"{tide_label} Tide is active, but Impulse System is RED. Long trades are forbidden."
-                ripple_msg = "Stay in cash or preserve existing shorts."
-            elif force2 < 0:
-                elder_recommendation = "BUY"
-                tactic_reason = f"{tide_label} Bull Tide; {f2_streak}-day pullback detected."
-                # Confluence: Pullback + Bullish Candlestick
-                if last_pattern_type == 'bullish':
-                    pattern_clean = last_pattern.replace('_', ' ').title()
-                    tactic_reason += f" {pattern_clean} pattern validates demand during this pullback."
-                    if efi_buy:
-                        confluence_alert = f"HIGH-CONVICTION REVERSAL: {pattern_clean} + EFI 3-ATR exhaustion signal. Professional buying detected."
-                
-                # Confluence: Divergence
-                if macd_divergence and macd_divergence['type'] == 'bullish' and macd_divergence['recency'] < 5:
-                    confluence_alert = "BULLISH CONFLUENCE: MACD Divergence confirmed by oscillator exhaustion."
-                
-                ripple_msg = f"Place BUY STOP at ${entry_price:.2f} (today's high). Target ${target_price:.2f}."
-            else:
-                elder_recommendation = "HOLD / ADD"
-                tactic_reason = f"{tide_label} Tide is intact. Momentum is with the bulls."
-                ripple_msg = "Wait for a Force Index (2) dip below zero before adding size."
-        
-        elif tide_slope < 0: # Bear Tide
-            entry_price = float(df['Low'].iloc[-1])
-            target_price = float(df['envelope_lower'].iloc[-1])
-            
-            if impulse_color == "green":
-                elder_recommendation = "WAIT (CENSORED)"
-                tactic_reason = f"{tide_label} Tide is active, but Impulse System is GREEN. Short trades are forbidden."
-                ripple_msg = "Liquidate shorts and wait for a blue/red impulse."
-            elif force2 > 0:
-                elder_recommendation = "SELL / SHORT"
-                tactic_reason = f"{tide_label} Bear Tide; {f2_streak}-day counter-rally detected."
-                
-                # Confluence: Counter-rally + Bearish Candlestick
-                if last_pattern_type == 'bearish':
-                    pattern_clean = last_pattern.replace('_', ' ').title()
-                    tactic_reason += f" {pattern_clean} pattern signals professional selling into this bounce."
-                    if efi_sell:
-                        confluence_alert = f"HIGH-CONVICTION REVERSAL: {pattern_clean} + EFI 3-ATR exhaustion signal. Professional selling detected."
-                
-                # Confluence: Divergence
-                if macd_divergence and macd_divergence['type'] == 'bearish' and macd_divergence['recency'] < 5:
-                    confluence_alert = "BEARISH CONFLUENCE: MACD Divergence confirmed by rally exhaustion."
-
-                ripple_msg = f"Place SELL STOP at ${entry_price:.2f} (today's low). Target ${target_price:.2f}."
-            else:
-                elder_recommendation = "AVOID / PROTECT"
-                tactic_reason = f"{tide_label} Tide is intact. Momentum is with the bears."
-                ripple_msg = "Wait for a Force Index (2) rally above zero before shorting."
-
-        # Custom Confluence Alerts & Wisdom
-        confluence_alert, candle_wisdom = detect_confluence(df, macd_divergence)
-
-        elder_tactics = {
-            "type": "LONG" if tide_slope > 0 else "SHORT",
-            "recommendation": elder_recommendation,
-            "reason": tactic_reason,
-            "confluence_alert": confluence_alert,
-            "candle_wisdom": candle_wisdom,
-            "ripple_msg": ripple_msg,
-            "entry": round(entry_price, 2) if entry_price else None,
-            "target": round(target_price, 2) if target_price else None,
-            "stop": round(stop_price, 2) if stop_price else None,
-            "screen2": {
-                "force_index_2": float(force2),
-                "f2_streak": f2_streak,
-                "williams_r": float(wr),
-                "stoch_k": float(stoch_k),
-                "status": "Oversold" if wr < -80 else "Overbought" if wr > -20 else "Neutral",
-            },
-            "style": "success" if elder_recommendation in ["BUY", "HOLD / ADD"] else "danger" if elder_recommendation in ["SELL / SHORT", "AVOID / PROTECT"] else "warning"
-        }
+                dynamic_configs = json.loads(indicators)
+            except Exception as e:
+                logger.error(f"Failed to parse dynamic indicators for {symbol}: {e}")
 
-        # Sidebar Sync & Response construction...
-        response = {
-            "symbol": symbol,
-            "data": df.reset_index().to_dict(orient="records"),
-            "regime": regime,
-            "regime_reason": reason,
-            "volatility": volatility_status,
-            "confidence": confidence,
-            "confluence_factor": confluence_count,
-            "confluence_details": confluence_details,
-            "macro_status": macro_status,
-            "relative_strength": round(float(relative_strength), 4),
-            "macro_tides": macro_tides,
-            "strategic_suggestion": suggestion,
-            "decision": decision,
-            "sector_analysis": {
-                "stock_sector": stock_sector,
-                "leading_sector": leading_sector,
-                "is_leading": is_leading_sector,
-                "sector_performance": sector_performance
-            },
-            "sr_levels": sr_levels,
-            "elder_tactics": elder_tactics,
-            "macd_divergence": macd_divergence,
-            "f13_divergence": f13_divergence
-        }
+        outputs = None
+        if projection is not None:
+            outputs = [*PROFILES["analysis"].outputs, *projection]
+        # Full candle patterns only when they are projected; the analysis reads the last bar
+        profile = "analysis" if outputs is not None and 'candle_pattern' not in projection else None
+        response, df, sync = analyze_frame(symbol, df, interval, p_data, s_data, wk_df, stock_info,
+                                           dynamic_configs=dynamic_configs, outputs=outputs,
+                                           profile=profile, timer=timer)
 
         # --- Sidebar Sync (Update Stock Table) ---
-        # Run a quick check for sidebar status icons to keep them in sync with latest analysis
-        try:
-            statement = select(Stock).where(Stock.symbol == symbol)
-            db_stock = session.exec(statement).first()
-            if db_stock:
-                # 1. EFI Status
-                efi_buy = df['efi_buy_signal'].iloc[-1]
-                efi_sell = df['efi_sell_signal'].iloc[-1]
-                db_stock.efi_status = 'buy' if efi_buy else 'sell' if efi_sell else None
-                
-                # 2. Setup Signal (Triple Screen)
-                setup_signal = None
-                if tide_slope > 0 and force2 < 0:
-                    setup_signal = 'pullback_buy'
-                elif tide_slope < 0 and force2 > 0:
-                    setup_signal = 'pullback_sell'
-                db_stock.setup_signal = setup_signal
-                
-                # 3. Divergence
-                db_stock.divergence_status = macd_divergence.get('type') if macd_divergence else None
-                
-                # 4. Confluence
-                db_stock.confluence_alert = confluence_alert
-                
-                session.add(db_stock)
-                session.commit()
-        except Exception as sync_err:
-            print(f"Sync error for {symbol}: {sync_err}")
-
-        # DEBUG: Verify signals in response
-        active_buys = [d for d in response['data'] if d.get('efi_buy_signal')]
-        active_sells = [d for d in response['data'] if d.get('efi_sell_signal')]
-        print(f"DEBUG [{symbol}]: Active Buys={len(active_buys)}, Active Sells={len(active_sells)}")
-        if active_buys: print(f"DEBUG: Sample Buy Bar: {active_buys[0].get('Date')}")
-        if active_sells: print(f"DEBUG: Sample Sell Bar: {active_sells[0].get('Date')}")
-
-        return clean_nans(response)
+        # Keep the sidebar status icons in sync with the latest analysis. The write is
+        # queued (stock_sync.py) so chart views never wait on the SQLite write lock.
+        stock_sync.enqueue(symbol, sync)
+
+        timer.lap("sync")
+
+        series = df
+        if projection is not None:
+            known = set(available_outputs()) | {'atr'}
+            keep = set(BASE_COLUMNS) | set(projection)
+            series = df[[col for col in df.columns if col in keep or col not in known]]
+        if since is not None or last_n is not None:
+            series, offset = series_window(series, since=since, last_n=last_n)
+            response["window"] = {"offset": offset, "bars": len(series), "total_bars": len(df)}
+
+        media_type = negotiate(accept)
+        if media_type != ARROW_MEDIA_TYPE:  # Arrow streams the frame itself
+            if format == "columnar":
+                response["data"] = columnar(series)
+            else:
+                response["data"] = series.reset_index().to_dict(orient="records")
+        result = negotiated_response(response, media_type, table_key="data", table=series)
+        timer.lap("serialize")
+
+        result.headers["Server-Timing"] = timer.server_timing()
+        timer.finish(symbol=symbol, interval=interval, period=period, bars=len(df), format=format,
+                     fields=fields, columns=len(series.columns),
+                     media_type=media_type, efi_buys=int(df['efi_buy_signal'].fillna(False).astype(bool).sum()),
+                     efi_sells=int(df['efi_sell_signal'].fillna(False).astype(bool).sum()))
+        return result
 
     except Exception as e:
         import traceback
@@ -1538,3 +1011,152 @@ def get_stock_analysis(symbol: str, interval: str = "1d", period: str = "1y", in
             traceback.print_exc(file=f)
         print(f"Error analyzing {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ticker_frame(data: pd.DataFrame, symbol: str) -> pd.DataFrame:
+    """One ticker's bars from a multi-ticker download, keeping its (Price, Ticker) layout."""
+    if data.empty or symbol not in data.columns.get_level_values(1):
+        return pd.DataFrame()
+    # The index is the union of every ticker's dates: drop the ones this ticker lacks
+    return data.xs(symbol, axis=1, level=1, drop_level=False).dropna(how="all")
+
+
+def analysis_summary(response: dict, df: pd.DataFrame) -> dict:
+    """The dashboard card of one analysis: regime, impulse and Elder tactics, no history."""
+    tactics = response["elder_tactics"]
+    macd_divergence, f13_divergence = response["macd_divergence"], response["f13_divergence"]
+    return {
+        "symbol": response["symbol"],
+        "date": df.index[-1],
+        "close": float(df['Close'].iloc[-1]),
+        "impulse": df['impulse'].iloc[-1],
+        "regime": response["regime"],
+        "confidence": response["confidence"],
+        "confluence_factor": response["confluence_factor"],
+        "volatility": response["volatility"],
+        "relative_strength": response["relative_strength"],
+        "decision": response["decision"],
+        "sector": response["sector_analysis"]["stock_sector"],
+        "is_leading_sector": response["sector_analysis"]["is_leading"],
+        "elder_tactics": {key: tactics[key] for key in
+                          ("type", "recommendation", "reason", "confluence_alert", "entry", "target", "stop", "style")},
+        "macd_divergence": macd_divergence.get('type') if macd_divergence else None,
+        "f13_divergence": f13_divergence.get('type') if f13_divergence else None,
+    }
+
+
+@router.post("/analysis/batch", response_class=FastJSONResponse)
+def analyze_batch(request: AnalysisBatchRequest, accept: Optional[str] = Header(None)):
+    """
+    The analysis of several symbols at once, for dashboard grids. One macro
+    proxies / sector ETF snapshot is shared by every symbol (returned once as
+    `snapshot`), every missing ticker is loaded at once on the batch fetch
+    pool (one history request per ticker), and the symbols are analyzed in
+    parallel. The fetch wait grows with the number of loads; a load that
+    does not finish in time leaves its symbol in `errors` (or without its
+    weekly tide) and is not cached, so the next request retries it.
+
+    summary_only (the default) returns a compact card per symbol (see
+    analysis_summary) and computes only what the analysis reads; otherwise
+    each result is the analysis endpoint's document with columnar `data`.
+    Symbols that fail are listed in `errors` instead of failing the batch.
+    """
+    symbols = list(dict.fromkeys(s.strip().upper() for s in request.symbols if s.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SYMBOLS} symbols per batch")
+    interval, period = request.interval, request.period
+
+    timer = StageTimer("analysis_batch")
+
+    # The same caches as the analysis endpoint, so either one warms the other
+    cache_key_proxies = f"proxies_{period}_{interval}"
+    bars = {s: get_cached(f"download_{s}_{period}_{interval}", ttl=900) for s in symbols}
+    p_data = get_cached(cache_key_proxies, ttl=3600)
+    s_data = get_cached(SECTOR_CACHE_KEY, ttl=14400)
+    weekly = {s: get_cached(f"tide_wk_{s}", ttl=3600) for s in symbols} if interval == "1d" else {}
+
+    downloads = {}
+    missing = [s for s, df in bars.items() if df is None]
+    missing_wk = [s for s, wk_df in weekly.items() if wk_df is None]
+    if missing:
+        downloads["bars"] = (missing, period, interval)
+    if p_data is None:
+        downloads["proxies"] = (MACRO_PROXIES, period, interval)
+    if s_data is None:
+        downloads["sectors"] = (list(SECTOR_ETFS.values()), "2mo", "1d")
+    if missing_wk:
+        downloads["tide"] = (missing_wk, "2y", "1wk")
+    calls = {f"info_{s}": (lambda s=s: get_stock_info_cached(s)) for s in symbols}
+    loads = sum(len(tickers) for tickers, _, _ in downloads.values()) + len(calls)
+    fetched = fetch_concurrently(downloads, calls, timeout=fetch_timeout(loads, BATCH_FETCH_WORKERS),
+                                 pool=fetch_pool("batch", BATCH_FETCH_WORKERS))
+
+    if "proxies" in downloads:
+        p_data = fetched["proxies"]
+        if not p_data.empty:
+            set_cache(cache_key_proxies, p_data)
+    if "sectors" in downloads:
+        s_data = fetched["sectors"]
+        if not s_data.empty:
+            set_cache(SECTOR_CACHE_KEY, s_data)
+    for s in missing:
+        bars[s] = _ticker_frame(fetched["bars"], s)
+        if not bars[s].empty:
+            set_cache(f"download_{s}_{period}_{interval}", bars[s])
+    for s in missing_wk:
+        wk_df = _ticker_frame(fetched["tide"], s)
+        if not wk_df.empty:
+            wk_df.columns = wk_df.columns.get_level_values(0)
+            set_cache(f"tide_wk_{s}", wk_df)
+        weekly[s] = wk_df
+    timer.lap("fetch")
+
+    outputs, profile = (PROFILES["analysis"].outputs, "analysis") if request.summary_only else (None, None)
+
+    def analyze(symbol):
+        if bars[symbol].empty:
+            raise HTTPException(status_code=404, detail="No data found for symbol")
+        return analyze_frame(symbol, bars[symbol], interval, p_data, s_data, weekly.get(symbol),
+                             fetched.get(f"info_{symbol}") or {}, outputs=outputs, profile=profile)
+
+    with ThreadPoolExecutor(max_workers=min(ANALYSIS_WORKERS, len(symbols))) as pool:
+        futures = {s: pool.submit(analyze, s) for s in symbols}
+
+    results, errors, snapshot = [], {}, None
+    for symbol, future in futures.items():
+        try:
+            response, df, sync = future.result()
+        except HTTPException as e:
+            errors[symbol] = e.detail
+            continue
+        except Exception as e:
+            logger.error(f"Batch analysis of {symbol} failed: {e}")
+            errors[symbol] = str(e)
+            continue
+        stock_sync.enqueue(symbol, sync)
+        if snapshot is None:
+            snapshot = {
+                "macro_status": response["macro_status"],
+                "macro_tides": response["macro_tides"],
+                "strategic_suggestion": response["strategic_suggestion"],
+                "leading_sector": response["sector_analysis"]["leading_sector"],
+                "sector_performance": response["sector_analysis"]["sector_performance"],
+            }
+        if request.summary_only:
+            results.append(analysis_summary(response, df))
+        else:
+            response["data"] = columnar(df)
+            results.append(response)
+    timer.lap("analyze")
+
+    content = {"interval": interval, "period": period, "snapshot": snapshot, "results": results, "errors": errors}
+    media_type = negotiate(accept)
+    result = negotiated_response(content, media_type, table_key="results" if request.summary_only else None)
+    timer.lap("serialize")
+
+    result.headers["Server-Timing"] = timer.server_timing()
+    timer.finish(symbols=len(symbols), fetched=len(missing), errors=len(errors),
+                 summary_only=request.summary_only, interval=interval, period=period)
+    return result
@@ -0,0 +1,388 @@
+"""
+Watchlist scans as background jobs.
+
+POST /stocks/scan/jobs queues a scan and returns its id. A single worker
+thread (started and stopped by main.py's lifespan) runs the jobs one at a
+time. Clients poll a job's progress or stream its per-symbol results as
+Server-Sent Events while the scan is running.
+
+A job scans either the watchlist (Stock rows are updated) or a universe
+(see universe.py), which is streamed in chunks into the ScanResult history.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, update
+
+from database import engine
+from models import ScanResult, Stock
+from screener import latest_indicators, latest_row, latest_upsert
+from scanner import ScanStats, analyze_watchlist, bar_fingerprints, fetch_watchlist, scan_universe
+from timing import StageTimer
+from universe import WATCHLIST, load_universe
+
+logger = logging.getLogger(__name__)
+
+SCAN_FIELDS = ('divergence_status', 'efi_status', 'setup_signal',
+               'candle_pattern', 'candle_pattern_type', 'confluence_alert')
+JOB_HISTORY = 20          # finished jobs kept for polling
+SSE_KEEPALIVE = 15        # seconds between keep-alive comments on a quiet stream
+
+
+class ScanJob:
+    """State of one scan: progress counters plus an append-only event log."""
+
+    def __init__(self, force: bool = False, universe: str = WATCHLIST, screen: Optional[bool] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.force = force
+        self.universe = universe
+        self.screen = screen  # None: the default of the scan function
+        self.status = "queued"  # queued -> running -> done | failed
+        self.total = 0
+        self.done = 0
+        self.rescanned = 0
+        self.failures: List[Dict] = []
+        self.error: Optional[str] = None
+        self.stats: Optional[ScanStats] = None  # universe scans: throughput and peak RSS
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: List[tuple] = []  # (event, data); a position is the SSE event id
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def publish(self, event: str, data: Dict):
+        with self._changed:
+            self.events.append((event, data))
+            self._changed.notify_all()
+
+    def finish(self, status: str, error: Optional[str] = None):
+        # One step for readers: a finished job always has its final event
+        with self._changed:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self.events.append(("failed" if error else "done", self.progress()))
+            self._changed.notify_all()
+
+    def progress(self) -> Dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+        eta = None
+        if self.status == "running" and 0 < self.done < self.total:
+            eta = round(elapsed / self.done * (self.total - self.done), 1)
+        progress = {
+            "job_id": self.id,
+            "universe": self.universe,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "rescanned": self.rescanned,
+            "failures": self.failures,
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": eta,
+            "error": self.error,
+        }
+        if self.stats:
+            snapshot = self.stats.snapshot()
+            progress["symbols_per_second"] = snapshot["symbols_per_second"]
+            progress["peak_rss_mb"] = snapshot["peak_rss_mb"]
+        return progress
+
+    def sse(self, start: int = 0) -> Iterator[str]:
+        """Server-Sent Events from event `start` on, until the job has finished."""
+        position = start
+        while True:
+            with self._changed:
+                if position >= len(self.events) and not self.finished:
+                    self._changed.wait(timeout=SSE_KEEPALIVE)
+                pending = self.events[position:]
+                finished = self.finished
+            if not pending:
+                if finished:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event, data in pending:
+                yield f"id: {position}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+                position += 1
+
+
+def _summary(symbol: str, fields: Dict, cached: bool) -> Dict:
+    return {
+        "symbol": symbol,
+        "divergence": fields['divergence_status'],
+        "efi": fields['efi_status'],
+        "setup": fields['setup_signal'],
+        "candle_pattern": fields['candle_pattern'],
+        "candle_pattern_type": fields['candle_pattern_type'],
+        "confluence_alert": fields['confluence_alert'],
+        "cached": cached,
+    }
+
+
+def _history_upsert():
+    """INSERT a ScanResult row, or update that symbol's row for the same bar date."""
+    statement = sqlite_insert(ScanResult)
+    return statement.on_conflict_do_update(
+        index_elements=["symbol", "bar_date"],
+        set_={column: statement.excluded[column] for column in SCAN_FIELDS + ("scanned_at",)},
+    )
+
+
+def run_scan(session: Session, force: bool = False, job: Optional[ScanJob] = None, screen: bool = False,
+             timer: Optional[StageTimer] = None) -> Dict:
+    """
+    Scan the whole watchlist and store the results (see scanner.py).
+    Symbols whose last bar is unchanged since their last scan are served from
+    their stored fields unless `force`. Rescanned symbols are also recorded in
+    the ScanResult history for their last bar's date. With `screen`, the scan
+    computes every indicator (the "screen" profile instead of the lighter
+    "scan" one) and refreshes their latest_indicators rows.
+    When `job` is given, its progress is updated and every symbol's result is
+    published as it completes. Stage timings go to `timer` (the caller
+    finishes it), or to a timer of its own that is finished here.
+    """
+    own_timer = timer is None
+    timer = timer or StageTimer("scan")
+    stocks = session.exec(select(Stock)).all()
+    results = []
+    if not stocks:
+        return {"scanned": 0, "results": results}
+
+    # 1. Fetch the watchlist (~2 years for reliable Weekly calculation), chunks downloaded concurrently
+    symbols = [stock.symbol for stock in stocks]
+    timer.lap("load")
+    panel = fetch_watchlist(symbols)
+    timer.lap("fetch")
+
+    # Skip symbols whose last bar is unchanged since their last scan (idle market, repeated clicks)
+    fingerprints = bar_fingerprints(panel)
+    # ...unless the screener has no latest_indicators row for them yet
+    screened = set(session.exec(select(latest_indicators.c.symbol)).all()) if screen else None
+    changed = [stock.symbol for stock in stocks
+               if stock.symbol in fingerprints and (force or stock.scan_fingerprint != fingerprints[stock.symbol]
+                                                    or (screen and stock.symbol not in screened))]
+
+    if job:
+        job.total = len(stocks)
+        job.rescanned = len(changed)
+        # Stored results are ready straight away
+        pending = set(changed)
+        for stock in stocks:
+            if stock.symbol not in pending:
+                job.done += 1
+                job.publish("result", _summary(stock.symbol, {f: getattr(stock, f) for f in SCAN_FIELDS}, cached=True))
+
+    def on_result(symbol, fields, error):
+        if not job:
+            return
+        job.done += 1
+        if error:
+            job.failures.append({"symbol": symbol, "error": error})
+            job.publish("failure", {"symbol": symbol, "error": error})
+        elif fields:
+            job.publish("result", _summary(symbol, fields, cached=False))
+
+    # 2./3. Panel indicators, then per-symbol analysis on the process pool
+    timer.lap("fingerprint")
+    scanned = analyze_watchlist(panel, changed, on_result=on_result, screen=screen)
+    timer.lap("analyze")
+
+    # Merge: the rescanned symbols' Stock rows and history rows, stored results for the rest
+    rows = []
+    history = []
+    latest = []
+    scanned_at = datetime.now().isoformat()
+    compact_saved = 0
+    for stock in stocks:
+        fields = scanned.get(stock.symbol)
+        if fields:
+            compact_saved += fields.pop('compact_bytes_saved', 0)
+            if screen:
+                latest.append(latest_row(stock.symbol, fields, scanned_at))
+                fields.pop('latest')
+            bar_date = fields.pop('bar_date')
+            history.append({"symbol": stock.symbol, "bar_date": bar_date, "scanned_at": scanned_at,
+                            **{f: fields[f] for f in SCAN_FIELDS}})
+            fields['scan_fingerprint'] = fingerprints[stock.symbol]
+            rows.append({"id": stock.id, **fields})
+        else:
+            fields = {f: getattr(stock, f) for f in SCAN_FIELDS}
+
+        if fields['divergence_status'] or fields['efi_status'] or fields['setup_signal']:
+            results.append({
+                "symbol": stock.symbol,
+                "divergence": fields['divergence_status'],
+                "efi": fields['efi_status'],
+                "setup": fields['setup_signal']
+            })
+
+    # One transaction: bulk UPDATE of Stock by primary key, executemany upserts of
+    # the day's history and the screener's latest rows
+    if rows:
+        session.exec(update(Stock), params=rows)
+        session.exec(_history_upsert(), params=history)
+        if latest:
+            session.exec(latest_upsert(), params=latest)
+    session.commit()
+    timer.lap("store")
+    logger.info(f"Scan: {len(scanned)} of {len(stocks)} symbols rescanned, "
+                f"compact indicator frames saved {compact_saved / 1024 / 1024:.1f} MB")
+    if own_timer:
+        timer.finish(symbols=len(stocks), rescanned=len(scanned), screen=screen)
+    return {"scanned": len(stocks), "rescanned": len(scanned), "results": results}
+
+
+def run_universe_scan(session: Session, universe: str, job: Optional[ScanJob] = None, screen: bool = True) -> Dict:
+    """
+    Scan every symbol of `universe` in bounded chunks (scanner.scan_universe)
+    and upsert each chunk's results into the ScanResult history, and with
+    `screen` into the screener's latest_indicators, as it completes. Universe
+    symbols need not be in the watchlist, so Stock rows are not touched.
+    Returns the symbols with a signal plus throughput and peak RSS.
+    """
+    symbols = load_universe(universe, session)
+    stats = ScanStats(len(symbols))
+    results = []
+    failures = 0
+
+    if job:
+        job.total = len(symbols)
+        job.rescanned = len(symbols)
+        job.stats = stats
+
+    def on_result(symbol, fields, error):
+        nonlocal failures
+        failures += error is not None
+        if not job:
+            return
+        job.done += 1
+        if error:
+            job.failures.append({"symbol": symbol, "error": error})
+            job.publish("failure", {"symbol": symbol, "error": error})
+        elif fields:
+            job.publish("result", _summary(symbol, fields, cached=False))
+
+    for _, scanned in scan_universe(symbols, on_result=on_result, stats=stats, screen=screen):
+        scanned_at = datetime.now().isoformat()
+        history = [{"symbol": symbol, "bar_date": fields['bar_date'], "scanned_at": scanned_at,
+                    **{f: fields[f] for f in SCAN_FIELDS}} for symbol, fields in scanned.items()]
+        if history:
+            session.exec(_history_upsert(), params=history)
+            if screen:
+                session.exec(latest_upsert(), params=[latest_row(symbol, fields, scanned_at)
+                                                      for symbol, fields in scanned.items()])
+            session.commit()
+        results += [{"symbol": symbol, "divergence": fields['divergence_status'],
+                     "efi": fields['efi_status'], "setup": fields['setup_signal']}
+                    for symbol, fields in scanned.items()
+                    if fields['divergence_status'] or fields['efi_status'] or fields['setup_signal']]
+
+    summary = stats.snapshot()
+    logger.info(f"Universe scan {universe}: {summary['analyzed']} of {len(symbols)} symbols analyzed, "
+                f"{summary['symbols_per_second']} symbols/s, peak RSS {summary['peak_rss_mb']} MB")
+    return {"universe": universe, "scanned": len(symbols), "failed": failures, "results": results, **summary}
+
+
+# ---------------------------------------------------------
+# Job queue and worker
+# ---------------------------------------------------------
+
+_queue: "queue.Queue[Optional[ScanJob]]" = queue.Queue()
+_jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def _run_job(job: ScanJob):
+    job.status = "running"
+    job.started_at = time.time()
+    try:
+        with Session(engine) as session:
+            options = {} if job.screen is None else {"screen": job.screen}
+            if job.universe == WATCHLIST:
+                run_scan(session, force=job.force, job=job, **options)
+            else:
+                run_universe_scan(session, job.universe, job=job, **options)
+        job.finish("done")
+    except Exception as e:
+        logger.error(f"Scan job {job.id} failed: {e}")
+        job.finish("failed", error=str(e))
+
+
+def _work():
+    while True:
+        job = _queue.get()
+        if job is None:
+            return
+        _run_job(job)
+
+
+def start_worker():
+    """Start the scan worker thread (idempotent)."""
+    global _worker
+    with _jobs_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="scan-worker", daemon=True)
+            _worker.start()
+
+
+def stop_worker(timeout: float = 5.0):
+    """Ask the worker to exit once the running job is done."""
+    global _worker
+    if _worker is not None:
+        _queue.put(None)
+        _worker.join(timeout)
+        _worker = None
+
+
+def submit_scan(force: bool = False, universe: str = WATCHLIST, screen: Optional[bool] = None) -> ScanJob:
+    """
+    Queue a scan of `universe` (`force` only applies to the watchlist).
+    `screen` refreshes the screener's latest_indicators (by default only
+    universe scans do, see run_scan and run_universe_scan). While
+    a scan of the same universe is queued or running, that job is returned
+    instead of starting another one (repeated clicks share it).
+    """
+    start_worker()
+    with _jobs_lock:
+        for job in _jobs.values():
+            if job.universe == universe and not job.finished:
+                return job
+        job = ScanJob(force=force, universe=universe, screen=screen)
+        _jobs[job.id] = job
+        # Forget the oldest finished jobs; queued and running ones stay pollable
+        excess = len(_jobs) - JOB_HISTORY
+        if excess > 0:
+            finished = [job_id for job_id, other in _jobs.items() if other.finished]
+            for job_id in finished[:excess]:
+                del _jobs[job_id]
+    _queue.put(job)
+    return job
+
+
+def get_job(job_id: str) -> Optional[ScanJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+if __name__ == "__main__":
+    # Nightly universe screens: python scan_jobs.py sp500
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    universe = sys.argv[1] if len(sys.argv) > 1 else WATCHLIST
+    with Session(engine) as session:
+        summary = run_scan(session, screen=True) if universe == WATCHLIST else run_universe_scan(session, universe)
+    summary.pop("results")
+    print(json.dumps(summary, indent=2))
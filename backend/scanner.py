@@ -0,0 +1,363 @@
+"""
+Watchlist scan pipeline.
+
+1. fetch: the watchlist is downloaded in chunks on a thread pool (I/O bound)
+   Symbols whose last bar matches the stored fingerprint are not rescanned.
+2. panel: numeric indicators for every changed symbol in one vectorized pass
+3. analysis: per-symbol patterns, divergence, weekly setup and confluence on
+   a process pool sized to the host's cores (CPU bound)
+
+The caller merges the per-symbol results and writes them to the DB in one batch.
+Large universes go through scan_universe(), which runs all three stages on
+bounded chunks of symbols and drops each chunk's frames before the next.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import ta
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from utils import fetch_concurrently, fetch_pool, fetch_timeout
+from analysis_utils import detect_confluence
+from indicators import BASE_COLUMNS, PROFILES, calculate_indicators, compact_frame
+from indicator_panel import calculate_panel, panel_from_download, symbol_frame
+from screener import latest_values
+from divergence import latest_divergence
+
+logger = logging.getLogger(__name__)
+
+# Indicator profiles (see indicators.PROFILES): "scan" has only what the scan decisions
+# read; "screen" adds every indicator's last-bar value for the screener. Outputs the
+# watchlist panel computes for a whole chunk at once are not recomputed per symbol.
+SCAN_PROFILE = 'scan'
+SCREEN_PROFILE = 'screen'
+
+FETCH_CHUNK_SIZE = 50     # symbols fetched and merged per step
+FETCH_WORKERS = 16        # scan fetch threads, apart from the interactive loads' pool
+# Cores this process may run on (respects container/affinity limits)
+SCAN_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+MIN_POOL_SYMBOLS = 8      # smaller scans run inline, cheaper than shipping frames to workers
+MIN_BARS = 50
+UNIVERSE_CHUNK_SIZE = 200  # symbols held in memory at once by scan_universe()
+# Bump when the scan logic changes so stored results are recomputed
+SCAN_VERSION = 1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all scans, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a threaded server process can deadlock the children
+            _pool = ProcessPoolExecutor(max_workers=SCAN_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes (called on app shutdown or after a crash)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# ---------------------------------------------------------
+# Stage 1: fetch
+# ---------------------------------------------------------
+
+def _fetch_chunk(symbols: List[str], period: str, interval: str) -> Dict[str, pd.DataFrame]:
+    try:
+        # Per-ticker loads: yf.download is not safe to run from several threads
+        df = fetch_concurrently({'chunk': (symbols, period, interval)},
+                                timeout=fetch_timeout(len(symbols), FETCH_WORKERS),
+                                pool=fetch_pool('scan', FETCH_WORKERS)).get('chunk', pd.DataFrame())
+        if not df.empty:
+            return panel_from_download(df, symbols)
+        logger.warning(f"Scan: no data for {len(symbols)} symbols starting {symbols[0]}")
+    except Exception as e:
+        logger.error(f"Scan download error for {symbols}: {e}")
+    return {field: pd.DataFrame(columns=symbols, dtype=float) for field in BASE_COLUMNS}
+
+
+def fetch_watchlist(symbols: List[str], period: str = "2y", interval: str = "1d") -> Dict[str, pd.DataFrame]:
+    """
+    Download `symbols` in chunks of FETCH_CHUNK_SIZE, each chunk's tickers
+    FETCH_WORKERS at a time, and merge them into one panel (see
+    indicator_panel). A failed chunk leaves its symbols empty; raises only
+    when nothing could be downloaded.
+    """
+    chunks = [symbols[i:i + FETCH_CHUNK_SIZE] for i in range(0, len(symbols), FETCH_CHUNK_SIZE)]
+    panels = [_fetch_chunk(chunk, period, interval) for chunk in chunks]
+
+    panel = {field: pd.concat([p[field] for p in panels], axis=1).sort_index() for field in BASE_COLUMNS}
+    if panel['Close'].empty:
+        raise ValueError(f"No data downloaded for any of {len(symbols)} symbols")
+    return panel
+
+
+def bar_fingerprints(panel: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+    """
+    Fingerprint of each symbol's last bar: its timestamp plus a hash of its
+    OHLCV (and SCAN_VERSION). Symbols without bars are left out.
+    """
+    close = panel['Close']
+    valid = close.notna().to_numpy()
+    has_bars = valid.any(axis=0)
+    last = len(close) - 1 - np.argmax(valid[::-1], axis=0)
+    bars = np.stack([panel[field].to_numpy(dtype=float) for field in BASE_COLUMNS], axis=-1)
+
+    fingerprints = {}
+    for j, symbol in enumerate(close.columns):
+        if not has_bars[j]:
+            continue
+        digest = hashlib.sha1(bars[last[j], j].tobytes() + str(SCAN_VERSION).encode()).hexdigest()[:16]
+        fingerprints[symbol] = f"{close.index[last[j]].isoformat()}|{digest}"
+    return fingerprints
+
+
+# ---------------------------------------------------------
+# Stage 3: per-symbol analysis (runs in worker processes)
+# ---------------------------------------------------------
+
+def _weekly_setup(df: pd.DataFrame) -> Optional[str]:
+    """
+    Triple Screen pullback: Weekly Impulse is Bullish (Green/Blue) AND
+    Daily EFI-2 is Negative (Pullback), mirrored for sells.
+    """
+    logic = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+    df_wk = df.resample('W').apply(logic).dropna()
+    if len(df_wk) <= 26:
+        return None
+
+    slope_ema = ta.trend.ema_indicator(df_wk['Close'], window=13).diff().iloc[-1]
+    slope_macd = ta.trend.macd_diff(df_wk['Close']).diff().iloc[-1]
+
+    weekly_bullish = (slope_ema > 0 and slope_macd > 0) or (slope_ema > 0 or slope_macd > 0) # Green or Blue
+    weekly_bearish = (slope_ema < 0 and slope_macd < 0) or (slope_ema < 0 or slope_macd < 0) # Red or Blue
+    daily_efi2 = df['force_index_2'].iloc[-1]
+
+    # BUY SETUP: Weekly Up/Neutral + Daily Pullback (EFI2 < 0)
+    if weekly_bullish and daily_efi2 < 0:
+        if slope_ema > 0 and slope_macd > 0: # Green Weekly is best
+            return 'pullback_buy_strong'
+        if slope_ema >= 0: # Blue/Green
+            return 'pullback_buy'
+
+    # SELL SETUP: Weekly Down/Neutral + Daily Rally (EFI2 > 0)
+    elif weekly_bearish and daily_efi2 > 0:
+        if slope_ema < 0 and slope_macd < 0:
+            return 'pullback_sell_strong'
+        if slope_ema <= 0:
+            return 'pullback_sell'
+    return None
+
+
+def scan_symbol(symbol: str, df: pd.DataFrame, screen: bool = False) -> Dict:
+    """
+    Scan fields for one symbol from its daily bars (plus any panel columns).
+    The frame is completed with the "scan" indicator profile, or "screen" when
+    `screen`. Returns the Stock fields to update, the 'bar_date' they were
+    computed on, 'compact_bytes_saved' and, when `screen`, the 'latest'
+    indicator values for the screener.
+    """
+    profile = SCREEN_PROFILE if screen else SCAN_PROFILE
+    missing = [col for col in PROFILES[profile].outputs if col not in df.columns]
+    df = calculate_indicators(df, outputs=missing, profile=profile)
+    latest = latest_values(df.iloc[-1]) if screen else None
+
+    # Compact mode: the scan only reads signs, flags and labels, float32 is plenty
+    df = df[list(BASE_COLUMNS) + list(PROFILES[SCAN_PROFILE].outputs)].copy()
+    df.attrs['compact_bytes_saved'] = compact_frame(df)
+
+    # Divergence (MACD Only, extreme within the last 5 bars)
+    macd_div = latest_divergence(df, 'macd_diff', max_recency=5)
+    macd_div = macd_div['type'] if macd_div else None
+
+    # EFI Signals (Last bar)
+    efi_status = None
+    if df['efi_buy_signal'].iloc[-1]:
+        efi_status = 'buy'
+    elif df['efi_sell_signal'].iloc[-1]:
+        efi_status = 'sell'
+
+    setup_signal = None
+    try:
+        setup_signal = _weekly_setup(df)
+    except Exception as e:
+        logger.warning(f"TS Scan error {symbol}: {e}")
+
+    # Candlestick Patterns (last bar) & Confluence
+    candle_pattern = df['candle_pattern'].iloc[-1]
+    candle_pattern_type = df['candle_pattern_type'].iloc[-1]
+    macd_div_obj = {'type': macd_div, 'recency': 0} if macd_div else None
+    confluence_alert, _ = detect_confluence(df, macd_div_obj)
+
+    fields = {
+        'divergence_status': macd_div,
+        'efi_status': efi_status,
+        'setup_signal': setup_signal,
+        'candle_pattern': None if pd.isna(candle_pattern) else candle_pattern,
+        'candle_pattern_type': None if pd.isna(candle_pattern_type) else candle_pattern_type,
+        'confluence_alert': confluence_alert,
+        'bar_date': df.index[-1].strftime('%Y-%m-%d'),
+        'compact_bytes_saved': df.attrs.get('compact_bytes_saved', 0),
+    }
+    if screen:
+        fields['latest'] = latest
+    return fields
+
+
+def _scan_inline(frames: Dict[str, pd.DataFrame], results: Dict[str, Dict], report, screen: bool):
+    for symbol, df in frames.items():
+        try:
+            results[symbol] = scan_symbol(symbol, df, screen)
+            report(symbol, results[symbol], None)
+        except Exception as e:
+            logger.error(f"Scan failed for {symbol}: {e}")
+            report(symbol, None, str(e))
+
+
+def analyze_watchlist(panel: Dict[str, pd.DataFrame], symbols: List[str],
+                      on_result: Optional[Callable[[str, Optional[Dict], Optional[str]], None]] = None,
+                      screen: bool = False) -> Dict[str, Dict]:
+    """
+    Stages 2 and 3 for `symbols` (a subset of the panel's): panel indicators,
+    then scan_symbol() for every symbol with enough history (with the
+    screener's latest values when `screen`).
+    Returns {symbol: fields}; failed or short symbols are left out.
+
+    on_result(symbol, fields, error) is called for every symbol as soon as it
+    finishes (fields and error are both None for a symbol skipped for lack of history).
+    """
+    report = on_result or (lambda symbol, fields, error: None)
+    if not symbols:
+        return {}
+    panel = {field: frame[symbols] for field, frame in panel.items()}
+    profile = PROFILES[SCREEN_PROFILE if screen else SCAN_PROFILE]
+    panel_result = {col: frame.to_numpy() for col, frame in calculate_panel(panel, outputs=profile.outputs).items()}
+    has_bar = panel['Close'].notna().to_numpy()
+    frames = {}
+    for j, symbol in enumerate(symbols):
+        df = symbol_frame(panel, symbol)
+        if len(df) < MIN_BARS:
+            report(symbol, None, None)
+            continue
+        for col, values in panel_result.items():
+            df[col] = values[has_bar[:, j], j]
+        frames[symbol] = df
+
+    results = {}
+    if len(frames) < MIN_POOL_SYMBOLS or SCAN_WORKERS < 2:
+        _scan_inline(frames, results, report, screen)
+        return results
+
+    reported = set()
+    try:
+        pool = _get_pool()
+        futures = {pool.submit(scan_symbol, symbol, df, screen): symbol for symbol, df in frames.items()}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+                report(symbol, results[symbol], None)
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                logger.error(f"Scan failed for {symbol}: {e}")
+                report(symbol, None, str(e))
+            reported.add(symbol)
+    except BrokenProcessPool as e:
+        # A worker died (e.g. OOM): restart the pool next time, finish this scan inline
+        logger.error(f"Scan worker pool broke, finishing inline: {e}")
+        shutdown_pool()
+        _scan_inline({s: df for s, df in frames.items() if s not in reported}, results, report, screen)
+    return results
+
+
+# ---------------------------------------------------------
+# Universe scans: all stages on bounded chunks
+# ---------------------------------------------------------
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)
+
+
+class ScanStats:
+    """Throughput and memory of a universe scan."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.analyzed = 0
+        self.started = time.perf_counter()
+
+    def snapshot(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "symbols": self.total,
+            "done": self.done,
+            "analyzed": self.analyzed,
+            "elapsed_seconds": round(elapsed, 1),
+            "symbols_per_second": round(self.done / elapsed, 1) if elapsed > 0 else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+def scan_universe(symbols: List[str], chunk_size: int = UNIVERSE_CHUNK_SIZE, period: str = "2y",
+                  on_result: Optional[Callable[[str, Optional[Dict], Optional[str]], None]] = None,
+                  stats: Optional[ScanStats] = None,
+                  screen: bool = False) -> Iterator[Tuple[List[str], Dict[str, Dict]]]:
+    """
+    Fetch and analyze `symbols` `chunk_size` at a time, yielding
+    (chunk symbols, {symbol: fields}) per chunk (fields as scan_symbol()).
+    Only one chunk's bars and indicators are alive at a time, so memory stays
+    flat however large the universe; the caller should store each chunk's
+    results before asking for the next. A chunk that cannot be downloaded
+    reports its symbols as failed and yields no results.
+    """
+    stats = stats or ScanStats(len(symbols))
+    report = on_result or (lambda symbol, fields, error: None)
+
+    def counted(symbol, fields, error):
+        stats.done += 1
+        stats.analyzed += fields is not None
+        report(symbol, fields, error)
+
+    for start in range(0, len(symbols), chunk_size):
+        chunk = symbols[start:start + chunk_size]
+        try:
+            panel = fetch_watchlist(chunk, period=period)
+        except ValueError as e:
+            logger.warning(f"Universe scan: {e}")
+            for symbol in chunk:
+                counted(symbol, None, "no data")
+            yield chunk, {}
+            continue
+        results = analyze_watchlist(panel, chunk, on_result=counted, screen=screen)
+        del panel
+        yield chunk, results
+        logger.info(f"Universe scan: {stats.done}/{stats.total} symbols, "
+                    f"{stats.snapshot()['symbols_per_second']}/s, peak RSS {peak_rss_mb()} MB")
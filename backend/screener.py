@@ -0,0 +1,290 @@
+"""
+Declarative screener over the latest_indicators table.
+
+Scans with the "screen" indicator profile (universe scans, and watchlist
+scans with screen=true) store one row per symbol with the last-bar value of
+every calculate_indicators() column (plus OHLCV and the bar date). Screens are
+filter expressions compiled to a parameterized, indexed SQL query, so they
+answer without touching price data:
+
+    rsi < 30 AND impulse = 'green' AND close > ema_200
+    (efi_buy_signal = 1 OR setup = 'pullback_buy') AND NOT close < ema_50 * 0.95
+
+Grammar (keywords are case-insensitive):
+    expr       := and_expr (OR and_expr)*
+    and_expr   := not_expr (AND not_expr)*
+    not_expr   := NOT not_expr | '(' expr ')' | comparison
+    comparison := value (< | <= | > | >= | = | == | != | <>) value
+    value      := term ((+ | -) term)*
+    term       := unary ((* | /) unary)*
+    unary      := - unary | number | 'string' | column | NULL | '(' value ')'
+"""
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import Column, Float, String, Table, and_, literal, not_, null, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel
+
+from indicators import BASE_COLUMNS, INDICATORS
+
+# Non-numeric indicator outputs
+TEXT_COLUMNS = ('impulse', 'candle_pattern', 'candle_pattern_type')
+# Scan outputs stored alongside, so screens can combine them with indicator values
+SCAN_COLUMNS = ('divergence', 'efi_status', 'setup')
+
+SCREEN_COLUMNS = list(dict.fromkeys(
+    [c.lower() for c in BASE_COLUMNS]
+    + [output for spec in INDICATORS.values() for output in spec.outputs]
+))
+
+latest_indicators = Table(
+    "latest_indicators", SQLModel.metadata,
+    Column("symbol", String, primary_key=True),
+    Column("bar_date", String, index=True),
+    Column("updated_at", String),
+    *[Column(name, String, index=True) for name in SCAN_COLUMNS],
+    *[Column(name, String if name in TEXT_COLUMNS else Float, index=True) for name in SCREEN_COLUMNS],
+)
+
+MAX_SCREEN_ROWS = 5000
+_FRAME_COLUMNS = {c.lower(): c for c in BASE_COLUMNS}  # close -> Close
+
+
+class ScreenError(ValueError):
+    """Invalid screen expression."""
+
+
+# ---------------------------------------------------------
+# Latest-bar rows (filled by the scan)
+# ---------------------------------------------------------
+
+def latest_values(last_bar: pd.Series) -> Dict:
+    """
+    Row for latest_indicators from the last row of an indicator frame:
+    SCREEN_COLUMNS as Python scalars, NaN as None, flags as 0/1.
+    """
+    row = {}
+    for name in SCREEN_COLUMNS:
+        value = last_bar.get(_FRAME_COLUMNS.get(name, name))
+        if value is None or pd.isna(value):
+            row[name] = None
+        else:
+            row[name] = str(value) if name in TEXT_COLUMNS else float(value)
+    return row
+
+
+def latest_row(symbol: str, fields: Dict, updated_at: Optional[str] = None) -> Dict:
+    """latest_indicators row for `symbol` from scan_symbol() fields."""
+    return {
+        "symbol": symbol,
+        "bar_date": fields['bar_date'],
+        "updated_at": updated_at or datetime.now().isoformat(),
+        "divergence": fields['divergence_status'],
+        "efi_status": fields['efi_status'],
+        "setup": fields['setup_signal'],
+        **fields['latest'],
+    }
+
+
+def latest_upsert():
+    """INSERT a latest_indicators row, or replace that symbol's row."""
+    statement = sqlite_insert(latest_indicators)
+    return statement.on_conflict_do_update(
+        index_elements=["symbol"],
+        set_={c.name: statement.excluded[c.name] for c in latest_indicators.columns if c.name != "symbol"},
+    )
+
+
+# ---------------------------------------------------------
+# Expression compiler
+# ---------------------------------------------------------
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<op><=|>=|!=|<>|==|=|<|>|[-+*/()])
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.VERBOSE)
+
+_COMPARISONS = {
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+    '=': lambda a, b: a == b, '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b, '<>': lambda a, b: a != b,
+}
+_ARITHMETIC = {
+    '+': lambda a, b: a + b, '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b, '/': lambda a, b: a / b,
+}
+_KEYWORDS = {'AND', 'OR', 'NOT', 'NULL'}
+
+
+def _tokenize(expression: str) -> List[tuple]:
+    tokens, pos = [], 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN.match(expression, pos)
+        if not match or match.end() == pos:
+            raise ScreenError(f"Unexpected character at position {pos}: {expression[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        value, start = match.group(kind), match.start(kind)
+        if kind == 'name' and value.upper() in _KEYWORDS:
+            kind, value = 'keyword', value.upper()
+        tokens.append((kind, value, start))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+
+    def peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if (kind and token[0] != kind) or (value and token[1] not in value):
+            return None
+        return token
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token:
+            self.pos += 1
+        return token
+
+    def fail(self, expected: str):
+        token = self.peek()
+        where = f"'{token[1]}' at position {token[2]}" if token else "end of expression"
+        raise ScreenError(f"Expected {expected}, found {where}")
+
+    def parse(self):
+        if not self.tokens:
+            raise ScreenError("Empty screen expression")
+        clause = self.or_expr()
+        if self.peek():
+            self.fail("AND, OR or end of expression")
+        return clause
+
+    def or_expr(self):
+        clauses = [self.and_expr()]
+        while self.take('keyword', ('OR',)):
+            clauses.append(self.and_expr())
+        return or_(*clauses) if len(clauses) > 1 else clauses[0]
+
+    def and_expr(self):
+        clauses = [self.not_expr()]
+        while self.take('keyword', ('AND',)):
+            clauses.append(self.not_expr())
+        return and_(*clauses) if len(clauses) > 1 else clauses[0]
+
+    def not_expr(self):
+        if self.take('keyword', ('NOT',)):
+            return not_(self.not_expr())
+        if self.peek('op', ('(',)):
+            # A parenthesized condition, unless it turns out to be a value: (high - low) > 2
+            start = self.pos
+            self.pos += 1
+            try:
+                clause = self.or_expr()
+                if not self.take('op', (')',)):
+                    self.fail("')'")
+                if not self.peek('op', tuple(_COMPARISONS) + tuple(_ARITHMETIC)):
+                    return clause
+                error = None
+            except ScreenError as e:
+                error = e
+            self.pos = start
+            try:
+                return self.comparison()
+            except ScreenError:
+                # Report the condition's error: (rsi < 30 is a missing ')', not a bad value
+                if error:
+                    raise error from None
+                raise
+        return self.comparison()
+
+    def comparison(self):
+        left = self.value()
+        op = self.take('op', tuple(_COMPARISONS))
+        if not op:
+            self.fail("a comparison (<, <=, >, >=, =, !=)")
+        right = self.value()
+        if op[1] in ('=', '==', '!=', '<>') and (left is None or right is None):
+            column = right if left is None else left
+            return column.is_(null()) if op[1] in ('=', '==') else column.is_not(null())
+        if left is None or right is None:
+            raise ScreenError("NULL can only be compared with = or !=")
+        return _COMPARISONS[op[1]](left, right)
+
+    def arithmetic(self, operand, ops):
+        result = operand()
+        while (op := self.take('op', ops)):
+            right = operand()
+            if result is None or right is None:
+                raise ScreenError("NULL cannot be used in arithmetic")
+            result = _ARITHMETIC[op[1]](result, right)
+        return result
+
+    def value(self):
+        return self.arithmetic(self.term, ('+', '-'))
+
+    def term(self):
+        return self.arithmetic(self.unary, ('*', '/'))
+
+    def unary(self):
+        if self.take('op', ('-',)):
+            operand = self.unary()
+            if operand is None:
+                raise ScreenError("NULL cannot be used in arithmetic")
+            return -operand
+        if self.take('op', ('(',)):
+            result = self.value()
+            if not self.take('op', (')',)):
+                self.fail("')'")
+            return result
+        token = self.take()
+        if token is None:
+            self.fail("a column, number or string")
+        kind, value, position = token
+        if kind == 'number':
+            return literal(float(value))
+        if kind == 'string':
+            return literal(value[1:-1].replace("''", "'"))
+        if kind == 'keyword' and value == 'NULL':
+            return None
+        if kind == 'name':
+            name = value.lower()
+            if name not in latest_indicators.c or name == 'updated_at':
+                raise ScreenError(f"Unknown column '{value}' at position {position}")
+            return latest_indicators.c[name]
+        self.pos -= 1
+        self.fail("a column, number or string")
+
+
+def compile_screen(expression: str):
+    """WHERE clause for `expression` (raises ScreenError). Values become bound parameters."""
+    return _Parser(expression).parse()
+
+
+def run_screen(session: Session, expression: str, symbols: Optional[List[str]] = None,
+               order_by: Optional[str] = None, limit: int = 100) -> List[Dict]:
+    """
+    Rows of latest_indicators matching `expression`, optionally restricted to
+    `symbols`. `order_by` is a column name, '-column' for descending.
+    """
+    statement = select(latest_indicators).where(compile_screen(expression))
+    if symbols is not None:
+        statement = statement.where(latest_indicators.c.symbol.in_(symbols))
+    if order_by:
+        name = order_by.lstrip('-').lower()
+        if name not in latest_indicators.c:
+            raise ScreenError(f"Unknown sort column '{name}'")
+        column = latest_indicators.c[name]
+        statement = statement.order_by(column.desc() if order_by.startswith('-') else column)
+    statement = statement.order_by(latest_indicators.c.symbol).limit(min(limit, MAX_SCREEN_ROWS))
+    return [dict(row._mapping) for row in session.exec(statement)]
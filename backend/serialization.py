@@ -0,0 +1,239 @@
+"""
+Serialization of indicator frames for API responses.
+
+records: one dict per bar, the original `data` format of the analysis
+         endpoint (every column name repeated on every bar).
+columnar: {index_name, index, columns, values: {column: [...]}}, each column
+          converted in bulk with NaN/inf mapped to None by a NumPy mask.
+
+FastJSONResponse encodes payloads with orjson (see requirements.txt): NumPy
+scalars and arrays, datetimes and Timestamps are handled natively and NaN/inf
+become null at encode time. Without it, the stdlib json encoder gives the same
+output, more slowly. Routes return it directly, which also skips
+FastAPI's jsonable_encoder pass over the payload.
+
+Chart endpoints also negotiate binary bodies from the Accept header:
+  application/vnd.apache.arrow.stream  the chart table as an Arrow IPC stream
+      (typed column buffers straight from the frame, missing values as
+      nulls); the rest of the response is JSON in the schema metadata
+      under "meta".
+  application/msgpack  the same document as the JSON body, as MessagePack.
+Both libraries (pyarrow, msgpack) are in requirements.txt; if one is missing,
+the client gets JSON instead.
+"""
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow requests get JSON
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack requests get JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MEDIA_ALIASES = {"application/x-msgpack": MSGPACK_MEDIA_TYPE, "application/vnd.msgpack": MSGPACK_MEDIA_TYPE}
+
+SERIES_FORMATS = ("records", "columnar")
+
+
+def _timestamps(values) -> List:
+    return [None if pd.isna(ts) else pd.Timestamp(ts).isoformat() for ts in values]
+
+
+def column_values(series: pd.Series) -> List:
+    """A column as a JSON-ready list: Python scalars, None for NaN/inf/missing."""
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind == 'f':
+        out = values.astype(object)
+        out[~np.isfinite(values)] = None
+        return out.tolist()
+    if kind in 'biu':
+        return values.tolist()
+    if kind == 'M' or isinstance(series.dtype, pd.DatetimeTZDtype):
+        return _timestamps(series)
+    # Strings, categoricals and mixed objects
+    out = np.array(series.astype(object), dtype=object)
+    out[pd.isna(out)] = None
+    return out.tolist()
+
+
+def series_window(df: pd.DataFrame, since=None, last_n: Optional[int] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Tail of a time-indexed frame for a polling client: the bars from `since`
+    on (inclusive, since the client's last bar may have been revised) and/or
+    the last `last_n` bars. A naive `since` is read in the index's timezone.
+    Returns the slice and the position of its first bar in `df`.
+    """
+    start = 0
+    if since is not None:
+        since = pd.Timestamp(since)
+        tz = getattr(df.index, 'tz', None)
+        if tz is not None:
+            since = since.tz_localize(tz) if since.tz is None else since.tz_convert(tz)
+        elif since.tz is not None:
+            since = since.tz_localize(None)
+        start = int(df.index.searchsorted(since, side='left'))
+    if last_n is not None:
+        start = max(start, len(df) - last_n)
+    return df.iloc[start:], start
+
+
+def columnar(df: pd.DataFrame) -> Dict:
+    """Columnar form of a time-indexed frame (see module docstring)."""
+    values = {str(col): column_values(df[col]) for col in df.columns}
+    return {
+        "index_name": df.index.name or "index",
+        "index": _timestamps(df.index),
+        "columns": list(values),
+        "values": values,
+    }
+
+
+# ---------------------------------------------------------
+# JSON response
+# ---------------------------------------------------------
+
+_ENCODERS = {
+    np.generic: lambda value: value.item(),
+    np.ndarray: lambda array: array.tolist(),
+    type(pd.NaT): lambda _: None,
+}
+
+
+def _default(obj: Any) -> Any:
+    """orjson fallback for types it does not know (Timestamps, models, sets...)."""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    return jsonable_encoder(obj, custom_encoder=_ENCODERS)
+
+
+def _finite(obj: Any) -> Any:
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes for `content`, NaN/inf as null."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    encoded = _finite(jsonable_encoder(content, custom_encoder=_ENCODERS))
+    return json.dumps(encoded, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ---------------------------------------------------------
+# Content negotiation (Arrow / MessagePack)
+# ---------------------------------------------------------
+
+def available_media_types() -> List[str]:
+    """Media types this server can produce, JSON always last."""
+    types = []
+    if pa is not None:
+        types.append(ARROW_MEDIA_TYPE)
+    if msgpack is not None:
+        types.append(MSGPACK_MEDIA_TYPE)
+    return types + [JSON_MEDIA_TYPE]
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Media type for a request's Accept header: the highest-q type we can
+    produce (ties go to the order listed), JSON when nothing else matches.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    available = available_media_types()
+    ranked = []
+    for position, entry in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        media_type = _MEDIA_ALIASES.get(media_type.lower(), media_type.lower())
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0 and media_type in available:
+            ranked.append((-q, position, media_type))
+    return min(ranked)[2] if ranked else JSON_MEDIA_TYPE
+
+
+def _meta_value(obj: Any) -> Any:
+    """msgpack default: the same conversions the JSON encoders make."""
+    return _finite(_default(obj))
+
+
+def arrow_stream(table: Union[pd.DataFrame, List[Dict]], meta: Optional[Dict] = None) -> bytes:
+    """
+    Arrow IPC stream for `table`: a time-indexed frame (the index becomes the
+    first column) or a list of records. `meta` is attached as JSON schema metadata.
+    """
+    if isinstance(table, pd.DataFrame):
+        arrow_table = pa.Table.from_pandas(table.reset_index(), preserve_index=False)
+    else:
+        arrow_table = pa.Table.from_pylist(table)
+    if meta is not None:
+        metadata = dict(arrow_table.schema.metadata or {})
+        metadata[b"meta"] = dumps(meta)
+        arrow_table = arrow_table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def msgpack_dumps(content: Any) -> bytes:
+    """MessagePack bytes for `content`, NaN/inf as nil like the JSON body."""
+    return msgpack.packb(_finite(content), default=_meta_value, use_bin_type=True)
+
+
+def negotiated_response(content: Dict, media_type: str, table_key: Optional[str] = None,
+                        table: Union[pd.DataFrame, List[Dict], None] = None) -> Response:
+    """
+    Response for `content` in `media_type` (from negotiate()). For Arrow the
+    body is `table` (default content[table_key]) and the other keys go in
+    the metadata; without a table the response falls back to JSON.
+    """
+    headers = {"Vary": "Accept"}
+    if media_type == ARROW_MEDIA_TYPE and table_key is not None:
+        meta = {k: v for k, v in content.items() if k != table_key}
+        body = arrow_stream(content[table_key] if table is None else table, meta)
+        return Response(body, media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return Response(msgpack_dumps(content), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return FastJSONResponse(content, headers=headers)
@@ -0,0 +1,106 @@
+"""
+Write-behind sync of the sidebar status fields on Stock rows.
+
+The analysis endpoint recomputes efi_status, setup_signal, divergence_status
+and confluence_alert for the symbol being charted. Instead of a SELECT and
+commit inside the request, it calls enqueue(): updates are coalesced per
+symbol (the latest value of each field wins) and a worker thread (started
+and stopped by main.py's lifespan) writes them in batches, one executemany
+UPDATE per transaction. Symbols without a Stock row are ignored, as before.
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam
+from sqlmodel import Session
+
+from database import engine
+from models import Stock
+
+logger = logging.getLogger(__name__)
+
+SYNC_FIELDS = ('efi_status', 'setup_signal', 'divergence_status', 'confluence_alert')
+FLUSH_DELAY = 1.0  # seconds a batch collects updates before it is written
+
+_pending: Dict[str, Dict] = {}
+_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+def enqueue(symbol: str, fields: Dict):
+    """Queue `fields` (a subset of SYNC_FIELDS) for `symbol`'s Stock row."""
+    unknown = set(fields) - set(SYNC_FIELDS)
+    if unknown:
+        raise ValueError(f"Not a synced Stock field: {sorted(unknown)}")
+    with _lock:
+        _pending.setdefault(symbol, {}).update(fields)
+    _wake.set()
+
+
+def pending() -> int:
+    """Number of symbols waiting to be written."""
+    with _lock:
+        return len(_pending)
+
+
+def flush() -> int:
+    """Write every pending update now. Returns the number of symbols written."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+
+    # Rows of an executemany share their columns: group by the fields set
+    groups: Dict[tuple, list] = {}
+    for symbol, fields in batch.items():
+        groups.setdefault(tuple(sorted(fields)), []).append({"_symbol": symbol, **fields})
+    table = Stock.__table__
+    statement = table.update().where(table.c.symbol == bindparam("_symbol"))
+    try:
+        with Session(engine) as session:
+            for rows in groups.values():
+                session.exec(statement, params=rows)
+            session.commit()
+    except Exception as e:
+        # Put the batch back under anything queued meanwhile; the next enqueue retries it
+        with _lock:
+            for symbol, fields in batch.items():
+                _pending[symbol] = {**fields, **_pending.get(symbol, {})}
+        logger.error(f"Stock sync of {len(batch)} symbols failed: {e}")
+        return 0
+    return len(batch)
+
+
+def _work():
+    while True:
+        _wake.wait()
+        stopping = _stop.wait(FLUSH_DELAY)  # collect the batch, unless shutting down
+        _wake.clear()
+        flush()
+        if stopping:
+            return
+
+
+def start_worker():
+    """Start the sync worker thread (idempotent)."""
+    global _worker
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _stop.clear()
+            _worker = threading.Thread(target=_work, name="stock-sync", daemon=True)
+            _worker.start()
+
+
+def stop_worker(timeout: float = 5.0):
+    """Stop the worker, writing whatever is still queued."""
+    global _worker
+    if _worker is not None:
+        _stop.set()
+        _wake.set()
+        _worker.join(timeout)
+        _worker = None
+    flush()
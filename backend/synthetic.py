@@ -0,0 +1,15 @@
+"""Synthetic OHLCV bars for the tests and benchmarks (a seeded random walk)."""
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n=300, seed=0, start="2020-01-01"):
+    """`n` business-day bars starting at `start`; the same seed gives the same frame."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+    volume = rng.integers(1_000_000, 5_000_000, n).astype(float)
+    index = pd.bdate_range(start, periods=n, name="Date")
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
@@ -0,0 +1,122 @@
+import sys
+import os
+import json
+import threading
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils
+import indicator_stream
+import routes.stocks as stocks
+from models import AnalysisBatchRequest
+
+
+def history(ticker, n=300):
+    rng = np.random.default_rng(sum(map(ord, ticker)))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2024-01-02", periods=n, freq="B", tz="America/New_York", name="Date")
+    return pd.DataFrame({'Open': close * (1 + rng.normal(0, 0.003, n)), 'High': close * 1.01,
+                         'Low': close * 0.99, 'Close': close, 'Volume': rng.uniform(1e6, 2e6, n)}, index=index)
+
+
+class Fakes:
+    """Network, caches and the sidebar sync replaced for the duration of a test."""
+
+    def __enter__(self):
+        self.calls, self.cache, self.synced = [], {}, {}
+
+        def fetch_history(ticker, period, interval="1d", timeout=10):
+            self.calls.append((ticker, interval))
+            return pd.DataFrame() if ticker == "NODATA" else history(ticker, 60 if interval == "1wk" else 300)
+
+        self.saved = (utils.fetch_history, stocks.get_cached, stocks.set_cache, stocks.get_stock_info_cached,
+                      stocks.stock_sync.enqueue, indicator_stream.get_cached, indicator_stream.set_cache)
+        utils.fetch_history = fetch_history
+        stocks.get_cached = indicator_stream.get_cached = lambda key, ttl=None: self.cache.get(key)
+        stocks.set_cache = indicator_stream.set_cache = lambda key, data: self.cache.__setitem__(key, data)
+        stocks.get_stock_info_cached = lambda symbol: {"sector": "Technology"}
+        stocks.stock_sync.enqueue = lambda symbol, fields: self.synced.__setitem__(symbol, fields)
+        return self
+
+    def __exit__(self, *exc):
+        (utils.fetch_history, stocks.get_cached, stocks.set_cache, stocks.get_stock_info_cached,
+         stocks.stock_sync.enqueue, indicator_stream.get_cached, indicator_stream.set_cache) = self.saved
+
+
+def batch(**kwargs):
+    return json.loads(stocks.analyze_batch(AnalysisBatchRequest(**kwargs), accept=None).body)
+
+
+def test_batch_shares_one_snapshot():
+    with Fakes() as fakes:
+        result = batch(symbols=["aaa", "BBB", "AAA", "NODATA"])
+        # Each ticker is loaded once: bars and weekly tide per symbol, the proxies and ETFs once
+        assert sorted(t for t, interval in fakes.calls if t in ("AAA", "BBB", "NODATA")) == \
+            ["AAA", "AAA", "BBB", "BBB", "NODATA", "NODATA"]
+        assert sum(t == "SPY" for t, _ in fakes.calls) == 1
+        assert [r["symbol"] for r in result["results"]] == ["AAA", "BBB"]
+        assert result["errors"] == {"NODATA": "No data found for symbol"}
+        assert result["snapshot"]["macro_status"] in ("Risk-On", "Risk-Off")
+        assert set(fakes.synced) == {"AAA", "BBB"}
+
+        card = result["results"][0]
+        assert "data" not in card and "macro_tides" not in card
+        assert card["impulse"] in ("green", "red", "blue") and card["elder_tactics"]["recommendation"]
+        assert card["close"] == history("AAA")['Close'].iloc[-1]
+
+        # Bars are cached like the analysis endpoint's: the summary matches it
+        calls = len(fakes.calls)
+        full = batch(symbols=["AAA"], summaryOnly=False)["results"][0]
+        assert len(fakes.calls) == calls
+        assert full["regime"] == card["regime"] and full["elder_tactics"]["reason"] == card["elder_tactics"]["reason"]
+        assert full["data"]["values"]["impulse"][-1] == card["impulse"]
+        assert 'guppy_signal' in full["data"]["columns"]
+
+
+def test_batch_partial_timeout():
+    release, threads = threading.Event(), set()
+    with Fakes() as fakes:
+        load = utils.fetch_history
+
+        def fetch_history(ticker, period, interval="1d", timeout=10):
+            threads.add(threading.current_thread().name)
+            if ticker == "SLOW":
+                release.wait(5)
+            return load(ticker, period, interval, timeout)
+
+        saved = utils.FETCH_TIMEOUT
+        utils.fetch_history, utils.FETCH_TIMEOUT = fetch_history, 0.2
+        try:
+            result = batch(symbols=["AAA", "SLOW"])
+        finally:
+            release.set()
+            utils.FETCH_TIMEOUT = saved
+
+        # The symbols that arrived are analyzed; the late one is an error
+        assert [r["symbol"] for r in result["results"]] == ["AAA"]
+        assert result["errors"] == {"SLOW": "No data found for symbol"}
+        # On the batch pool, not the one single analyses use
+        assert threads and all(name.startswith("batch") for name in threads)
+        # Nothing was cached for it, so the next batch loads it again
+        assert not any("SLOW" in key for key in fakes.cache)
+        assert [r["symbol"] for r in batch(symbols=["SLOW"])["results"]] == ["SLOW"]
+
+
+def test_batch_validation():
+    for symbols in ([], [" "], [f"S{i}" for i in range(stocks.MAX_BATCH_SYMBOLS + 1)]):
+        try:
+            batch(symbols=symbols)
+            assert False, "expected HTTPException"
+        except HTTPException as e:
+            assert e.status_code == 400
+
+
+if __name__ == "__main__":
+    test_batch_shares_one_snapshot()
+    test_batch_partial_timeout()
+    test_batch_validation()
+    print("Batch analysis tests passed!")
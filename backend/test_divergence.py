@@ -0,0 +1,89 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from divergence import wave_segments, divergence_history, divergence_signals, latest_divergence
+from backtest_engine import ScriptParser
+
+
+def make_frame(hist, highs, lows=None):
+    n = len(hist)
+    highs = np.asarray(highs, dtype=float)
+    lows = highs - 1 if lows is None else np.asarray(lows, dtype=float)
+    index = pd.bdate_range("2020-01-01", periods=n)
+    return pd.DataFrame({'macd_diff': hist, 'High': highs, 'Low': lows}, index=index)
+
+
+def bearish_setup(tail):
+    # Lead-in, positive wave peaking at 2.0, negative bridge, lower positive peak at 1.0
+    hist = [np.nan] * 5 + [-0.5] * 30 + [0.5, 2.0, 0.5] + [-0.5, -0.5] + [0.3, 1.0] + tail
+    highs = [100.0] * len(hist)
+    highs[36] = 110.0   # first peak
+    highs[41] = 111.0   # higher high on the weaker wave
+    return make_frame(hist, highs)
+
+
+def test_wave_segments_match_loop():
+    rng = np.random.default_rng(0)
+    hist = rng.normal(0, 1, 500).cumsum() / 5
+    hist[:10] = np.nan
+    highs = rng.normal(100, 1, 500)
+    lows = highs - 1
+    seg = wave_segments(hist, highs, lows)
+
+    # Naive reference: walk the waves bar by bar
+    starts = [0] + [i for i in range(1, 500) if (hist[i] >= 0) != (hist[i - 1] >= 0)]
+    bounds = [(a, b) for a, b in zip(starts, starts[1:] + [500]) if not np.isnan(hist[a:b]).all()]
+    assert seg['start'].tolist() == [a for a, _ in bounds]
+    for k, (a, b) in enumerate(bounds):
+        part = pd.Series(hist[a:b])
+        if hist[a] >= 0:
+            assert seg['extrema_idx'][k] == a + part.idxmax()
+            assert seg['price_at_extrema'][k] == highs[a:b].max()
+        else:
+            assert seg['extrema_idx'][k] == a + part.idxmin()
+            assert seg['price_at_extrema'][k] == lows[a:b].min()
+
+
+def test_latest_bearish_divergence():
+    df = bearish_setup([0.8] * 8)
+    div = latest_divergence(df, 'macd_diff')
+    assert div == {"type": "bearish", "idx1": 36, "idx2": 41, "recency": len(df) - 1 - 41}
+    # The scan only reports divergences whose extreme is at most 5 bars old
+    assert latest_divergence(df, 'macd_diff', max_recency=5) is None
+    # Not confirmed while the oscillator is still at its peak
+    assert latest_divergence(bearish_setup([1.0] * 8), 'macd_diff') is None
+
+
+def test_history_has_no_look_ahead():
+    df = bearish_setup([0.8] * 8 + [-0.2] * 10)
+    history = divergence_history(df, 'macd_diff')
+    assert history['type'].tolist() == ['bearish']
+    # Dated on the zero cross that closes the second wave
+    assert history['signal_idx'].iloc[0] == 50
+    # While that wave is still open there is nothing to report yet
+    assert divergence_history(df.iloc[:50], 'macd_diff').empty
+
+
+def test_signal_arrays_and_bsl_lookback():
+    df = bearish_setup([0.8] * 8 + [-0.2] * 10)
+    bullish, bearish = divergence_signals(df)
+    assert not bullish.any()
+    assert np.flatnonzero(bearish).tolist() == [50]
+
+    # Extremes are 5 bars apart: a 4-bar lookback rules the divergence out
+    df, _ = ScriptParser.parse_script(df, "ENTRY_SHORT = MACD_DIVERGENCE_BEARISH()\nEXIT_SHORT = MACD_DIVERGENCE_BEARISH(4)")
+    assert np.flatnonzero(df['custom_entry_short'].to_numpy()).tolist() == [50]
+    assert not df['custom_exit_short'].any()
+
+
+if __name__ == "__main__":
+    test_wave_segments_match_loop()
+    test_latest_bearish_divergence()
+    test_history_has_no_look_ahead()
+    test_signal_arrays_and_bsl_lookback()
+    print("Divergence tests passed!")
@@ -0,0 +1,71 @@
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils
+from utils import as_download, fetch_concurrently
+
+
+def history(n=5, tz="America/New_York", start=100.0):
+    index = pd.date_range("2024-01-02", periods=n, freq="B", tz=tz, name="Date")
+    close = start + np.arange(n, dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(n, 1e6)}, index=index)
+
+
+def test_as_download_layout():
+    data = as_download({"spy": history(), "^TNX": history(start=4.0, tz="America/Chicago"), "BAD": pd.DataFrame()})
+    # yf.download's layout: (Price, Ticker) columns, sorted by price field, naive daily index
+    assert data.columns.names == ['Price', 'Ticker']
+    assert list(data.columns.get_level_values(0).unique()) == ['Close', 'High', 'Low', 'Open', 'Volume']
+    assert set(data.columns.get_level_values(1)) == {"SPY", "^TNX", "BAD"}
+    assert data.index.tz is None and len(data) == 5
+    assert data['Close']['SPY'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert data['Close']['^TNX'].iloc[0] == 4.0 and data['Close']['BAD'].isna().all()
+
+    intraday = as_download({"AAA": history()}, interval="5m")
+    assert str(intraday.index.tz) == "UTC"
+    # A single ticker flattens like the analysis endpoint does it
+    assert list(as_download({"AAA": history()}).xs("AAA", axis=1, level=1).columns) == \
+        ['Close', 'High', 'Low', 'Open', 'Volume']
+
+
+def test_loads_run_concurrently_with_a_deadline():
+    fetch_history = utils.fetch_history
+
+    def fake(ticker, period, interval="1d", timeout=10):
+        time.sleep(0.5 if ticker == "SLOW" else 0.1)
+        return pd.DataFrame() if ticker == "NONE" else history()
+
+    def failing():
+        raise RuntimeError("no info")
+
+    utils.fetch_history = fake
+    try:
+        start = time.perf_counter()
+        results = fetch_concurrently(
+            {"bars": ("AAA", "1y", "1d"), "group": (["BBB", "CCC", "DDD"], "2mo", "1d"),
+             "none": ("NONE", "1y", "1d"), "late": ("SLOW", "1y", "1d")},
+            {"info": lambda: (time.sleep(0.1), {"sector": "Energy"})[1], "broken": failing},
+            timeout=0.3,
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        utils.fetch_history = fetch_history
+
+    assert elapsed < 0.45  # the deadline, not the sum of the loads
+    assert results["bars"]['Close']['AAA'].iloc[-1] == 104.0
+    assert set(results["group"]['Close'].columns) == {"BBB", "CCC", "DDD"}
+    assert results["none"].empty and results["late"].empty  # nothing arrived / timed out
+    assert results["info"] == {"sector": "Energy"} and "broken" not in results
+
+
+if __name__ == "__main__":
+    test_as_download_layout()
+    test_loads_run_concurrently_with_a_deadline()
+    print("Concurrent fetch tests passed!")
@@ -0,0 +1,125 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_ohlcv
+from indicators import (calculate_indicators, resolve_indicators, available_outputs, field_columns,
+                        BASE_COLUMNS, FIELD_GROUPS, PROFILES)
+
+
+def test_subset_matches_full_set():
+    full = calculate_indicators(make_ohlcv())
+    assert list(full.columns[5:]) == available_outputs()
+
+    requested = ['impulse', 'efi_buy_signal', 'efi_sell_signal', 'force_index_2']
+    subset = calculate_indicators(make_ohlcv(), outputs=requested)
+
+    # Dependencies are pulled in, unrelated indicators are not computed
+    assert 'ema_13' in subset.columns and 'macd_diff' in subset.columns
+    assert 'guppy_short_3' not in subset.columns
+    assert 'volatility_stop' not in subset.columns
+    assert 'candle_pattern' not in subset.columns
+
+    for col in subset.columns:
+        pd.testing.assert_series_equal(subset[col], full[col], check_exact=True)
+
+
+def test_resolve_order_and_names():
+    # Indicator names are accepted too, and evaluation order follows registration
+    assert resolve_indicators(['price_atr_h1']) == ['ema', 'price_atr_channels']
+    assert resolve_indicators(['guppy']) == ['guppy']
+
+    try:
+        resolve_indicators(['not_a_column'])
+        assert False, "Unknown outputs should raise"
+    except ValueError:
+        pass
+
+
+def test_compact_mode():
+    full = calculate_indicators(make_ohlcv())
+    compact = calculate_indicators(make_ohlcv(), compact=True)
+
+    assert compact.attrs['compact_bytes_saved'] > 0
+    assert compact['rsi'].dtype == np.float32
+    assert isinstance(compact['impulse'].dtype, pd.CategoricalDtype)
+    for col in BASE_COLUMNS:
+        assert compact[col].dtype == np.float64
+
+    np.testing.assert_allclose(compact['ema_13'], full['ema_13'], rtol=1e-6)
+    assert (compact['impulse'].astype(str) == full['impulse']).all()
+    print(f"Compact mode saved {compact.attrs['compact_bytes_saved']} bytes")
+
+
+def test_profiles():
+    # seed 9 ends on a three white soldiers bar
+    full = calculate_indicators(make_ohlcv(seed=9))
+    scan = calculate_indicators(make_ohlcv(seed=9), profile='scan')
+    screen = calculate_indicators(make_ohlcv(seed=9), profile='screen')
+
+    assert 'guppy_short_3' not in scan.columns and 'volatility_stop' not in scan.columns
+    assert list(screen.columns) == list(full.columns)
+
+    # Patterns only on the last bar, equal to whole-history detection there
+    for frame in (scan, screen):
+        assert frame['candle_pattern'].iloc[:-1].isna().all()
+        assert frame['candle_pattern'].iloc[-1] == full['candle_pattern'].iloc[-1] == 'three_white_soldiers'
+    for col in full.columns:
+        if not col.startswith('candle_pattern'):
+            pd.testing.assert_series_equal(screen[col], full[col], check_exact=True)
+
+    try:
+        calculate_indicators(make_ohlcv(), profile='nope')
+        assert False, "Unknown profiles should raise"
+    except ValueError:
+        pass
+
+
+def test_efi_signals_fire_on_zone_entry_only():
+    # seed 1 has multi-bar stays in both 3-ATR zones
+    df = calculate_indicators(make_ohlcv(seed=1))
+    for signal, zone in (('efi_buy_signal', df['efi'] <= df['efi_atr_l3']),
+                         ('efi_sell_signal', df['efi'] >= df['efi_atr_h3'])):
+        assert df[signal].dtype == bool
+        entries = zone & ~zone.shift(1, fill_value=False)
+        assert zone.sum() > entries.sum() > 0
+        assert df[signal].equals(entries.rename(signal))
+
+
+def test_field_projection():
+    assert field_columns(["guppy"])[-1] == 'guppy_signal' and len(field_columns(["guppy"])) == 15
+    # Groups, indicator names and columns mix; the result is in full-frame order
+    cols = field_columns(["efi_bands", "ema_50", "elder"])
+    assert cols == [c for c in available_outputs() if c in cols]
+    assert {'efi', 'efi_signal', 'efi_atr_h3', 'ema_50', 'impulse', 'bulls_power', 'force_index_2'} <= set(cols)
+    assert 'ema_13' not in cols  # a dependency, not part of the projection
+    for group in FIELD_GROUPS:
+        assert field_columns([group])
+    try:
+        field_columns(["guppy", "nope"])
+        assert False, "Unknown fields should raise"
+    except ValueError:
+        pass
+
+    # A minimal chart computes only the projection plus what the analysis reads
+    df = make_ohlcv(seed=9)
+    full = calculate_indicators(df.copy())
+    minimal = calculate_indicators(df.copy(), outputs=[*PROFILES["analysis"].outputs, *cols], profile="analysis")
+    assert 'guppy_signal' not in minimal.columns and 'bb_upper' not in minimal.columns
+    for col in cols:
+        pd.testing.assert_series_equal(minimal[col], full[col], check_exact=True)
+    assert minimal['candle_pattern'].iloc[-1] == full['candle_pattern'].iloc[-1] == 'three_white_soldiers'
+
+
+if __name__ == "__main__":
+    test_subset_matches_full_set()
+    test_resolve_order_and_names()
+    test_compact_mode()
+    test_profiles()
+    test_efi_signals_fire_on_zone_entry_only()
+    test_field_projection()
+    print("Indicator graph tests passed!")
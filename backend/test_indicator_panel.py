@@ -0,0 +1,58 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_ohlcv
+from indicators import calculate_indicators
+from indicator_panel import (
+    PANEL_OUTPUTS, calculate_panel, panel_from_download, symbol_frame, last_values,
+)
+
+
+def make_download():
+    # Ragged watchlist: a later listing, missing bars and a stale last bar
+    frames = {f"S{i}": make_ohlcv(400, seed=i) for i in range(4)}
+    frames['S1'] = frames['S1'].iloc[120:]
+    frames['S2'] = frames['S2'].drop(frames['S2'].index[[50, 51, 200]])
+    frames['S3'] = frames['S3'].iloc[:395]
+    return pd.concat(frames, axis=1), list(frames)
+
+
+def test_panel_matches_per_symbol():
+    download, symbols = make_download()
+    panel = panel_from_download(download, symbols)
+    result = calculate_panel(panel)
+
+    for symbol in symbols:
+        expected = calculate_indicators(symbol_frame(panel, symbol).copy())
+        for col in PANEL_OUTPUTS:
+            got = result[col][symbol].loc[expected.index]
+            if expected[col].dtype == bool:
+                assert (got.astype(bool) == expected[col]).all(), (symbol, col)
+            elif expected[col].dtype.kind in 'fi':
+                assert np.array_equal(got.to_numpy(float), expected[col].to_numpy(float), equal_nan=True), (symbol, col)
+            else:
+                assert (got.astype(str) == expected[col].astype(str)).all(), (symbol, col)
+    print(f"Panel of {len(symbols)} symbols matches per-symbol indicators")
+
+
+def test_last_values_use_each_symbols_last_bar():
+    download, symbols = make_download()
+    panel = panel_from_download(download, symbols)
+    result = calculate_panel(panel, outputs=['impulse'])
+    assert list(result) == ['impulse']
+
+    impulses = last_values(result, panel, 'impulse')
+    # S3 has no bars in the last rows; its own last bar is used, not a blank row
+    expected = calculate_indicators(symbol_frame(panel, 'S3').copy(), outputs=['impulse'])
+    assert impulses['S3'] == expected['impulse'].iloc[-1]
+
+
+if __name__ == "__main__":
+    test_panel_matches_per_symbol()
+    test_last_values_use_each_symbols_last_bar()
+    print("Indicator panel tests passed!")
@@ -0,0 +1,130 @@
+import sys
+import os
+import pickle
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_ohlcv
+from indicators import calculate_indicators
+import indicator_stream
+from indicator_stream import IndicatorState, stream_indicators
+
+
+def test_extend_matches_batch():
+    full = make_ohlcv(400, seed=1)
+    # Flat, zero-range stretch exercises the rolling-window edge cases
+    full.iloc[150:190, :4] = 50.0
+
+    for n in (40, 160, 300):
+        frame = calculate_indicators(full.iloc[:n].copy())
+        state = IndicatorState.from_ohlcv(frame)
+        for start in range(n, len(full), 45):
+            frame = state.extend(frame, full.iloc[start:start + 45])
+            # State survives a save/restore round trip
+            state = pickle.loads(pickle.dumps(state))
+
+        expected = calculate_indicators(full.copy())
+        pd.testing.assert_frame_equal(frame, expected, check_exact=True)
+        print(f"Streamed {len(full) - n} bars onto {n}: identical to batch")
+
+
+def test_revise_last_bar():
+    full = make_ohlcv(250, seed=2)
+    frame = calculate_indicators(full.iloc[:249].copy())
+    state = IndicatorState.from_ohlcv(frame)
+    frame = state.extend(frame, full.iloc[249:])
+
+    # The forming bar ticks higher: same timestamp, new values
+    revised = full.copy()
+    revised.iloc[-1, revised.columns.get_loc('Close')] *= 1.02
+    revised.iloc[-1, revised.columns.get_loc('High')] *= 1.02
+    frame = state.extend(frame, revised.iloc[-1:])
+
+    pd.testing.assert_frame_equal(frame, calculate_indicators(revised.copy()), check_exact=True)
+
+
+def test_updates_write_only_the_streamed_rows():
+    store, writes = {}, []
+
+    def set_cache(key, data):
+        writes.append(key)
+        store[key] = pickle.loads(pickle.dumps(data))
+
+    saved = indicator_stream.get_cached, indicator_stream.set_cache
+    indicator_stream.get_cached = lambda key, ttl=None: store.get(key)
+    indicator_stream.set_cache = set_cache
+    try:
+        full = make_ohlcv(300, seed=4)
+        stream_indicators("AAA", "1d", full.iloc[:250].copy())
+        base_key = "indicator_frame_AAA_1d"
+        assert writes.count(base_key) == 1
+
+        # Appended bars and a revised last bar: the base frame is not rewritten
+        revised = full.iloc[:280].copy()
+        revised.iloc[-1, revised.columns.get_loc('Close')] *= 1.01
+        for ohlcv in (full.iloc[:270], full.iloc[:280], revised):
+            frame = stream_indicators("AAA", "1d", ohlcv.copy())
+            pd.testing.assert_frame_equal(frame, calculate_indicators(ohlcv.copy()), check_exact=True)
+        assert writes.count(base_key) == 1
+        entry = store["indicator_state_AAA_1d"]
+        assert entry['start'] == 250 and len(entry['rows']) == 30
+
+        # Past MAX_TAIL_ROWS the frame becomes the new base
+        frame = stream_indicators("AAA", "1d", full.copy())
+        assert writes.count(base_key) == 1
+        longer = pd.concat([full, make_ohlcv(60, seed=5, start=full.index[-1] + pd.offsets.BDay())])
+        longer.index.name = "Date"
+        frame = stream_indicators("AAA", "1d", longer.copy())
+        assert writes.count(base_key) == 2 and len(store["indicator_state_AAA_1d"]['rows']) == 0
+        pd.testing.assert_frame_equal(frame, calculate_indicators(longer.copy()), check_exact=True)
+
+        # A shorter period is a slice of the same frame
+        frame = stream_indicators("AAA", "1d", longer.iloc[-120:].copy())
+        assert writes.count(base_key) == 2
+        pd.testing.assert_frame_equal(frame, calculate_indicators(longer.copy()).iloc[-120:], check_exact=True)
+    finally:
+        indicator_stream.get_cached, indicator_stream.set_cache = saved
+
+
+def test_sliding_window_is_streamed():
+    store, writes = {}, []
+
+    def set_cache(key, data):
+        writes.append(key)
+        store[key] = pickle.loads(pickle.dumps(data))
+
+    saved = indicator_stream.get_cached, indicator_stream.set_cache
+    indicator_stream.get_cached = lambda key, ttl=None: store.get(key)
+    indicator_stream.set_cache = set_cache
+    try:
+        full = make_ohlcv(330, seed=6)
+        base_key = "indicator_frame_AAA_1d"
+        # A one-year fetch: each new bar drops the oldest one
+        for end in range(252, 262):
+            frame = stream_indicators("AAA", "1d", full.iloc[end - 252:end].copy())
+            expected = calculate_indicators(full.iloc[:end].copy()).iloc[end - 252:]
+            pd.testing.assert_frame_equal(frame, expected, check_exact=True)
+        assert writes.count(base_key) == 1
+
+        # Past MAX_TAIL_ROWS the new base starts at the current window
+        frame = stream_indicators("AAA", "1d", full.iloc[-252:].copy())
+        assert writes.count(base_key) == 2
+        assert store[base_key]['frame'].index.equals(full.index[-252:])
+        pd.testing.assert_frame_equal(frame, calculate_indicators(full.copy()).iloc[-252:], check_exact=True)
+
+        # A window starting before the anchor is computed in batch
+        frame = stream_indicators("AAA", "1d", full.iloc[-300:].copy())
+        assert writes.count(base_key) == 3
+        pd.testing.assert_frame_equal(frame, calculate_indicators(full.iloc[-300:].copy()), check_exact=True)
+    finally:
+        indicator_stream.get_cached, indicator_stream.set_cache = saved
+
+
+if __name__ == "__main__":
+    test_extend_matches_batch()
+    test_revise_last_bar()
+    test_updates_write_only_the_streamed_rows()
+    test_sliding_window_is_streamed()
+    print("Indicator stream tests passed!")
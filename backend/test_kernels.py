@@ -0,0 +1,80 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import kernels
+from kernels import ema_bank, first_crossing, volatility_stop
+
+
+def make_series(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    values = 100 + np.cumsum(rng.normal(0, 1, n))
+    values[[0, 5, 6, 400]] = np.nan   # leading and interior gaps
+    values[100:130] = 42.0            # constant run
+    return values
+
+
+def test_ema_bank_matches_pandas():
+    values = make_series()
+    spans = [3, 5, 13, 22, 60, 200]
+    bank = ema_bank(values, spans)
+    assert bank.shape == (len(values), len(spans))
+
+    for k, span in enumerate(spans):
+        expected = pd.Series(values).ewm(span=span, min_periods=span, adjust=False).mean().to_numpy()
+        assert np.array_equal(bank[:, k], expected, equal_nan=True), span
+
+
+def test_ema_bank_loop_matches_fallback():
+    # The single-pass loop (compiled when numba is available) must agree with the fallback
+    values = make_series(500, seed=1)
+    spans = np.array([3, 8, 26, 50], dtype=float)
+    out = np.empty((len(values), len(spans)))
+    kernels._ema_bank_loop(values, (spans - 1) / 2, spans.astype(np.int64), out)
+    assert np.array_equal(out, ema_bank(values, spans), equal_nan=True)
+
+
+def test_fallback_matches_compiled_kernels():
+    # The uncompiled path (no numba) must give the same arrays
+    values = make_series(500, seed=3)
+    spans = [3, 13, 60]
+    expected = (ema_bank(values, spans), volatility_stop(values, values * 0.95, values * 1.05, start=10))
+    saved = {name: getattr(kernels, name) for name in dir(kernels) if name.endswith("_compiled")}
+    try:
+        for name in saved:
+            setattr(kernels, name, None)
+        fallback = (ema_bank(values, spans), volatility_stop(values, values * 0.95, values * 1.05, start=10))
+    finally:
+        for name, func in saved.items():
+            setattr(kernels, name, func)
+    for got, want in zip(fallback, expected):
+        assert np.array_equal(got, want, equal_nan=True)
+
+
+def test_volatility_stop_flips_on_close_through_stop():
+    close = np.array([10., 11., 12., 9., 8., 7., 12.])
+    long_stop = np.array([np.nan, 9., 10., 8., 7., 6., 9.])
+    short_stop = np.array([np.nan, 13., 14., 11., 10., 9., 13.])
+    stop = volatility_stop(close, long_stop, short_stop, start=1)
+    # long trail rises 9 -> 10, close 9 flips short at 11, trail falls to 10, 9, close 12 flips long
+    expected = np.array([np.nan, 9., 10., 11., 10., 9., 9.])
+    assert np.array_equal(stop, expected, equal_nan=True)
+
+
+def test_first_crossing():
+    zone = np.array([True, True, False, True, False, False, True, True])
+    assert first_crossing(zone).tolist() == [True, False, False, True, False, False, True, False]
+    assert first_crossing(np.array([], dtype=bool)).tolist() == []
+
+
+if __name__ == "__main__":
+    test_ema_bank_matches_pandas()
+    test_ema_bank_loop_matches_fallback()
+    test_fallback_matches_compiled_kernels()
+    test_volatility_stop_flips_on_close_through_stop()
+    test_first_crossing()
+    print("Kernel tests passed!")
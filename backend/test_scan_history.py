@@ -0,0 +1,50 @@
+import sys
+import os
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import ScanResult
+from scan_jobs import SCAN_FIELDS, _history_upsert
+from routes.stocks import get_scan_history, get_signal_first_seen
+
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return Session(engine)
+
+
+def row(symbol, bar_date, setup=None):
+    return {"symbol": symbol, "bar_date": bar_date, "scanned_at": "2024-01-05T00:00:00",
+            **{f: None for f in SCAN_FIELDS}, "setup_signal": setup}
+
+
+def test_history_upsert_and_first_seen():
+    with make_session() as session:
+        session.exec(_history_upsert(), params=[
+            row("AAA", "2024-01-01", "pullback_buy"), row("AAA", "2024-01-02"),
+            row("AAA", "2024-01-03", "pullback_buy"), row("AAA", "2024-01-04", "pullback_buy"),
+            row("BBB", "2024-01-03", "pullback_buy"), row("BBB", "2024-01-04"),
+            row("CCC", "2024-01-04", "pullback_buy"),
+        ])
+        session.commit()
+        # A rescan of the same bar updates that day's row
+        session.exec(_history_upsert(), params=[row("CCC", "2024-01-04", "pullback_buy_strong")])
+        session.commit()
+        assert len(session.exec(select(ScanResult)).all()) == 7
+
+        # Only symbols still showing the signal; the run restarts after a gap
+        first_seen = get_signal_first_seen("setup", "pullback_buy", session=session)
+        assert first_seen == [{"symbol": "AAA", "first_seen": "2024-01-03", "last_seen": "2024-01-04", "scans": 2}]
+
+        history = get_scan_history(symbol="aaa", signal="setup", value=None, since="2024-01-02", until=None,
+                                   limit=10, session=session)
+        assert [r.bar_date for r in history] == ["2024-01-04", "2024-01-03"]
+
+
+if __name__ == "__main__":
+    test_history_upsert_and_first_seen()
+    print("Scan history tests passed!")
@@ -0,0 +1,139 @@
+import sys
+import os
+import json
+import threading
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import scan_jobs
+from scan_jobs import ScanJob
+
+
+def parse(stream):
+    events = []
+    for chunk in stream:
+        if chunk.startswith(':'):
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_events_stream_while_job_runs():
+    job = ScanJob()
+    job.status, job.started_at, job.total = "running", time.time(), 2
+
+    def worker():
+        for symbol in ("AAA", "BBB"):
+            time.sleep(0.05)
+            job.done += 1
+            job.publish("result", {"symbol": symbol})
+        job.finish("done")
+
+    threading.Thread(target=worker).start()
+    events = parse(job.sse())
+    assert [e[1] for e in events] == ["result", "result", "done"]
+    assert [e[0] for e in events] == [0, 1, 2]
+    assert events[-1][2]["done"] == 2 and events[-1][2]["status"] == "done"
+
+    # A reconnecting client resumes after its Last-Event-ID
+    assert [e[2].get("symbol") for e in parse(job.sse(1))] == ["BBB", None]
+
+
+def test_stream_ends_with_the_final_event():
+    job = ScanJob()
+    job.status, job.started_at = "running", time.time()
+    progress = job.progress
+
+    def slow_progress():
+        time.sleep(0.1)  # a reader wakes while the final event is being built
+        return progress()
+
+    job.progress = slow_progress
+    keepalive = scan_jobs.SSE_KEEPALIVE
+    scan_jobs.SSE_KEEPALIVE = 0.01
+    try:
+        threading.Timer(0.05, job.finish, args=("done",)).start()
+        events = parse(job.sse())
+    finally:
+        scan_jobs.SSE_KEEPALIVE = keepalive
+    assert [e[1] for e in events] == ["done"]
+
+
+def test_progress_eta_and_failures():
+    job = ScanJob()
+    job.status, job.started_at, job.total, job.done = "running", time.time() - 10, 4, 1
+    job.failures.append({"symbol": "BAD", "error": "boom"})
+    progress = job.progress()
+    assert progress["eta_seconds"] == 30.0
+    assert progress["failures"] == [{"symbol": "BAD", "error": "boom"}]
+
+    job.finish("failed", error="download failed")
+    assert job.progress()["eta_seconds"] is None
+    assert job.events[-1][0] == "failed"
+
+
+def test_history_keeps_unfinished_jobs():
+    release = threading.Event()
+
+    def run_job(job):
+        job.status = "running"
+        if job.universe == "slow":
+            release.wait(5)
+        job.finish("done")
+
+    saved = scan_jobs._run_job, scan_jobs.JOB_HISTORY, scan_jobs._jobs.copy()
+    try:
+        scan_jobs._run_job, scan_jobs.JOB_HISTORY = run_job, 3
+        scan_jobs._jobs.clear()
+        slow = scan_jobs.submit_scan(universe="slow")
+        queued = [scan_jobs.submit_scan(universe=f"u{i}") for i in range(5)]
+        # The running job and everything queued behind it are still there
+        assert all(scan_jobs.get_job(job.id) is job for job in [slow] + queued)
+
+        release.set()
+        deadline = time.time() + 5
+        while not queued[-1].finished and time.time() < deadline:
+            time.sleep(0.01)
+        latest = scan_jobs.submit_scan(universe="u9")
+        while not latest.finished and time.time() < deadline:
+            time.sleep(0.01)
+        # Once they finish, only the newest JOB_HISTORY are kept
+        assert list(scan_jobs._jobs) == [job.id for job in queued[-2:] + [latest]]
+    finally:
+        release.set()
+        scan_jobs.stop_worker()
+        scan_jobs._run_job, scan_jobs.JOB_HISTORY = saved[:2]
+        scan_jobs._jobs.clear()
+        scan_jobs._jobs.update(saved[2])
+
+
+def test_history_keeps_jobs_below_the_limit():
+    saved = scan_jobs._run_job, scan_jobs._jobs.copy()
+    try:
+        scan_jobs._run_job = lambda job: job.finish("done")
+        scan_jobs._jobs.clear()
+        jobs = []
+        for i in range(scan_jobs.JOB_HISTORY - 5):
+            jobs.append(scan_jobs.submit_scan(universe=f"u{i}"))
+            deadline = time.time() + 5
+            while not jobs[-1].finished and time.time() < deadline:
+                time.sleep(0.01)
+        # Fewer jobs than JOB_HISTORY: every finished one stays pollable
+        assert all(scan_jobs.get_job(job.id) is job for job in jobs)
+    finally:
+        scan_jobs.stop_worker()
+        scan_jobs._run_job = saved[0]
+        scan_jobs._jobs.clear()
+        scan_jobs._jobs.update(saved[1])
+
+
+if __name__ == "__main__":
+    test_events_stream_while_job_runs()
+    test_stream_ends_with_the_final_event()
+    test_progress_eta_and_failures()
+    test_history_keeps_unfinished_jobs()
+    test_history_keeps_jobs_below_the_limit()
+    print("Scan job tests passed!")
@@ -0,0 +1,95 @@
+import sys
+import os
+import threading
+import time
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import make_ohlcv
+import scanner
+import utils
+from indicator_panel import panel_from_download
+
+
+def test_pool_matches_inline_scan():
+    frames = {f"S{i}": make_ohlcv(300, seed=i) for i in range(3)}
+    frames['SHORT'] = make_ohlcv(30, seed=9)
+    symbols = list(frames)
+    panel = panel_from_download(pd.concat(frames, axis=1), symbols)
+
+    workers, min_pool = scanner.SCAN_WORKERS, scanner.MIN_POOL_SYMBOLS
+    try:
+        scanner.SCAN_WORKERS = 1
+        inline = scanner.analyze_watchlist(panel, symbols)
+        scanner.SCAN_WORKERS, scanner.MIN_POOL_SYMBOLS = 2, 1
+        pooled = scanner.analyze_watchlist(panel, symbols)
+    finally:
+        scanner.shutdown_pool()
+        scanner.SCAN_WORKERS, scanner.MIN_POOL_SYMBOLS = workers, min_pool
+
+    # Symbols without enough history are left out
+    assert sorted(inline) == ['S0', 'S1', 'S2']
+    assert pooled == inline
+    assert set(inline['S0']) >= {'divergence_status', 'efi_status', 'setup_signal', 'confluence_alert'}
+
+
+def test_fingerprint_tracks_each_symbols_last_bar():
+    frames = {'A': make_ohlcv(60, seed=1), 'B': make_ohlcv(58, seed=2)}
+    panel = panel_from_download(pd.concat(frames, axis=1), list(frames))
+    before = scanner.bar_fingerprints(panel)
+    # B's last bar is its own, not the blank rows at the end of the panel
+    assert before['B'].startswith(frames['B'].index[-1].isoformat())
+
+    # A revised last bar changes only A's fingerprint
+    frames['A'].iloc[-1, frames['A'].columns.get_loc('Close')] += 0.01
+    after = scanner.bar_fingerprints(panel_from_download(pd.concat(frames, axis=1), list(frames)))
+    assert after['A'] != before['A']
+    assert after['B'] == before['B']
+
+
+def test_overlapping_fetches_keep_their_own_bars():
+    running, overlap, lock = [0], [0], threading.Lock()
+
+    def fetch_history(ticker, period, interval="1d", timeout=10):
+        with lock:
+            running[0] += 1
+            overlap[0] = max(overlap[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return pd.DataFrame() if ticker == "NODATA" else make_ohlcv(60, seed=int(ticker[1:]))
+
+    lists = [[f"A{i}" for i in range(7)] + ["NODATA"], [f"B{i}" for i in range(10, 17)]]
+    panels = {}
+    saved = utils.fetch_history, scanner.FETCH_CHUNK_SIZE
+    try:
+        utils.fetch_history, scanner.FETCH_CHUNK_SIZE = fetch_history, 3
+        # Two scans at once, each fetching several chunks
+        threads = [threading.Thread(target=lambda s=s: panels.__setitem__(s[0], scanner.fetch_watchlist(s)))
+                   for s in lists]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        utils.fetch_history, scanner.FETCH_CHUNK_SIZE = saved
+
+    assert overlap[0] > 1
+    for symbols in lists:
+        close = panels[symbols[0]]['Close']
+        assert list(close.columns) == symbols
+        for symbol in symbols:
+            if symbol == "NODATA":
+                assert close[symbol].isna().all()
+            else:
+                pd.testing.assert_series_equal(close[symbol], make_ohlcv(60, seed=int(symbol[1:]))['Close'],
+                                               check_names=False, check_freq=False)
+
+
+if __name__ == "__main__":
+    test_pool_matches_inline_scan()
+    test_fingerprint_tracks_each_symbols_last_bar()
+    test_overlapping_fetches_keep_their_own_bars()
+    print("Scanner tests passed!")
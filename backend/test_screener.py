@@ -0,0 +1,78 @@
+import sys
+import os
+import pandas as pd
+from sqlmodel import SQLModel, Session, create_engine
+from sqlalchemy.pool import StaticPool
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from screener import SCREEN_COLUMNS, ScreenError, compile_screen, latest_upsert, latest_values, run_screen
+
+
+def row(symbol, **values):
+    return {"symbol": symbol, "bar_date": "2024-01-02", "updated_at": "2024-01-02T22:00:00",
+            "divergence": None, "efi_status": None, "setup": None,
+            **{c: None for c in SCREEN_COLUMNS}, **values}
+
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    session.exec(latest_upsert(), params=[
+        row("AAA", rsi=25.0, impulse="green", close=110.0, ema_200=100.0, high=112.0, low=104.0),
+        row("BBB", rsi=28.0, impulse="red", close=110.0, ema_200=100.0, high=111.0, low=109.0),
+        row("CCC", rsi=20.0, impulse="green", close=90.0, ema_200=100.0, high=91.0, low=89.0, setup="pullback_buy"),
+        row("DDD", rsi=60.0, impulse="green", close=120.0, ema_200=100.0, high=121.0, low=119.0),
+    ])
+    session.commit()
+    return session
+
+
+def screen(session, expression, **kwargs):
+    return [r["symbol"] for r in run_screen(session, expression, **kwargs)]
+
+
+def test_screen_expressions():
+    with make_session() as session:
+        assert screen(session, "rsi < 30 AND impulse = 'green' AND close > ema_200") == ["AAA"]
+        assert screen(session, "rsi < 30 and (impulse = 'red' or setup = 'pullback_buy')") == ["BBB", "CCC"]
+        assert screen(session, "(high - low) / close > 0.05") == ["AAA"]
+        assert screen(session, "NOT close > ema_200 * 1.15") == ["AAA", "BBB", "CCC"]
+        assert screen(session, "setup != NULL") == ["CCC"]
+        assert screen(session, "rsi < 100", order_by="-rsi", limit=2) == ["DDD", "BBB"]
+        assert screen(session, "rsi < 100", symbols=["CCC", "ZZZ"]) == ["CCC"]
+
+        # Upserting a symbol replaces its row
+        session.exec(latest_upsert(), params=[row("DDD", rsi=10.0)])
+        assert screen(session, "rsi < 15") == ["DDD"]
+
+
+def test_values_are_bound_and_errors_reported():
+    compiled = compile_screen("impulse = 'it''s' AND rsi < 30").compile()
+    assert "it's" not in str(compiled) and "it's" in compiled.params.values()
+
+    for expression in ("", "rsi <", "foo > 1", "rsi < 30 AND", "rsi; DROP TABLE stock", "(rsi < 3", "NULL + 1 > 2"):
+        try:
+            compile_screen(expression)
+            assert False, f"accepted {expression!r}"
+        except ScreenError:
+            pass
+
+
+def test_latest_values_from_indicator_row():
+    bar = pd.Series({'Close': 101.5, 'Volume': 2e6, 'rsi': float('nan'), 'impulse': 'blue',
+                     'efi_buy_signal': True, 'candle_pattern': None})
+    values = latest_values(bar)
+    assert set(values) == set(SCREEN_COLUMNS)
+    assert values['close'] == 101.5 and values['volume'] == 2e6
+    assert values['rsi'] is None and values['candle_pattern'] is None and values['open'] is None
+    assert values['impulse'] == 'blue' and values['efi_buy_signal'] == 1.0
+
+
+if __name__ == "__main__":
+    test_screen_expressions()
+    test_values_are_bound_and_errors_reported()
+    test_latest_values_from_indicator_row()
+    print("Screener tests passed!")
@@ -0,0 +1,171 @@
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import serialization
+from serialization import (ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, columnar, dumps,
+                           negotiate, negotiated_response, series_window)
+from synthetic import make_ohlcv
+from indicators import calculate_indicators
+
+
+def as_records(payload):
+    """Rebuild per-bar records from the columnar payload (what the frontend does)."""
+    return [
+        {payload['index_name']: ts, **{c: payload['values'][c][i] for c in payload['columns']}}
+        for i, ts in enumerate(payload['index'])
+    ]
+
+
+def test_columnar_matches_records():
+    df = calculate_indicators(make_ohlcv(300, seed=3))
+    df.index.name = 'Date'
+    payload = columnar(df)
+    assert payload['index_name'] == 'Date' and payload['columns'] == list(df.columns)
+    assert all(len(payload['values'][c]) == len(df) for c in df.columns)
+
+    records = json.loads(dumps(df.reset_index().to_dict(orient="records")))
+    # Strict JSON: NaN/inf must already be None
+    assert json.loads(json.dumps(as_records(payload), allow_nan=False)) == records
+
+
+def test_missing_values_and_dtypes():
+    index = pd.date_range("2024-01-02 09:30", periods=3, freq="h", tz="America/New_York", name="Datetime")
+    df = pd.DataFrame({
+        'Close': [1.5, np.nan, np.inf],
+        'Volume': np.array([10, 20, 30], dtype=np.int64),
+        'flag': [True, False, True],
+        'impulse': ['green', None, 'red'],
+        'kind': pd.Categorical(['a', 'b', None]),
+    }, index=index)
+    payload = columnar(df)
+    assert payload['index'][0] == "2024-01-02T09:30:00-05:00"
+    values = payload['values']
+    assert values['Close'] == [1.5, None, None]
+    assert values['Volume'] == [10, 20, 30] and type(values['Volume'][0]) is int
+    assert values['flag'] == [True, False, True] and type(values['flag'][0]) is bool
+    assert values['impulse'] == ['green', None, 'red']
+    assert values['kind'] == ['a', 'b', None]
+    json.dumps(payload, allow_nan=False)
+
+
+def test_dumps_handles_numpy_and_missing_values():
+    payload = {
+        "nan": float('nan'), "inf": np.float64(np.inf), "count": np.int64(3), "flag": np.bool_(True),
+        "array": np.array([1.5, np.nan]), "when": pd.Timestamp("2024-01-02"), "missing": pd.NaT,
+        "rows": [{"x": np.float32(np.nan)}],
+    }
+    expected = {"nan": None, "inf": None, "count": 3, "flag": True, "array": [1.5, None],
+                "when": "2024-01-02T00:00:00", "missing": None, "rows": [{"x": None}]}
+    assert json.loads(dumps(payload)) == expected
+
+    # Same output from the stdlib fallback when orjson is not installed
+    fast = serialization.orjson
+    serialization.orjson = None
+    try:
+        assert json.loads(dumps(payload)) == expected
+    finally:
+        serialization.orjson = fast
+
+
+def test_negotiate_accept_header():
+    installed = serialization.pa, serialization.msgpack
+    serialization.pa = serialization.msgpack = object()  # both available
+    try:
+        assert negotiate(None) == JSON_MEDIA_TYPE
+        assert negotiate("*/*") == JSON_MEDIA_TYPE
+        assert negotiate("application/json") == JSON_MEDIA_TYPE
+        assert negotiate(ARROW_MEDIA_TYPE) == ARROW_MEDIA_TYPE
+        assert negotiate("application/x-msgpack, application/json;q=0.5") == MSGPACK_MEDIA_TYPE
+        assert negotiate(f"application/json;q=0.9, {ARROW_MEDIA_TYPE}") == ARROW_MEDIA_TYPE
+        assert negotiate(f"{MSGPACK_MEDIA_TYPE}, {ARROW_MEDIA_TYPE}") == MSGPACK_MEDIA_TYPE
+        assert negotiate(f"{ARROW_MEDIA_TYPE};q=0, application/json") == JSON_MEDIA_TYPE
+
+        # Without the library the client gets JSON
+        serialization.pa = None
+        assert negotiate(ARROW_MEDIA_TYPE) == JSON_MEDIA_TYPE
+        assert negotiate(f"{ARROW_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE};q=0.5") == MSGPACK_MEDIA_TYPE
+    finally:
+        serialization.pa, serialization.msgpack = installed
+
+
+def indicator_table():
+    df = calculate_indicators(make_ohlcv(120, seed=3))
+    df.index.name = 'Date'
+    return df
+
+
+def test_arrow_round_trip():
+    pa = pytest.importorskip("pyarrow")
+    df = indicator_table()
+    content = {"symbol": "TEST", "data": None, "regime": "Trending"}
+    response = negotiated_response(content, ARROW_MEDIA_TYPE, table_key="data", table=df)
+    assert response.media_type == ARROW_MEDIA_TYPE
+    table = pa.ipc.open_stream(response.body).read_all()
+    assert table.column_names == ['Date'] + list(df.columns)
+    assert table.column('Close').to_pylist() == df['Close'].tolist()
+    assert table.column('rsi').null_count == int(df['rsi'].isna().sum())
+    assert json.loads(table.schema.metadata[b"meta"]) == {"symbol": "TEST", "regime": "Trending"}
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    content = {"symbol": "TEST", "data": columnar(indicator_table()), "regime": "Trending"}
+    response = negotiated_response(content, MSGPACK_MEDIA_TYPE, table_key="data")
+    assert response.media_type == MSGPACK_MEDIA_TYPE
+    assert msgpack.unpackb(response.body) == json.loads(dumps(content))
+
+
+def test_binary_falls_back_to_json():
+    # Arrow requested for a response without a table: JSON
+    response = negotiated_response({"ok": True}, ARROW_MEDIA_TYPE)
+    assert response.media_type == JSON_MEDIA_TYPE and json.loads(response.body) == {"ok": True}
+
+    # Library not installed: never negotiated
+    saved = serialization.pa, serialization.msgpack
+    serialization.pa = serialization.msgpack = None
+    try:
+        assert negotiate(f"{ARROW_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE}") == JSON_MEDIA_TYPE
+    finally:
+        serialization.pa, serialization.msgpack = saved
+
+
+def test_series_window():
+    index = pd.date_range("2024-01-02", periods=10, freq="B", tz="America/New_York", name="Date")
+    df = pd.DataFrame({'Close': np.arange(10.0)}, index=index)
+
+    tail, offset = series_window(df, since="2024-01-12")  # naive: the index's timezone
+    assert offset == 8 and tail['Close'].tolist() == [8.0, 9.0]
+    tail, offset = series_window(df, since="2024-01-12T05:00:00Z")  # same bar, in UTC
+    assert offset == 8 and len(tail) == 2
+    tail, offset = series_window(df, since="2024-01-13")  # weekend: next bar on
+    assert offset == 9 and len(tail) == 1
+    assert series_window(df, since="2030-01-01")[0].empty
+
+    assert series_window(df, last_n=3)[1] == 7
+    assert series_window(df, last_n=50)[1] == 0
+    # Both: the shorter tail
+    assert series_window(df, since="2024-01-03", last_n=2)[1] == 8
+    assert series_window(df, since="2024-01-15", last_n=5)[1] == 9
+
+    naive = df.tz_localize(None)
+    assert series_window(naive, since="2024-01-12")[1] == 8
+    assert series_window(naive, since="2024-01-12T00:00:00-05:00")[1] == 8
+
+
+if __name__ == "__main__":
+    test_columnar_matches_records()
+    test_missing_values_and_dtypes()
+    test_dumps_handles_numpy_and_missing_values()
+    test_negotiate_accept_header()
+    test_arrow_round_trip()
+    test_msgpack_round_trip()
+    test_binary_falls_back_to_json()
+    test_series_window()
+    print("Serialization tests passed!")
@@ -0,0 +1,84 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_utils import find_levels
+
+
+def legacy_pivots(df, window=5):
+    # The original nested-loop fractal detector
+    res, sup = [], []
+    for i in range(window, len(df) - window):
+        if all(df['High'].iloc[j] <= df['High'].iloc[i] for j in range(i - window, i + window + 1)):
+            res.append(float(df['High'].iloc[i]))
+        if all(df['Low'].iloc[j] >= df['Low'].iloc[i] for j in range(i - window, i + window + 1)):
+            sup.append(float(df['Low'].iloc[i]))
+    return res, sup
+
+
+def make_ohlc(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.006, n)))
+    index = pd.bdate_range("2020-01-01", periods=n, name="Date")
+    return pd.DataFrame({'High': high, 'Low': low, 'Close': close}, index=index)
+
+
+def test_pivots_match_nested_loop():
+    df = make_ohlc()
+    res, sup = legacy_pivots(df)
+    # Zero tolerance keeps every distinct pivot as its own level
+    levels = find_levels(df, tolerance=0.0, recent_bars=1, max_levels=len(df))
+    got_res = sorted(l['price'] for l in levels if l['type'] == 'resistance' and l['date'] != df.index[-1])
+    got_sup = sorted(l['price'] for l in levels if l['type'] == 'support' and l['date'] != df.index[-1])
+    assert got_res == sorted(set(res))
+    assert got_sup == sorted(set(sup))
+
+
+def test_touches_are_clustered():
+    # Three peaks at ~110 and one at 120 over a flat 100 base
+    high = np.full(80, 100.0)
+    high[[10, 30, 50]] = [110.0, 110.5, 109.8]
+    high[70] = 120.0
+    index = pd.bdate_range("2020-01-01", periods=80)
+    df = pd.DataFrame({'High': high, 'Low': high - 1, 'Close': high - 0.5}, index=index)
+
+    resistance = [l for l in find_levels(df) if l['type'] == 'resistance']
+    by_touches = {l['touches']: l for l in resistance}
+    assert by_touches[3]['date'] == index[50]
+    assert abs(by_touches[3]['price'] - np.mean([110.0, 110.5, 109.8])) < 1e-9
+    assert by_touches[1]['price'] == 120.0
+
+
+def test_plateau_is_one_touch():
+    # A three-bar double top at 110 and a single peak at 110.2
+    high = np.full(60, 100.0)
+    high[20:23] = 110.0
+    high[40] = 110.2
+    index = pd.bdate_range("2020-01-01", periods=60)
+    df = pd.DataFrame({'High': high, 'Low': high - 1, 'Close': high - 0.5}, index=index)
+
+    resistance = [l for l in find_levels(df) if l['type'] == 'resistance' and l['price'] > 105]
+    assert len(resistance) == 1
+    assert resistance[0]['touches'] == 2 and resistance[0]['date'] == index[40]
+    assert abs(resistance[0]['price'] - 110.1) < 1e-9
+
+
+def test_missing_recent_prices():
+    df = make_ohlc(120, seed=1)
+    df.iloc[-30:] = np.nan
+    levels = find_levels(df)
+    assert levels and all(l['date'] < df.index[-30] for l in levels)
+
+
+if __name__ == "__main__":
+    test_pivots_match_nested_loop()
+    test_touches_are_clustered()
+    test_plateau_is_one_touch()
+    test_missing_recent_prices()
+    print("S/R level tests passed!")
@@ -0,0 +1,65 @@
+import sys
+import os
+import json
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils
+import indicator_stream
+import routes.stocks as stocks
+from indicators import calculate_indicators
+from test_analysis_batch import Fakes, history
+
+
+def analysis(symbol, **kwargs):
+    options = dict(interval="1d", period="1y", indicators=None, format="columnar", since=None,
+                   last_n=None, fields=None, accept=None, session=None)
+    options.update(kwargs)
+    return json.loads(stocks.get_stock_analysis(symbol, **options).body)
+
+
+def test_failed_context_loads_are_not_cached():
+    with Fakes() as fakes:
+        load = utils.fetch_history
+        # Only the symbol's own daily bars arrive: proxies, sectors and the weekly tide fail
+        utils.fetch_history = lambda ticker, period, interval="1d", timeout=10: \
+            load(ticker, period, interval, timeout) if ticker == "AAA" and interval == "1d" else load("NODATA", period)
+        result = analysis("AAA")
+        assert result["symbol"] == "AAA"
+        assert not [key for key in fakes.cache if key.startswith(("proxies_", "sector_", "tide_wk_"))]
+
+        # The next analysis loads them again
+        utils.fetch_history = load
+        calls = len(fakes.calls)
+        analysis("AAA")
+        assert {t for t, _ in fakes.calls[calls:]} >= {"SPY", "AAA"}
+        assert [key for key in fakes.cache if key.startswith(("proxies_", "sector_", "tide_wk_"))]
+
+
+def test_sliding_window_streams_new_bars():
+    full = history("AAA", 300)
+    with Fakes() as fakes:
+        load, day = utils.fetch_history, [252]
+        # A one-year fetch slides: every new bar drops the oldest one
+        utils.fetch_history = lambda ticker, period, interval="1d", timeout=10: \
+            full.iloc[day[0] - 252:day[0]] if ticker == "AAA" and interval == "1d" else load(ticker, period, interval)
+        writes, set_cache = [], indicator_stream.set_cache
+        indicator_stream.set_cache = lambda key, data: (writes.append(key), set_cache(key, data))
+
+        for day[0] in range(252, 256):
+            fakes.cache.pop("download_AAA_1y_1d", None)  # the bars cache has expired
+            data = analysis("AAA")["data"]
+            expected = calculate_indicators(full.iloc[:day[0]].copy())
+            assert data["index"][0] == full.index[day[0] - 252].tz_localize(None).isoformat()
+            assert len(data["index"]) == 252
+            assert data["values"]["ema_13"][-1] == expected['ema_13'].iloc[-1]
+        # The base frame was computed and written once; the new bars were streamed
+        assert writes.count("indicator_frame_AAA_1d") == 1
+        assert writes.count("indicator_state_AAA_1d") == 4
+
+
+if __name__ == "__main__":
+    test_failed_context_loads_are_not_cached()
+    test_sliding_window_streams_new_bars()
+    print("Stock analysis tests passed!")
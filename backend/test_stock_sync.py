@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+from sqlmodel import SQLModel, Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import stock_sync
+from models import Stock
+
+
+def make_engine(tables=True):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    if tables:
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(Stock(symbol="AAA", efi_status="sell", setup_signal="pullback_sell"))
+            session.add(Stock(symbol="BBB"))
+            session.commit()
+    return engine
+
+
+def stocks(engine):
+    with Session(engine) as session:
+        return {s.symbol: s for s in session.exec(select(Stock))}
+
+
+def test_updates_coalesce_and_flush_in_one_batch():
+    engine, stock_sync.engine = stock_sync.engine, make_engine()
+    try:
+        stock_sync.enqueue("AAA", {"efi_status": "buy", "setup_signal": None})
+        stock_sync.enqueue("AAA", {"efi_status": None, "divergence_status": "bullish"})
+        stock_sync.enqueue("BBB", {"confluence_alert": "HIGH"})
+        stock_sync.enqueue("ZZZ", {"efi_status": "buy"})  # no Stock row: ignored
+        assert stock_sync.pending() == 3
+
+        assert stock_sync.flush() == 3 and stock_sync.pending() == 0
+        rows = stocks(stock_sync.engine)
+        assert rows["AAA"].efi_status is None and rows["AAA"].setup_signal is None
+        assert rows["AAA"].divergence_status == "bullish"
+        assert rows["BBB"].confluence_alert == "HIGH" and rows["BBB"].efi_status is None
+        assert "ZZZ" not in rows
+        assert stock_sync.flush() == 0
+    finally:
+        stock_sync.engine = engine
+
+
+def test_failed_flush_keeps_updates_and_worker_writes_on_stop():
+    engine, stock_sync.engine = stock_sync.engine, make_engine(tables=False)
+    try:
+        stock_sync.enqueue("AAA", {"efi_status": "buy", "setup_signal": "pullback_buy"})
+        assert stock_sync.flush() == 0 and stock_sync.pending() == 1  # no table: kept
+
+        # Newer values queued meanwhile win over the retried batch
+        stock_sync.enqueue("AAA", {"efi_status": "sell"})
+        stock_sync.engine = make_engine()
+        stock_sync.start_worker()
+        time.sleep(0.05)
+        assert stock_sync.pending() == 1  # still collecting the batch
+        stock_sync.stop_worker()
+        assert stock_sync.pending() == 0
+        row = stocks(stock_sync.engine)["AAA"]
+        assert row.efi_status == "sell" and row.setup_signal == "pullback_buy"
+    finally:
+        stock_sync.engine = engine
+
+
+def test_rejects_unsynced_fields():
+    try:
+        stock_sync.enqueue("AAA", {"is_watched": False})
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert stock_sync.pending() == 0
+
+
+if __name__ == "__main__":
+    test_updates_coalesce_and_flush_in_one_batch()
+    test_failed_flush_keeps_updates_and_worker_writes_on_stop()
+    test_rejects_unsynced_fields()
+    print("Stock sync tests passed!")
@@ -0,0 +1,66 @@
+import sys
+import os
+import re
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import timing
+from timing import StageTimer, stage_percentiles
+
+
+def test_stages_and_server_timing():
+    timer = StageTimer("test")
+    time.sleep(0.02)
+    timer.lap("fetch")
+    with timer.stage("compute"):
+        time.sleep(0.01)
+    with timer.stage("compute"):  # repeated stages add up
+        time.sleep(0.01)
+    time.sleep(0.005)
+    timer.lap("serialize")  # counts from the end of the last stage
+
+    assert list(timer.stages) == ["fetch", "compute", "serialize"]
+    assert 20 <= timer.stages["fetch"] < 40
+    assert 20 <= timer.stages["compute"] < 40
+    assert 5 <= timer.stages["serialize"] < 15
+
+    header = timer.server_timing()
+    entries = [entry.split(";dur=") for entry in header.split(", ")]
+    assert [name for name, _ in entries] == ["fetch", "compute", "serialize", "total"]
+    assert all(re.fullmatch(r"\d+\.\d", dur) for _, dur in entries)
+    assert float(entries[-1][1]) >= sum(timer.stages.values()) - 0.5
+
+
+def test_finish_records_percentiles():
+    timing.reset()
+    for ms in range(1, 101):
+        timer = StageTimer("analysis")
+        timer.add("indicators", float(ms))
+        record = timer.finish(symbol="AAA")
+    assert record["operation"] == "analysis" and record["symbol"] == "AAA"
+    assert record["stages"] == {"indicators": 100.0}
+
+    StageTimer("scan").finish()
+    summary = stage_percentiles("analysis")
+    assert list(summary) == ["analysis"]
+    indicators = summary["analysis"]["indicators"]
+    assert indicators["count"] == 100 and indicators["max"] == 100.0
+    assert indicators["p50"] == 50.5 and indicators["p90"] == 90.1
+    assert summary["analysis"]["total"]["count"] == 100
+    assert set(stage_percentiles()) == {"analysis", "scan"}
+
+    # Bounded window: only the most recent runs count
+    for _ in range(timing.SAMPLE_WINDOW):
+        timer = StageTimer("analysis")
+        timer.add("indicators", 1.0)
+        timer.finish()
+    assert stage_percentiles("analysis")["analysis"]["indicators"]["max"] == 1.0
+    timing.reset()
+
+
+if __name__ == "__main__":
+    test_stages_and_server_timing()
+    test_finish_records_percentiles()
+    print("Timing tests passed!")
@@ -0,0 +1,62 @@
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import scanner
+import universe
+import utils
+from synthetic import make_ohlcv
+
+
+def test_universe_files():
+    directory = universe.UNIVERSE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "mine.txt"), "w") as f:
+            f.write("# my picks\naapl\nBRK.B\n\nAAPL\n")
+        with open(os.path.join(tmp, "index.csv"), "w") as f:
+            f.write("Name,Symbol\nApple,AAPL\nMicrosoft,MSFT\n")
+        try:
+            universe.UNIVERSE_DIR = tmp
+            assert universe.list_universes() == ["watchlist", "index", "mine"]
+            assert universe.load_universe("mine") == ["AAPL", "BRK-B"]
+            assert universe.load_universe("index") == ["AAPL", "MSFT"]
+            for name in ("missing", "../mine"):
+                try:
+                    universe.load_universe(name)
+                    assert False, "unknown universe accepted"
+                except KeyError:
+                    pass
+        finally:
+            universe.UNIVERSE_DIR = directory
+
+
+def test_scan_universe_streams_chunks():
+    def fetch_history(ticker, period, interval="1d", timeout=10):
+        return pd.DataFrame() if ticker.startswith("BAD") else make_ohlcv(120, seed=len(ticker))
+
+    symbols = ["A1", "A2", "BAD1", "BAD2", "C1"]
+    original = utils.fetch_history
+    reported = []
+    try:
+        utils.fetch_history = fetch_history
+        stats = scanner.ScanStats(len(symbols))
+        chunks = list(scanner.scan_universe(symbols, chunk_size=2, stats=stats,
+                                            on_result=lambda s, fields, error: reported.append((s, error))))
+    finally:
+        utils.fetch_history = original
+
+    assert [chunk for chunk, _ in chunks] == [["A1", "A2"], ["BAD1", "BAD2"], ["C1"]]
+    assert [sorted(results) for _, results in chunks] == [["A1", "A2"], [], ["C1"]]
+    assert ("BAD1", "no data") in reported and len(reported) == 5
+    snapshot = stats.snapshot()
+    assert snapshot["done"] == 5 and snapshot["analyzed"] == 3
+
+
+if __name__ == "__main__":
+    test_universe_files()
+    test_scan_universe_streams_chunks()
+    print("Universe tests passed!")
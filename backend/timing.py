@@ -0,0 +1,106 @@
+"""
+Per-stage latency of analyses, scans and backtests.
+
+    timer = StageTimer("analysis")
+    with timer.stage("download"):
+        ...
+    timer.lap("indicators")  # or: the time since the previous stage ended
+    response.headers["Server-Timing"] = timer.server_timing()
+    timer.finish(symbol=symbol)
+
+finish() logs the run as one JSON line (logger "timing") and adds every
+stage's duration to a bounded window of recent runs (SAMPLE_WINDOW per
+operation and stage). stage_percentiles() summarizes the windows for
+GET /metrics.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("timing")
+
+SAMPLE_WINDOW = 500  # runs kept per operation and stage
+PERCENTILES = (50, 90, 99)
+
+_samples: Dict[Tuple[str, str], Deque[float]] = defaultdict(lambda: deque(maxlen=SAMPLE_WINDOW))
+_lock = threading.Lock()
+
+
+class StageTimer:
+    """Durations (ms) of the named stages of one run, in the order they ran."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.stages: Dict[str, float] = {}
+        self._start = self._mark = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the block as stage `name` (repeated stages add up)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._mark = time.perf_counter()
+            self.add(name, (self._mark - start) * 1000)
+
+    def lap(self, name: str):
+        """End stage `name` now: it ran since the previous stage ended (or the start)."""
+        now = time.perf_counter()
+        self.add(name, (now - self._mark) * 1000)
+        self._mark = now
+
+    def add(self, name: str, ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1000
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: every stage, then the total so far."""
+        entries = [*self.stages.items(), ("total", self.total_ms)]
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in entries)
+
+    def finish(self, **context) -> Dict:
+        """Record the run for stage_percentiles() and log it. Returns the logged record."""
+        total = self.total_ms
+        with _lock:
+            for name, ms in [*self.stages.items(), ("total", total)]:
+                _samples[(self.operation, name)].append(ms)
+        record = {
+            "operation": self.operation,
+            **context,
+            "total_ms": round(total, 1),
+            "stages": {name: round(ms, 1) for name, ms in self.stages.items()},
+        }
+        logger.info(json.dumps(record, default=str))
+        return record
+
+
+def stage_percentiles(operation: Optional[str] = None) -> Dict:
+    """{operation: {stage: {count, p50, p90, p99, max}}} in ms over the recent runs."""
+    with _lock:
+        windows = {key: list(values) for key, values in _samples.items()
+                   if operation is None or key[0] == operation}
+    summary: Dict[str, Dict] = {}
+    for (op, name), values in windows.items():
+        points = np.percentile(values, PERCENTILES)
+        summary.setdefault(op, {})[name] = {
+            "count": len(values),
+            **{f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, points)},
+            "max": round(max(values), 1),
+        }
+    return summary
+
+
+def reset():
+    """Forget every recorded run."""
+    with _lock:
+        _samples.clear()
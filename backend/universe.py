@@ -0,0 +1,83 @@
+"""
+Symbol universes for the scanner.
+
+"watchlist" is the Stock table. Any other universe is a file in
+universes/: name.txt (one symbol per line, # comments) or name.csv (a
+Symbol/Ticker column, else the first column), e.g. an S&P 500 or Russell 1000
+constituent export.
+"""
+import csv
+import os
+import re
+from typing import Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from models import Stock
+
+UNIVERSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes")
+WATCHLIST = "watchlist"
+
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _universe_path(name: str) -> Optional[str]:
+    if not _NAME.match(name):
+        return None
+    for ext in (".txt", ".csv"):
+        path = os.path.join(UNIVERSE_DIR, name + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _normalize(symbols) -> List[str]:
+    # Upper case, yfinance share classes (BRK.B -> BRK-B), duplicates dropped in order
+    seen = {}
+    for symbol in symbols:
+        symbol = symbol.strip().upper().replace(".", "-")
+        if symbol and not symbol.startswith("#"):
+            seen.setdefault(symbol, None)
+    return list(seen)
+
+
+def _read_csv(path: str) -> List[str]:
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    for name in ("symbol", "ticker"):
+        if name in header:
+            col = header.index(name)
+            return [row[col] for row in rows[1:] if len(row) > col]
+    return [row[0] for row in rows if row]
+
+
+def list_universes() -> List[str]:
+    names = [WATCHLIST]
+    if os.path.isdir(UNIVERSE_DIR):
+        names += sorted({os.path.splitext(f)[0] for f in os.listdir(UNIVERSE_DIR)
+                         if f.endswith((".txt", ".csv")) and _NAME.match(os.path.splitext(f)[0])})
+    return names
+
+
+def load_universe(name: str, session: Optional[Session] = None) -> List[str]:
+    """Symbols of universe `name`. Raises KeyError for an unknown universe."""
+    if name == WATCHLIST:
+        if session is None:
+            raise ValueError("The watchlist universe needs a DB session")
+        return list(session.exec(select(Stock.symbol)).all())
+
+    path = _universe_path(name)
+    if path is None:
+        raise KeyError(f"Unknown universe '{name}'")
+    if path.endswith(".csv"):
+        return _normalize(_read_csv(path))
+    with open(path) as f:
+        return _normalize(f)
+
+
+def describe_universes(session: Session) -> List[Dict]:
+    """Every universe with its symbol count."""
+    return [{"name": name, "symbols": len(load_universe(name, session))} for name in list_universes()]
@@ -1,10 +1,17 @@
 import yfinance as yf
 import pandas as pd
 import logging
+import math
 import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+FETCH_WORKERS = 32   # threads for concurrent network loads
+FETCH_TIMEOUT = 20   # seconds fetch_concurrently() waits for all of its loads
+
 def safe_download(symbol_or_list, period=None, interval="1d", timeout=10, **kwargs):
     """
     Wrapper for yf.download with a timeout and basic error handling.
@@ -60,3 +67,124 @@ def safe_download(symbol_or_list, period=None, interval="1d", timeout=10, **kwar
     except Exception as e:
         logger.error(f"yfinance download failed for {symbol_or_list}: {e}")
         return pd.DataFrame()
+
+
+# ---------------------------------------------------------
+# Concurrent loads
+# ---------------------------------------------------------
+# yf.download keeps its per-call state in module globals (yfinance.shared),
+# so two downloads running at once can mix up each other's frames. Concurrent
+# loads fetch each ticker with Ticker.history (what yf.download runs per
+# ticker) and lay the frames out the way yf.download does.
+
+_fetch_pools: Dict[str, ThreadPoolExecutor] = {}
+_fetch_pool_lock = threading.Lock()
+_EMPTY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def fetch_pool(name: str = "fetch", workers: int = FETCH_WORKERS) -> ThreadPoolExecutor:
+    """
+    Named pool of fetch threads, created on first use. Bulk loads (scans,
+    batches) run on their own pool so they cannot queue ahead of the
+    single-symbol loads on the default one.
+    """
+    with _fetch_pool_lock:
+        if name not in _fetch_pools:
+            _fetch_pools[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return _fetch_pools[name]
+
+
+def fetch_timeout(loads: int, workers: int = FETCH_WORKERS) -> float:
+    """How long to wait for `loads` loads on `workers` threads: FETCH_TIMEOUT per round."""
+    return FETCH_TIMEOUT * math.ceil(loads / workers)
+
+
+def fetch_history(ticker: str, period: str, interval: str = "1d", timeout=10) -> pd.DataFrame:
+    """
+    Bars of one ticker (auto-adjusted, no actions), safe to call from several
+    threads. Like safe_download, retries without the browser session when the
+    first attempt comes back empty. Empty DataFrame on error.
+    """
+    try:
+        from curl_cffi import requests as crequests
+        sessions = [crequests.Session(impersonate="chrome"), None]
+    except ImportError:
+        sessions = [None]
+
+    df = pd.DataFrame()
+    for session in sessions:
+        try:
+            df = yf.Ticker(ticker, session=session).history(
+                period=period, interval=interval, actions=False,
+                auto_adjust=True, timeout=timeout, raise_errors=True,
+            )
+        except Exception as e:
+            logger.warning(f"yfinance history failed for {ticker}: {e}")
+            df = pd.DataFrame()
+        if not df.empty:
+            break
+    return df
+
+
+def as_download(frames: Dict[str, pd.DataFrame], interval: str = "1d") -> pd.DataFrame:
+    """
+    Per-ticker frames combined like yf.download's result: (Price, Ticker)
+    columns sorted by price field, timezone dropped for daily and longer bars.
+    """
+    intraday = interval[-1] in ('m', 'h')
+    combined = {}
+    for ticker, df in frames.items():
+        if df.empty:
+            df = pd.DataFrame(columns=_EMPTY_COLUMNS, dtype=float)
+        elif not intraday and getattr(df.index, 'tz', None) is not None:
+            df = df.tz_localize(None)
+        combined[ticker.upper()] = df
+    data = pd.concat(combined.values(), axis=1, sort=True, keys=combined.keys(), names=['Ticker', 'Price'])
+    data.index = pd.to_datetime(data.index, utc=intraday)
+    data.columns = data.columns.swaplevel(0, 1)
+    return data.sort_index(level=0, axis=1)
+
+
+def fetch_concurrently(downloads: Dict[str, tuple], calls: Optional[Dict[str, Callable[[], Any]]] = None,
+                       timeout: float = FETCH_TIMEOUT,
+                       pool: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """
+    Run independent loads at once and wait at most `timeout` seconds for all
+    of them, so the wait is the slowest load rather than their sum.
+
+    downloads: name -> (ticker or list of tickers, period, interval); every
+               ticker is fetched on its own thread, and the result is laid
+               out like safe_download's (empty DataFrame if nothing arrived).
+    calls:     name -> zero-argument callable; left out of the result if it
+               raised or did not finish in time.
+    pool:      where the loads run (default: fetch_pool()). Loads still
+               queued when the wait ends are cancelled.
+    """
+    pool = pool or fetch_pool()
+    tickers = {}
+    for name, (symbols, period, interval) in downloads.items():
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        tickers[name] = {t: pool.submit(fetch_history, t, period, interval) for t in symbols}
+    others = {name: pool.submit(call) for name, call in (calls or {}).items()}
+
+    futures = [f for group in tickers.values() for f in group.values()] + list(others.values())
+    done, pending = wait(futures, timeout=timeout)
+    if pending:
+        logger.warning(f"{len(pending)} of {len(futures)} loads did not finish within {timeout}s")
+        for future in pending:
+            future.cancel()
+
+    results = {}
+    for name, group in tickers.items():
+        frames = {t: f.result() if f in done else pd.DataFrame() for t, f in group.items()}
+        if all(df.empty for df in frames.values()):
+            results[name] = pd.DataFrame()
+        else:
+            results[name] = as_download(frames, downloads[name][2])
+    for name, future in others.items():
+        if future in done:
+            if future.exception() is None:
+                results[name] = future.result()
+            else:
+                logger.warning(f"Load '{name}' failed: {future.exception()}")
+    return results
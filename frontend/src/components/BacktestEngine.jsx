@@ -812,7 +812,7 @@ EXIT_LONG = RSI(14) > 70`
                                                 />
                                                 <div className="flex justify-between items-center text-[10px] text-gray-500 italic px-1">
                                                     <span>Supports: Variables, Assignments (=), CROSSOVER, logic (AND/OR).</span>
-                                                    <span>Signals: CONFLUENCE_LONG(), CONFLUENCE_SHORT() (EFI + Candlesticks)</span>
+                                                    <span>Signals: CONFLUENCE_LONG(), CONFLUENCE_SHORT() (EFI + Candlesticks), MACD_DIVERGENCE_BULLISH(lookback), MACD_DIVERGENCE_BEARISH(lookback)</span>
                                                     <span>Req: ENTRY_LONG, EXIT_LONG balance.</span>
                                                 </div>
                                             </div>
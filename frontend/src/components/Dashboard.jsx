@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { getStocks, addStock, deleteStock, getAnalysis, toggleWatchStock, scanStocks, scanStocksEFI } from '../services/api';
+import { getStocks, addStock, deleteStock, getAnalysis, toggleWatchStock, scanStocksEFI, startScanJob, scanJobEventsUrl } from '../services/api';
 import StockChart from './StockChart';
 import MarketIntelligence from './MarketIntelligence';
 import TechnicalChart from './TechnicalChart';
@@ -361,11 +361,36 @@ const Dashboard = () => {
         if (isScanning) return;
         setIsScanning(true);
         try {
-            await scanStocks();
-            await loadStocks();
+            const { data: job } = await startScanJob();
+            const source = new EventSource(scanJobEventsUrl(job.job_id));
+
+            // Signals appear per symbol as the background scan finishes them
+            source.addEventListener('result', (msg) => {
+                const r = JSON.parse(msg.data);
+                setStocks(prev => prev.map(s => s.symbol === r.symbol ? {
+                    ...s,
+                    divergence_status: r.divergence,
+                    efi_status: r.efi,
+                    setup_signal: r.setup,
+                    candle_pattern: r.candle_pattern,
+                    candle_pattern_type: r.candle_pattern_type,
+                    confluence_alert: r.confluence_alert,
+                } : s));
+            });
+
+            const finish = () => {
+                source.close();
+                loadStocks();
+                setIsScanning(false);
+            };
+            source.addEventListener('done', finish);
+            source.addEventListener('failed', (msg) => {
+                console.error("Scan failed", JSON.parse(msg.data).error);
+                finish();
+            });
+            source.onerror = finish; // connection lost
         } catch (err) {
             console.error("Scan failed", err);
-        } finally {
             setIsScanning(false);
         }
     };
@@ -8,8 +8,32 @@ export const getStocks = () => api.get('/stocks/');
 export const addStock = (symbol) => api.post('/stocks/', { symbol });
 export const deleteStock = (symbol) => api.delete(`/stocks/${symbol}`);
 export const toggleWatchStock = (symbol) => api.put(`/stocks/${symbol}/watch`);
-export const getAnalysis = (symbol, period = '1y', interval = '1d', configs = null) =>
-    api.get(`/stocks/${symbol}/analysis`, { params: { period, interval, indicators: configs ? JSON.stringify(configs) : undefined } });
+
+// Columnar series ({index_name, index, columns, values}) back to one object per bar
+export const recordsFromColumnar = ({ index_name, index, columns, values }) =>
+    index.map((ts, i) => {
+        const row = { [index_name]: ts };
+        for (const col of columns) row[col] = values[col][i];
+        return row;
+    });
+
+// The series is fetched columnar (smaller, cheaper to encode) and handed to callers as records.
+// `fields` (e.g. ['elder', 'efi_bands']) limits the indicator columns; null returns them all.
+export const getAnalysis = (symbol, period = '1y', interval = '1d', configs = null, fields = null) =>
+    api.get(`/stocks/${symbol}/analysis`, {
+        params: {
+            period, interval, format: 'columnar',
+            indicators: configs ? JSON.stringify(configs) : undefined,
+            fields: fields ? fields.join(',') : undefined,
+        },
+    }).then((res) => {
+        if (res.data?.data?.columns) res.data.data = recordsFromColumnar(res.data.data);
+        return res;
+    });
+
+// Regime / impulse / tactic cards for many symbols at once (one shared macro and sector snapshot)
+export const getAnalysisBatch = (symbols, period = '1y', interval = '1d', summaryOnly = true) =>
+    api.post('/stocks/analysis/batch', { symbols, period, interval, summaryOnly });
 
 // Journal
 export const saveJournalEntry = (entry) => api.post('/journal/', entry);
@@ -31,6 +55,9 @@ export const deleteTemplate = (id) => api.delete(`/templates/${id}`);
 
 export const scanStocks = () => api.post('/stocks/scan');
 export const scanStocksEFI = () => api.post('/stocks/scan/efi');
+export const startScanJob = (force = false) => api.post('/stocks/scan/jobs', null, { params: { force } });
+export const getScanJob = (jobId) => api.get(`/stocks/scan/jobs/${jobId}`);
+export const scanJobEventsUrl = (jobId) => `${api.defaults.baseURL}/stocks/scan/jobs/${jobId}/events`;
 
 // Backtest API
 export const runBacktest = (config) => api.post('/backtest/run', config);